@@ -0,0 +1,276 @@
+import heapq
+from decimal import Decimal, InvalidOperation, localcontext
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Tuple, Type
+
+from petl.comparison import Comparable
+
+from ebflow.analytics.fan_out import SpillBuffer
+
+# groups held in memory by a hash aggregate before new groups spill to disk
+DEFAULT_MAX_GROUPS = 100000
+SPILL_PARTITIONS = 16
+# partitions that still hold too many groups are split again, up to this depth
+MAX_SPILL_DEPTH = 4
+# digits of the Decimal running mean and sum of squared deviations in exact statistics
+EXACT_PRECISION = 60
+
+
+class Accumulator:
+    """Running state of one aggregate, fed one value at a time."""
+
+    def add(self, value: Any):
+        raise NotImplementedError
+
+    def result(self) -> Any:
+        raise NotImplementedError
+
+
+class SumAccumulator(Accumulator):
+    def __init__(self):
+        self.total = 0
+
+    def add(self, value: Any):
+        self.total = self.total + value
+
+    def result(self) -> Any:
+        return self.total
+
+
+class MinAccumulator(Accumulator):
+    def __init__(self):
+        self.value = None
+        self.empty = True
+
+    def add(self, value: Any):
+        if self.empty or value < self.value:
+            self.value = value
+            self.empty = False
+
+    def result(self) -> Any:
+        return self.value
+
+
+class MaxAccumulator(MinAccumulator):
+    def add(self, value: Any):
+        if self.empty or value > self.value:
+            self.value = value
+            self.empty = False
+
+
+class CountAccumulator(Accumulator):
+    """Non-null values."""
+
+    def __init__(self):
+        self.count = 0
+
+    def add(self, value: Any):
+        if value is not None:
+            self.count += 1
+
+    def result(self) -> Any:
+        return self.count
+
+
+class CountUniqueAccumulator(Accumulator):
+    """Distinct non-null values, the only aggregate whose state grows with the data."""
+
+    def __init__(self):
+        self.values = set()
+
+    def add(self, value: Any):
+        if value is not None:
+            self.values.add(value)
+
+    def result(self) -> Any:
+        return len(self.values)
+
+
+class AvgAccumulator(Accumulator):
+    """Mean rounded to 5 places, 0 for an empty group."""
+
+    def __init__(self):
+        self.total = 0
+        self.count = 0
+
+    def add(self, value: Any):
+        self.total += value
+        self.count += 1
+
+    def result(self) -> Any:
+        try:
+            return round(self.total / self.count, 5)
+        except ZeroDivisionError:
+            return 0
+
+
+class StatisticsAccumulator(Accumulator):
+    """
+    Count, mean, population variance and standard deviation, min and max of
+    a column in one pass. Values that are not numeric are counted as errors.
+
+    The mean and variance are updated with Welford's method, which does not
+    lose precision on large values the way a sum of squares does. With
+    `exact`, values are Decimals instead: the mean is the exact sum divided
+    by the count, and Welford's update runs with EXACT_PRECISION digits, so
+    currency amounts are only rounded by the final divisions.
+    """
+
+    def __init__(self, exact: bool = False):
+        self.exact = exact
+        self.count = 0
+        self.errors = 0
+        self.min = None
+        self.max = None
+        self.mean = Decimal(0) if exact else 0.0
+        self.m2 = Decimal(0) if exact else 0.0
+        self.total = Decimal(0)
+
+    def to_number(self, value: Any) -> Any:
+        if value is None or isinstance(value, bool):
+            raise TypeError("not a number")
+        if not self.exact:
+            return float(value)
+        if isinstance(value, float):
+            return Decimal(str(value))
+        try:
+            return Decimal(value)
+        except InvalidOperation:
+            raise ValueError("not a number")
+
+    def add(self, value: Any):
+        try:
+            value = self.to_number(value)
+        except (ValueError, TypeError):
+            self.errors += 1
+            return
+        self.count += 1
+        if self.min is None or value < self.min:
+            self.min = value
+        if self.max is None or value > self.max:
+            self.max = value
+        if self.exact:
+            with localcontext() as context:
+                context.prec = EXACT_PRECISION
+                self.total += value
+                delta = value - self.mean
+                self.mean += delta / self.count
+                self.m2 += delta * (value - self.mean)
+        else:
+            delta = value - self.mean
+            self.mean += delta / self.count
+            self.m2 += delta * (value - self.mean)
+
+    def get_mean(self) -> Any:
+        if self.count == 0:
+            return None
+        return self.total / self.count if self.exact else self.mean
+
+    def get_variance(self) -> Any:
+        if self.count == 0:
+            return None
+        # the rounding of the running mean can leave a tiny negative sum
+        m2 = self.m2 if self.m2 > 0 else type(self.m2)(0)
+        return m2 / self.count
+
+    def get_stddev(self) -> Any:
+        variance = self.get_variance()
+        if variance is None:
+            return None
+        return variance.sqrt() if self.exact else variance**0.5
+
+    def result(self) -> Any:
+        return self.get_mean()
+
+
+AGGREGATE_FUNCTIONS: Dict[str, Type[Accumulator]] = {
+    "sum": SumAccumulator,
+    "avg": AvgAccumulator,
+    "min": MinAccumulator,
+    "max": MaxAccumulator,
+    "count": CountAccumulator,
+    "count_unique": CountUniqueAccumulator,
+}
+
+
+def create_accumulator(function: str) -> Accumulator:
+    try:
+        return AGGREGATE_FUNCTIONS[function]()
+    except KeyError:
+        raise ValueError(f"Invalid aggregate function {function}")
+
+
+def read_spill(spill: SpillBuffer) -> Iterator[List[Any]]:
+    try:
+        while spill.pending:
+            yield spill.popleft()
+    finally:
+        spill.close()
+
+
+def hash_aggregate(
+    rows: Iterable[List[Any]],
+    key_indexes: List[int],
+    aggregates: List[Tuple[int, str]],
+    max_groups: int = DEFAULT_MAX_GROUPS,
+    spill_directory: Optional[str] = None,
+    depth: int = 0,
+) -> Iterator[List[Any]]:
+    """
+    Group `rows` by the values at `key_indexes` and compute every aggregate,
+    a (value index, function) pair, in a single pass. Yields the key values
+    followed by the aggregate results, sorted by key.
+
+    Once `max_groups` groups are held, rows of any new group are spilled to
+    disk, partitioned by the hash of their key, and each partition is
+    aggregated on its own afterwards. The sorted results of the partitions
+    are spilled as well and merged at the end.
+    """
+    groups: Dict[Tuple, List[Accumulator]] = {}
+    partitions: Optional[List[SpillBuffer]] = None
+    for row in rows:
+        key = tuple(row[index] for index in key_indexes)
+        accumulators = groups.get(key)
+        if accumulators is None:
+            if len(groups) >= max_groups and depth < MAX_SPILL_DEPTH:
+                if partitions is None:
+                    partitions = [
+                        SpillBuffer(spill_directory) for _ in range(SPILL_PARTITIONS)
+                    ]
+                partitions[hash((depth, key)) % SPILL_PARTITIONS].append(row)
+                continue
+            accumulators = groups[key] = [
+                create_accumulator(function) for _, function in aggregates
+            ]
+        for (index, _), accumulator in zip(aggregates, accumulators):
+            accumulator.add(row[index])
+
+    results = sorted(
+        (
+            list(key) + [accumulator.result() for accumulator in accumulators]
+            for key, accumulators in groups.items()
+        ),
+        key=lambda result: Comparable(tuple(result[: len(key_indexes)])),
+    )
+    groups.clear()
+    if partitions is None:
+        yield from results
+        return
+
+    runs = [iter(results)]
+    for partition in partitions:
+        if not partition.pending:
+            continue
+        run = SpillBuffer(spill_directory)
+        for result in hash_aggregate(
+            read_spill(partition),
+            key_indexes,
+            aggregates,
+            max_groups,
+            spill_directory,
+            depth + 1,
+        ):
+            run.append(result)
+        runs.append(read_spill(run))
+    yield from heapq.merge(
+        *runs, key=lambda result: Comparable(tuple(result[: len(key_indexes)]))
+    )
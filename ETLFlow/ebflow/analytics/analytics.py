@@ -3,14 +3,37 @@ import enum
 from io import BytesIO
 from datetime import datetime
 import os
-from typing import List, Dict, Any
-import networkx as nx
-import matplotlib.pyplot as plt
-from frictionless import Resource, Pipeline, transform
+import shutil
+import threading
+from concurrent.futures import (
+    FIRST_COMPLETED,
+    ProcessPoolExecutor,
+    ThreadPoolExecutor,
+    as_completed,
+    wait,
+)
+from collections import deque
+from contextlib import ExitStack, nullcontext
+from typing import List, Dict, Any, Optional, Set, Tuple
+from frictionless import Resource, Pipeline, Schema, system, transform
 from frictionless.resources import TableResource
 from frictionless_azureblob import AzureBlobControl
-from ebflow.analytics.analytics_schema import AnalyticsPipeline, Node, Edge, NodeData
+from ebflow.analytics.analytics_schema import AnalyticsPipeline, Node, NodeData
+from ebflow.analytics.audit_log import AuditLogSink
+from ebflow.analytics.checkpoint import PipelineCheckpoint
 from ebflow.analytics.dna_step_generation import DNATransformStep
+from ebflow.analytics.fan_out import DEFAULT_BUFFER_ROWS, BranchReader, RowTee
+from ebflow.analytics.instrumentation import PipelineProfiler
+from ebflow.analytics.node_cache import (
+    NodeOutputCache,
+    compute_fingerprints,
+    get_file_extension,
+)
+from ebflow.analytics.pipeline_graph import PipelineGraph
+from ebflow.analytics.planner import DEFAULT_SAMPLE_BYTES, PipelinePlan, build_plan
+from ebflow.analytics.schema_propagation import propagate_schemas
+from ebflow.analytics.step_optimizer import iterate_steps, optimize_steps
+from ebflow.analytics.workspace import RunWorkspace
 from ebflow.utils.utils import get_node_label
 
 
@@ -29,6 +52,21 @@ class DataAndAnalytics:
     def __init__(self, pipeline: AnalyticsPipeline):
         self.pipeline = pipeline
         self.audit_trail = []
+        self.graph: Optional[PipelineGraph] = None
+        self.fan_out = False
+        self.fan_out_buffer_rows = DEFAULT_BUFFER_ROWS
+        self.fan_out_spill_directory: Optional[str] = None
+        self.pending_loads: List[Tuple[Node, Node]] = []
+        self.cache: Optional[NodeOutputCache] = None
+        self.fingerprints: Dict[str, str] = {}
+        self.cached_nodes: Set[str] = set()
+        self.checkpoint: Optional[PipelineCheckpoint] = None
+        self.completed_nodes: Set[str] = set()
+        self.profiler: Optional[PipelineProfiler] = None
+        self.optimize = True
+        self.log_sink: Optional[AuditLogSink] = None
+        self.workspace: Optional[RunWorkspace] = None
+        self.schemas: Dict[str, Optional[Schema]] = {}
         self.clean_pipeline_map()
         self.state: PipelineState = PipelineState.initiated
 
@@ -39,6 +77,10 @@ class DataAndAnalytics:
             node.data.label = get_node_label(idx)
 
     def generate_pipeline_figure(self):
+        # plotting is the only use of networkx and matplotlib, both slow to import
+        import networkx as nx
+        import matplotlib.pyplot as plt
+
         content = BytesIO()
         G = nx.DiGraph()
         G.add_nodes_from(list(map(lambda node: node.id, self.pipeline.nodes)))
@@ -81,31 +123,52 @@ class DataAndAnalytics:
     def log_details(self, message):
         timestamp = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
         print(f"{timestamp}\t{message}")
-        self.audit_trail.append({"timestamp": timestamp, "message": message})
+        self.add_audit_entry({"timestamp": timestamp, "message": message})
+
+    def add_audit_entry(self, entry: Dict[str, str]):
+        self.audit_trail.append(entry)
+        if self.log_sink is not None:
+            self.log_sink.write(entry)
+
+    def set_log_sink(self, log_sink: AuditLogSink):
+        """Stream the audit trail to `log_sink`, keeping only its tail in memory."""
+        self.log_sink = log_sink
+        for entry in self.audit_trail:
+            log_sink.write(entry)
+        self.audit_trail = deque(self.audit_trail, maxlen=log_sink.keep_entries)
+
+    def flush_log(self):
+        if self.log_sink is not None:
+            self.log_sink.flush()
+
+    @staticmethod
+    def get_audit_trail_path(storage_account_name, folder_path):
+        analytics_folder = "/".join(folder_path.split("/")[:-1])
+        return f"https://{storage_account_name}.blob.core.windows.net/{analytics_folder}/logs/audit_trail.csv"
 
     def write_log_details(self, storage_account_name, folder_path):
         if len(self.audit_trail) == 0:
             return
-        analytics_folder = "/".join(folder_path.split("/")[:-1])
-        audit_trail_path = f"https://{storage_account_name}.blob.core.windows.net/{analytics_folder}/logs/audit_trail.csv"
-        data = [list(self.audit_trail[0].keys())]
-        for audit in self.audit_trail:
-            data.append(list(audit.values()))
+        audit_trail_path = self.get_audit_trail_path(storage_account_name, folder_path)
         try:
-            resource = Resource(data=data)
-            control = AzureBlobControl(overwrite=True)
-            target_resource = TableResource(audit_trail_path, control=control)
-            resource.write(target_resource)
+            if self.log_sink is not None:
+                # entries were streamed as the pipeline ran
+                self.log_sink.close()
+            else:
+                data = [list(self.audit_trail[0].keys())]
+                for audit in self.audit_trail:
+                    data.append(list(audit.values()))
+                resource = Resource(data=data)
+                control = AzureBlobControl(overwrite=True)
+                target_resource = TableResource(audit_trail_path, control=control)
+                resource.write(target_resource)
+            if self.profiler is not None and self.profiler.spans:
+                spans_path = audit_trail_path.replace("audit_trail.csv", "spans.jsonl")
+                self.profiler.export(spans_path)
             return True
         except Exception:
             return False
 
-    def get_node_details(self, node_number):
-        for item in self.pipeline.nodes:
-            if item.id == node_number:
-                return item
-        return None
-
     def get_frictionless_object(self, file_path, file_name):
         if file_path.endswith(".zip"):
             res = TableResource(source=file_path, innerpath=f"cdm/{file_name}")
@@ -116,24 +179,12 @@ class DataAndAnalytics:
         else:
             raise ValueError("Invalid file path")
 
-    def update_visited_node(
-        self, id, set_steps=None, resource=None, data_file_name=None
-    ):
-        for item in self.pipeline.nodes:
-            if item.id == id:
-                if item.processed is False:
-                    item.processed = True
-                if set_steps:
-                    item.steps = set_steps
-                if resource:
-                    item.resource = resource
-                if data_file_name:
-                    item.data_file_name = data_file_name
-
     def generate_transform_step(self, operation_data: NodeData) -> List[Any]:
         try:
             dna_transform_step = DNATransformStep(
-                node_data=operation_data, node=self.pipeline.nodes
+                node_data=operation_data,
+                node=self.pipeline.nodes,
+                workspace=self.workspace,
             )
             steps = dna_transform_step.generate_step()
             self.log_details(dna_transform_step.message)
@@ -144,86 +195,181 @@ class DataAndAnalytics:
             self.log_details(FAILED_MESSAGE)
             raise ValueError(FAILED_ERROR)
 
-    def transform_and_write(self, operation, current_resource_node, target_node):
+    def transform_and_write(
+        self,
+        operation,
+        current_resource_node,
+        target_node,
+        preprocess=True,
+        target_path=None,
+    ):
         try:
             dataset = current_resource_node.to_copy()
             if operation is None:
                 operation = []
 
-            transformation_steps = (
-                DNATransformStep.generate_preprocessing_steps() + operation
+            preprocessing_steps = (
+                DNATransformStep.generate_preprocessing_steps() if preprocess else []
             )
+            if self.profiler is not None:
+                preprocessing_steps = self.profiler.instrument(
+                    preprocessing_steps, target_node
+                )
+            transformation_steps = preprocessing_steps + operation
+            if self.optimize:
+                transformation_steps = optimize_steps(
+                    transformation_steps, self.profiler
+                )
             target = transform(dataset, steps=transformation_steps)
             control = AzureBlobControl(overwrite=True)
-            target_resource = TableResource(target_node.data.file_path, control=control)
+            target_resource = TableResource(
+                target_path or target_node.data.file_path, control=control
+            )
             target = target.write(target_resource)
+            if self.profiler is not None:
+                self.profiler.record_load(target_node, transformation_steps)
+            self.log_filter_counts(transformation_steps)
             return True
         except Exception as ex:
             self.state = PipelineState.failed
             self.log_details(f"Error: {str(ex)}")
             self.log_details(FAILED_MESSAGE)
             raise ValueError(FAILED_ERROR)
-        finally:
-            for idx, item in enumerate(self.pipeline.edges):
-                cleanup_source_node = self.get_node_details(item.source)
-                cleanup_target_node = self.get_node_details(item.target)
 
-                if (
-                    cleanup_source_node.data_file_name is not None
-                    and cleanup_source_node.data_file_name != []
-                ):
-                    for item in cleanup_source_node.data_file_name:
-                        if os.path.exists(item):
-                            os.unlink(item)
-                if (
-                    cleanup_target_node.data_file_name is not None
-                    and cleanup_target_node.data_file_name != []
+    def log_filter_counts(self, steps: List[Any]):
+        for step in iterate_steps(steps):
+            if step.type == "compound-filter":
+                self.log_details(
+                    f"Filter node {step.label}: {step.kept} rows kept, {step.dropped} rows dropped"
+                )
+
+    def publish_output(self, output_path, target_node):
+        # byte copy, so a cached output is not parsed and re-inferred again
+        try:
+            control = AzureBlobControl(overwrite=True)
+            target_resource = TableResource(target_node.data.file_path, control=control)
+            temp_path = self.workspace.new_path(suffix=os.path.basename(output_path))
+            shutil.copyfile(output_path, temp_path)
+            self.workspace.track(temp_path)
+            try:
+                system.create_loader(target_resource).write_byte_stream(temp_path)
+            finally:
+                self.workspace.remove(temp_path)
+        except Exception as ex:
+            self.state = PipelineState.failed
+            self.log_details(f"Error: {str(ex)}")
+            self.log_details(FAILED_MESSAGE)
+            raise ValueError(FAILED_ERROR)
+
+    def is_cached_load(self, upstream_node: Node, load_node: Node) -> bool:
+        return (
+            self.cache is not None
+            and self.cache.get(
+                self.fingerprints[upstream_node.id],
+                get_file_extension(load_node.data.file_path),
+            )
+            is not None
+        )
+
+    def is_completed_load(self, upstream_node: Node, load_node: Node) -> bool:
+        return self.checkpoint is not None and self.checkpoint.is_load_completed(
+            upstream_node, load_node, self.fingerprints[upstream_node.id]
+        )
+
+    def find_cached_nodes(self, execution_order: List[Node]) -> Set[str]:
+        """
+        Nodes that do not have to run because every load below them can be
+        served from the cache.
+        """
+        return self.find_skipped_nodes(execution_order, self.is_cached_load)
+
+    def find_completed_nodes(self, execution_order: List[Node]) -> Set[str]:
+        """
+        Nodes that do not have to run again on resume because every load below
+        them was already written by the failed run.
+        """
+        return self.find_skipped_nodes(execution_order, self.is_completed_load)
+
+    def find_skipped_nodes(self, execution_order: List[Node], is_done) -> Set[str]:
+        required = set()
+        for node in reversed(execution_order):
+            if node.data.type == "load":
+                if not all(
+                    is_done(upstream_node, node)
+                    for upstream_node in self.graph.get_inputs(node.id)
                 ):
-                    for item in cleanup_target_node.data_file_name:
-                        if os.path.exists(item):
-                            os.unlink(item)
-
-    def update_load_node(self, id, status):
-        for item in self.pipeline.nodes:
-            if item.id == id and item.processed is None:
-                item.processed = status
-                break
-
-    def build_adjacency_list(
-        self, nodes: List[Node], edges: List[Edge]
-    ) -> Dict[str, List[str]]:
-        adjacency_list = {node.id: [] for node in nodes}
-        for edge in edges:
-            source = edge.source
-            target = edge.target
-            adjacency_list[source].append(target)
-        return adjacency_list
-
-    def dfs(self, node, adjacency_list, visited, stack):
-        visited.add(node)
-        stack.add(node)
-        for neighbor in adjacency_list.get(node, []):
-            if neighbor in stack:
-                return False  # Cycle detected
-            if neighbor not in visited:
-                if not self.dfs(neighbor, adjacency_list, visited, stack):
-                    return False
-        stack.remove(node)
-        return True
-
-    def is_acyclic(self, nodes: List[Node], edges: List[Edge]):
-        adjacency_list = self.build_adjacency_list(nodes, edges)
-        visited = set()
-        stack = set()
-        for node in nodes:
-            if node.id not in visited:
-                if not self.dfs(node.id, adjacency_list, visited, stack):
-                    return False  # Cycle detected
-        return True  # No cycles found, graph is a DAG
+                    required.add(node.id)
+            elif any(
+                target in required for target in self.graph.successors[node.id]
+            ):
+                required.add(node.id)
+        return {
+            node.id
+            for node in execution_order
+            if node.data.type != "load" and node.id not in required
+        }
+
+    def profile_node(self, node: Node):
+        if self.profiler is None:
+            return nullcontext()
+        return self.profiler.profile_node(node)
+
+    def write_load(
+        self, upstream_node: Node, load_node: Node, resource=None, preprocess=True
+    ):
+        with self.profile_node(load_node):
+            self.write_load_output(upstream_node, load_node, resource, preprocess)
+
+    def write_load_output(
+        self, upstream_node: Node, load_node: Node, resource=None, preprocess=True
+    ):
+        self.log_details(load_node.data.__repr__())
+        if self.is_completed_load(upstream_node, load_node):
+            self.log_details(
+                f"Output already written at {load_node.data.file_path}, skipped on resume"
+            )
+            load_node.processed = True
+            return
+        resource = resource or upstream_node.resource
+        if self.cache is None:
+            self.log_details(f"Applying {len(upstream_node.steps or [])} steps")
+            self.transform_and_write(
+                upstream_node.steps, resource, load_node, preprocess=preprocess
+            )
+        else:
+            fingerprint = self.fingerprints[upstream_node.id]
+            extension = get_file_extension(load_node.data.file_path)
+            cached_path = self.cache.get(fingerprint, extension)
+            if cached_path is None:
+                self.log_details(f"Applying {len(upstream_node.steps or [])} steps")
+                temp_path = self.cache.reserve(extension)
+                self.transform_and_write(
+                    upstream_node.steps,
+                    resource,
+                    load_node,
+                    preprocess=preprocess,
+                    target_path=temp_path,
+                )
+                cached_path = self.cache.commit(temp_path, fingerprint, extension)
+            else:
+                self.log_details("Output unchanged, served from cache")
+            self.publish_output(cached_path, load_node)
+        self.log_details(
+            f"Output file saved at {load_node.data.file_path} ({load_node.data.file_name})"
+        )
+        if self.checkpoint is not None:
+            self.checkpoint.complete_load(
+                upstream_node, load_node, self.fingerprints[upstream_node.id]
+            )
+        load_node.processed = True
+
+    def get_spill_directory(self) -> Optional[str]:
+        if self.workspace is None:
+            return None
+        return self.workspace.spill_directory
 
     def validate(self):
         # validate that all edges have valid node
-        print(00, flush=True)
         nodes_from_edges = set(
             [
                 node_id
@@ -238,103 +384,466 @@ class DataAndAnalytics:
             self.log_details("Invalid pipeline, some nodes are not connected")
             raise ValueError("Invalid pipeline, some nodes are not connected")
 
-        valid = self.is_acyclic(self.pipeline.nodes, self.pipeline.edges)
-        if not valid:
+        self.graph = PipelineGraph(self.pipeline)
+        try:
+            execution_order = self.graph.topological_order()
+        except ValueError:
             self.log_details(
                 "Invalid pipeline, cycle detected.Pipeline should be a Directed Acyclic Graph (DAG)"
             )
-            raise ValueError("Invalid pipeline, cycle detected")
-
-    def process(self):
-        start_time = datetime.now()
-        self.log_details(
-            "EBFlow Analytics | Data & Analytics pipeline process initiated"
+            raise
+
+        for node in execution_order:
+            if (
+                node.data.type == "transform"
+                and node.data.operation_name not in ["compare", "overlap"]
+                and len(self.graph.predecessors[node.id]) != 1
+            ):
+                self.log_details(
+                    f"Invalid pipeline, transform node {node.data.label} should have exactly one input"
+                )
+                raise ValueError("Invalid pipeline, transform node input mismatch")
+        return execution_order
+
+    def explain(self, sample_bytes: int = DEFAULT_SAMPLE_BYTES) -> PipelinePlan:
+        """
+        Plan of the pipeline without running it: the estimated rows read by
+        every node (from the source sizes and a sample of their rows), the full
+        passes its generated steps make and the steps that hold the whole table
+        in memory. `PipelinePlan.render()` prints it as a tree per load.
+        """
+        execution_order = self.validate()
+        schemas = propagate_schemas(
+            self.graph, execution_order, self.get_frictionless_object
         )
-        self.log_details("Validating Pipeline")
-        self.validate()
-        self.log_details("Pipeline Validated")
-        self.log_details(f"Total edges to process: {len(self.pipeline.edges)}")
-        for idx, item in enumerate(self.pipeline.edges):
-
-            source_node = self.get_node_details(item.source)
-            target_node = self.get_node_details(item.target)
+        return build_plan(self.graph, execution_order, sample_bytes, schemas=schemas)
+
+    def propagate_schemas(self, execution_order: List[Node]):
+        """
+        Derive the output schema of every node before any row is read, so
+        only sources are inferred and a column missing from the input of a
+        node fails the pipeline up front.
+        """
+        try:
+            self.schemas = propagate_schemas(
+                self.graph,
+                execution_order,
+                self.get_frictionless_object,
+                skipped=self.cached_nodes | self.completed_nodes,
+            )
+        except ValueError as e:
+            self.state = PipelineState.failed
+            self.log_details(f"Error: {str(e)}")
+            self.log_details(FAILED_MESSAGE)
+            raise ValueError("Invalid pipeline, schema mismatch")
 
+    def reject_oversized(self, execution_order: List[Node], max_materialized_rows: int):
+        plan = build_plan(self.graph, execution_order)
+        oversized = plan.find_oversized(max_materialized_rows)
+        if not oversized:
+            return
+        self.state = PipelineState.failed
+        for node in oversized:
             self.log_details(
-                f"Processing edge, {source_node.data.label} -> {target_node.data.label} ({idx + 1} of {len(self.pipeline.edges)})"
+                f"Error: node {node.label} would hold about {node.estimated_input_rows} rows "
+                f"in memory ({', '.join(node.materializes)}), "
+                f"the limit is {max_materialized_rows}"
             )
+        self.log_details(FAILED_MESSAGE)
+        raise ValueError("Invalid pipeline, estimated size exceeds the limit")
+
+    def process_node(self, node: Node, inputs: List[Node]):
+        try:
+            if node.data.type == "load":
+                # loads are profiled once per written input, in write_load
+                return self.run_node(node, inputs)
+            with self.profile_node(node):
+                return self.run_node(node, inputs)
+        finally:
+            # progress of every node is visible while the pipeline runs
+            self.flush_log()
+
+    def run_node(self, node: Node, inputs: List[Node]):
+        if node.id in self.cached_nodes:
+            self.log_details(f"Node {node.data.label} unchanged, served from cache")
+            node.processed = True
+            return
+        if node.id in self.completed_nodes:
+            self.log_details(f"Node {node.data.label} already completed, skipped on resume")
+            node.processed = True
+            return
 
-            # processing sources
-            if source_node.data.type == "extract" and source_node.processed == False:
-                print(f"SOURCE-EXTRACT-{source_node.id}")
-                self.log_details(source_node.data.__repr__())
-                res = self.get_frictionless_object(
-                    source_node.data.file_path, source_node.data.file_name
+        if node.data.type == "extract":
+            self.log_details(node.data.__repr__())
+            node.resource = self.get_frictionless_object(
+                node.data.file_path, node.data.file_name
+            )
+            if self.schemas.get(node.id) is not None:
+                # inferred once, when the schemas were propagated
+                node.resource.schema = self.schemas[node.id].to_copy()
+            self.log_details("Pointer created for the source file")
+            self.log_details("Extract node process complete")
+
+        elif node.data.type == "transform":
+            transform_step = self.generate_transform_step(node.data)
+            # compare and overlap materialise their own data source
+            if node.data.operation_name in ["compare", "overlap"]:
+                node.steps = transform_step["steps"]
+                node.resource = transform_step["data"]
+            else:
+                if self.profiler is not None:
+                    transform_step = self.profiler.instrument(transform_step, node)
+                upstream_node = inputs[0]
+                node.steps = (upstream_node.steps or []) + transform_step
+                node.resource = upstream_node.resource
+
+        else:
+            if self.fan_out:
+                # loads are written together once every node is planned
+                self.pending_loads.extend(
+                    (upstream_node, node) for upstream_node in inputs
                 )
-                self.update_visited_node(source_node.id, resource=res)
-                self.log_details("Pointer created for the source file")
-                self.log_details("Extract node process complete")
-
-            if source_node.data.type == "transform" and source_node.processed == False:
-                print(f"SOURCE-TRANSFORM-{source_node.id}")
-                transform_step = self.generate_transform_step(source_node.data)
-                # handle condition for compare
-                if source_node.data.operation_name in ["compare","overlap"]:
-                    generated_data = transform_step["data"]
-                    generated_steps = transform_step["steps"]
-                    self.update_visited_node(
-                        source_node.id,
-                        set_steps=generated_steps,
-                        resource=generated_data,
-                        data_file_name=transform_step["temp_file_name"],
-                    )
-                else:
-                    self.update_visited_node(source_node.id, set_steps=transform_step)
-
-            # processing targets
-            if target_node.data.type == "transform" and target_node.processed == False:
-                print(f"TARGET-TRANSFORM-{target_node.id}")
-                transform_step = self.generate_transform_step(target_node.data)
-                # handle condition for compare
-                if target_node.data.operation_name in ["compare","overlap"]:
-                    generated_data = transform_step["data"]
-                    print(
-                        f"--------------------------\n{source_node.steps} \n\n {transform_step}"
-                    )
-                    generated_steps = []
-                    self.update_visited_node(
-                        target_node.id,
-                        set_steps=generated_steps,
-                        resource=generated_data,
-                        data_file_name=transform_step["temp_file_name"],
+                return
+
+            for upstream_node in inputs:
+                self.write_load(upstream_node, node)
+
+        if self.checkpoint is not None and node.data.type != "load":
+            self.checkpoint.complete_node(node, self.fingerprints[node.id])
+        node.processed = True
+
+    def write_fan_out(self, loads: List[Tuple[Node, Node]]):
+        """
+        Write several loads that share one data source. The source is read and
+        normalised once and its rows are teed into every branch, which runs
+        its own steps on a separate thread.
+        """
+        source_node = loads[0][0]
+        self.log_details(
+            f"Fan-out, reading source once for {len(loads)} loads: "
+            + ", ".join(load_node.data.label for _, load_node in loads)
+        )
+        preprocessing_steps = DNATransformStep.generate_preprocessing_steps()
+        if self.profiler is not None:
+            preprocessing_steps = self.profiler.instrument(
+                preprocessing_steps, source_node
+            )
+        source = transform(source_node.resource.to_copy(), steps=preprocessing_steps)
+        with source:
+            tee = RowTee(
+                (row.to_list() for row in source.row_stream),
+                branches=len(loads),
+                buffer_rows=self.fan_out_buffer_rows,
+                spill_directory=self.fan_out_spill_directory
+                or self.get_spill_directory(),
+            )
+
+            def write_branch(branch, upstream_node, load_node):
+                try:
+                    branch_resource = TableResource(
+                        data=BranchReader(tee, branch, source.header.to_list()),
+                        schema=source.schema.to_copy(),
+                        format="inline",
                     )
-                else:
-                    if source_node.data.type == "transform":
-                        if source_node.steps != None:
-                            transform_step = source_node.steps + transform_step
-                    self.update_visited_node(
-                        target_node.id,
-                        set_steps=transform_step,
-                        resource=source_node.resource,
+                    self.write_load(
+                        upstream_node, load_node, resource=branch_resource, preprocess=False
                     )
+                finally:
+                    tee.release(branch)
+
+            try:
+                with ThreadPoolExecutor(max_workers=len(loads)) as executor:
+                    futures = [
+                        executor.submit(write_branch, branch, upstream_node, load_node)
+                        for branch, (upstream_node, load_node) in enumerate(loads)
+                    ]
+                for future in futures:
+                    future.result()
+            finally:
+                tee.close()
+        self.log_details(f"Fan-out complete, {tee.rows_read} rows read")
+
+    def write_pending_loads(self):
+        groups: Dict[int, List[Tuple[Node, Node]]] = {}
+        for upstream_node, load_node in self.pending_loads:
+            if self.is_cached_load(upstream_node, load_node) or self.is_completed_load(
+                upstream_node, load_node
+            ):
+                self.write_load(upstream_node, load_node)
+                continue
+            groups.setdefault(id(upstream_node.resource), []).append(
+                (upstream_node, load_node)
+            )
+        self.pending_loads = []
 
-            # processing load
-            if target_node.data.type == "load" and target_node.processed == False:
-                print(f"TARGET-LOAD-{target_node.id}")
-                self.log_details(target_node.data.__repr__())
-                self.log_details(f"Applying {len(source_node.steps or [])} steps")
-
-                status = self.transform_and_write(
-                    source_node.steps, source_node.resource, target_node
+        for loads in groups.values():
+            if len(loads) > 1:
+                self.write_fan_out(loads)
+            else:
+                self.write_load(*loads[0])
+
+    def process_node_with_limits(self, node: Node, limits: Dict[str, Any]):
+        # a node may be throttled both by its type ("load") and by its operation
+        keys = [key for key in (node.data.type, node.data.operation_name) if key in limits]
+        with ExitStack() as stack:
+            for key in keys:
+                stack.enter_context(limits[key])
+            self.process_node(node, self.graph.get_inputs(node.id))
+
+    def process_nodes_in_threads(
+        self,
+        execution_order: List[Node],
+        max_workers: int,
+        concurrency_limits: Dict[str, int],
+    ):
+        """
+        Run every node as soon as all of its inputs are done, so independent
+        branches progress at the same time on the thread pool.
+        """
+        limits = {
+            key: threading.BoundedSemaphore(value)
+            for key, value in concurrency_limits.items()
+        }
+        pending_inputs = {
+            node.id: len(self.graph.predecessors[node.id]) for node in execution_order
+        }
+        with ThreadPoolExecutor(max_workers=max_workers) as executor:
+            running = {}
+
+            def submit(node):
+                self.log_details(
+                    f"Processing node {node.data.label} ({len(running) + 1} running)"
+                )
+                running[executor.submit(self.process_node_with_limits, node, limits)] = node
+
+            for node in execution_order:
+                if pending_inputs[node.id] == 0:
+                    submit(node)
+
+            while running:
+                done, _ = wait(running, return_when=FIRST_COMPLETED)
+                for future in done:
+                    node = running.pop(future)
+                    if future.exception() is not None:
+                        for other in running:
+                            other.cancel()
+                        # let in-flight branches settle so the failure is logged last
+                        wait(running)
+                        self.log_details("Error: one or more pipeline branches failed")
+                        self.log_details(FAILED_MESSAGE)
+                        raise future.exception()
+                    for target in self.graph.successors[node.id]:
+                        pending_inputs[target] -= 1
+                        if pending_inputs[target] == 0:
+                            submit(self.graph.nodes[target])
+
+    def process_components_in_processes(self, max_workers: int, **options):
+        """
+        Run every independent sub-pipeline in its own worker process. Generated
+        steps cannot be pickled, so a whole branch is the unit of work here.
+        """
+        failed = False
+        with ProcessPoolExecutor(max_workers=max_workers) as executor:
+            futures = [
+                executor.submit(
+                    process_sub_pipeline, self.graph.subpipeline(component), options
                 )
+                for component in self.graph.components()
+            ]
+            for future in as_completed(futures):
+                result = future.result()
+                for entry in result["audit_trail"]:
+                    self.add_audit_entry(entry)
+                for node_id in result["processed"]:
+                    self.graph.nodes[node_id].processed = True
+                if self.checkpoint is not None:
+                    self.checkpoint.merge(result["checkpoint"])
+                if self.profiler is not None:
+                    self.profiler.merge(result["spans"])
+                failed = failed or result["state"] == PipelineState.failed
+
+        if failed:
+            self.state = PipelineState.failed
+            self.log_details("Error: one or more pipeline branches failed")
+            self.log_details(FAILED_MESSAGE)
+            raise ValueError(FAILED_ERROR)
+
+    def process(
+        self,
+        max_workers: int = 1,
+        executor: str = "thread",
+        concurrency_limits: Optional[Dict[str, int]] = None,
+        fan_out: bool = False,
+        cache: Optional[NodeOutputCache] = None,
+        checkpoint: Optional[PipelineCheckpoint] = None,
+        resume: bool = False,
+        max_materialized_rows: Optional[int] = None,
+        profiler: Optional[PipelineProfiler] = None,
+        optimize: bool = True,
+        log_sink: Optional[AuditLogSink] = None,
+        workspace: Optional[RunWorkspace] = None,
+    ):
+        """
+        Process the pipeline.
+
+        With `max_workers` > 1 independent branches run at the same time, either
+        on a thread pool (`executor="thread"`, suited to the blob I/O bound
+        loads) or on a process pool (`executor="process"`). `concurrency_limits`
+        caps how many nodes of a given type or operation run at once on the
+        thread pool, e.g. {"load": 4, "compare": 1}.
+
+        With `fan_out` the loads are deferred until every node is planned, and
+        loads that share a data source read it only once (see `write_fan_out`).
+
+        With a `cache`, load outputs are stored under the fingerprint of their
+        upstream subgraph; on a re-run only the nodes whose fingerprint changed
+        are computed again and everything else is served from the cache.
+
+        With a `checkpoint`, every completed node is recorded as the run goes.
+        After a failure, `resume=True` skips the loads that were already
+        written (as long as their inputs are unchanged) and continues from the
+        node that failed.
+
+        With `max_materialized_rows` the pipeline is planned first (see
+        `explain`) and rejected before anything runs when a node that holds the
+        whole table in memory is estimated to read more rows than that.
+
+        With a `profiler`, every node and every generated step is timed and
+        counted (see `PipelineProfiler`). An EXPLAIN ANALYZE style summary is
+        added to the audit trail, and `write_log_details` exports the spans
+        as JSON lines next to audit_trail.csv.
+
+        With `optimize` (the default) the step list of every load is optimized
+        before it runs: filters move ahead of computed columns they do not
+        read, and consecutive row-wise steps share one pass over the rows.
+
+        With a `log_sink` the audit trail is streamed as the pipeline runs
+        (see `AuditLogSink`) and only its last entries are kept in
+        `audit_trail`; `write_log_details` then closes the sink instead of
+        uploading the whole trail again. Workers of a process pool report
+        their entries once their branch is done.
+
+        Intermediate files (spills of group_by, duplicate and fan-out, copies
+        of cached outputs) go to a `workspace` of the run, by default one in
+        the system temporary directory (see `RunWorkspace`). It is removed
+        when the run ends. Workers of a process pool get a workspace nested
+        in it, each with the same quota.
+        """
+        if executor not in ["thread", "process"]:
+            raise ValueError(f"Invalid executor {executor}, use 'thread' or 'process'")
+        if resume and checkpoint is None:
+            raise ValueError("A checkpoint is required to resume a pipeline")
+
+        if log_sink is not None:
+            self.set_log_sink(log_sink)
+        start_time = datetime.now()
+        self.log_details(
+            "EBFlow Analytics | Data & Analytics pipeline process initiated"
+        )
+        self.log_details("Validating Pipeline")
+        execution_order = self.validate()
+        self.log_details("Pipeline Validated")
+        if max_materialized_rows is not None:
+            self.reject_oversized(execution_order, max_materialized_rows)
+        self.log_details(f"Total nodes to process: {len(execution_order)}")
+        self.fan_out = fan_out
+        self.cache = cache
+        self.checkpoint = checkpoint
+        self.profiler = profiler
+        self.optimize = optimize
+        self.workspace = workspace or RunWorkspace()
+        self.workspace.open()
+        if cache is not None or checkpoint is not None:
+            self.fingerprints = compute_fingerprints(self.graph, execution_order)
+        if cache is not None:
+            self.cached_nodes = self.find_cached_nodes(execution_order)
+        if checkpoint is not None:
+            if resume:
+                self.completed_nodes = self.find_completed_nodes(execution_order)
                 self.log_details(
-                    f"Output file saved at {target_node.data.file_path} ({target_node.data.file_name})"
+                    f"Resuming pipeline, {len(self.completed_nodes)} nodes already completed"
+                )
+            else:
+                checkpoint.reset()
+            checkpoint.set_state(PipelineState.initiated.value)
+        if profiler is not None:
+            profiler.start()
+        try:
+            self.propagate_schemas(execution_order)
+            if max_workers > 1 and executor == "process":
+                self.process_components_in_processes(
+                    max_workers,
+                    fan_out=fan_out,
+                    cache=cache,
+                    checkpoint=checkpoint and checkpoint.detached(),
+                    resume=resume,
+                    profiler=profiler and profiler.detached(),
+                    optimize=optimize,
+                    workspace=self.workspace.detached(max_workers),
+                )
+            elif max_workers > 1:
+                self.process_nodes_in_threads(
+                    execution_order, max_workers, concurrency_limits or {}
                 )
-                self.update_load_node(target_node.id, status)
+            else:
+                for idx, node in enumerate(execution_order):
+                    self.log_details(
+                        f"Processing node {node.data.label} ({idx + 1} of {len(execution_order)})"
+                    )
+                    self.process_node(node, self.graph.get_inputs(node.id))
+            self.write_pending_loads()
+        except Exception:
+            if checkpoint is not None:
+                checkpoint.set_state(PipelineState.failed.value)
+            raise
+        finally:
+            self.workspace.close()
+            if profiler is not None:
+                profiler.stop()
+            self.flush_log()
 
         end_time = datetime.now()
         self.log_details(
             "EBFlow Analytics | Data & Analytics pipeline process completed"
         )
         self.log_details(f"Time taken: {end_time - start_time}")
+        if profiler is not None:
+            for line in profiler.summary():
+                self.log_details(line)
+        self.flush_log()
         self.state = PipelineState.processed
+        if checkpoint is not None:
+            checkpoint.set_state(PipelineState.processed.value)
         return self.pipeline
+
+
+def process_sub_pipeline(
+    pipeline: AnalyticsPipeline, options: Dict[str, Any]
+) -> Dict[str, Any]:
+    """
+    Entry point of a process pool worker, runs one independent branch and
+    reports back what happened. Labels are kept from the parent pipeline.
+    Only the checkpoint records of the branch's own nodes are reported: the
+    copies of other branches' records are stale once those branches run.
+    """
+    labels = {node.id: node.data.label for node in pipeline.nodes}
+    analytics = DataAndAnalytics(pipeline=pipeline)
+    for node in pipeline.nodes:
+        node.data.label = labels[node.id]
+    try:
+        analytics.process(**options)
+    except Exception:
+        analytics.state = PipelineState.failed
+    return {
+        "audit_trail": analytics.audit_trail,
+        "processed": [node.id for node in pipeline.nodes if node.processed],
+        "checkpoint": {
+            node_id: record
+            for node_id, record in analytics.checkpoint.nodes.items()
+            if node_id in labels
+        }
+        if analytics.checkpoint
+        else {},
+        "spans": analytics.profiler.spans if analytics.profiler else [],
+        "state": analytics.state,
+    }
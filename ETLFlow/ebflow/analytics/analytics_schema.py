@@ -1,9 +1,10 @@
 from datetime import datetime
 from typing import Any, List, Dict, Optional
 from pydantic import BaseModel, model_validator
-import random
+from ebflow.analytics.expressions import CompiledExpression
 
 PIPELINE_MAP_NAME = "pipeline_map.json"
+PIPELINE_CHECKPOINT_NAME = "pipeline_checkpoint.json"
 
 
 class Position(BaseModel):
@@ -14,6 +15,8 @@ class Position(BaseModel):
 class MultipleCalculationData(BaseModel):
     expression: str
     column: Dict[str, str]
+    # evaluate over column arrays, with NumPy when installed (float results)
+    vectorized: Optional[bool] = False
 
     @model_validator(mode="before")
     def validate_multi_calculation_data(cls, values):
@@ -25,38 +28,8 @@ class MultipleCalculationData(BaseModel):
 
         values["expression"] = values["expression"].replace("^", "**")
 
-        variables_used = list(values["column"].keys())
-        expression = values["expression"].strip().replace(" ", "")
-
-        for variable in variables_used:
-            expression = expression.replace(
-                variable,
-                random.choice(
-                    [
-                        "1.0",
-                        "2.0",
-                        "3.0",
-                        "4.0",
-                        "5.0",
-                        "6.0",
-                        "7.0",
-                        "8.0",
-                        "9.0",
-                        "10.0",
-                    ]
-                ),
-            )
-
-        try:
-            eval(expression)
-        except SyntaxError:
-            raise ValueError("Expression is syntactically incorrect")
-        except ZeroDivisionError:
-            raise ValueError("Expression contains division by zero")
-        except NameError as e:
-            raise ValueError("Expression contains extra variables")
-        except Exception as e:
-            raise ValueError("Invalid expression")
+        # raises a ValueError describing what is wrong with the expression
+        CompiledExpression(values["expression"], values["column"])
 
         return values
 
@@ -73,6 +46,104 @@ class AggregationType(FilterOperations):
     data_types: List[str]
 
 
+GROUP_BY_AGGREGATION_TYPES = ["sum", "min", "max", "count", "avg"]
+
+
+class GroupByAggregation(BaseModel):
+    """An additional aggregate of a group_by node, computed in the same pass."""
+
+    column_name: str | ColumnOption
+    aggregation_type: str | AggregationType
+    unique: Optional[bool] = False
+
+    @model_validator(mode="before")
+    def validate_group_by_aggregation(cls, values):
+        if not values.get("column_name"):
+            raise ValueError("column_name is required for aggregation")
+        if not values.get("aggregation_type"):
+            raise ValueError("Aggregation Type is required for aggregation")
+
+        if isinstance(values["column_name"], str):
+            values["column_name"] = ColumnOption(
+                title=values["column_name"], value=values["column_name"]
+            )
+        if isinstance(values["aggregation_type"], str):
+            values["aggregation_type"] = AggregationType(
+                title=values["aggregation_type"],
+                value=values["aggregation_type"],
+                data_types=["string", "number"],
+            )
+
+        aggregation_type = values["aggregation_type"]
+        if isinstance(aggregation_type, dict):
+            aggregation_type = AggregationType(**aggregation_type)
+        if aggregation_type.value not in GROUP_BY_AGGREGATION_TYPES:
+            raise ValueError("Invalid aggregation type for aggregation")
+        return values
+
+
+FILTER_GROUPS = ["and", "or", "not"]
+FILTER_COMPARISONS = ["==", "!=", ">", "<", ">=", "<=", "in", "not_in", "between"]
+
+
+class FilterCondition(BaseModel):
+    """
+    A node of the boolean expression tree of a compound_filter: either a
+    group of conditions (and, or, not) or a comparison of a column with a
+    value. `in` and `not_in` take a list of values, `between` a [low, high]
+    list, both ends included.
+    """
+
+    operator: str
+    column_name: Optional[str | ColumnOption] = None
+    value: Optional[Any] = None
+    conditions: Optional[List["FilterCondition"]] = None
+
+    def __repr__(self):
+        if self.operator == "not":
+            return f"not {self.conditions[0].__repr__()}"
+        if self.operator in FILTER_GROUPS:
+            return f"({f' {self.operator} '.join(item.__repr__() for item in self.conditions)})"
+        value = self.value
+        if isinstance(value, list):
+            value = f"[{', '.join(str(item) for item in value)}]"
+        return f"{self.column_name.value} {self.operator} {value}"
+
+    def get_columns(self) -> List[str]:
+        if self.operator in FILTER_GROUPS:
+            return [column for item in self.conditions for column in item.get_columns()]
+        return [self.column_name.value]
+
+    @model_validator(mode="before")
+    def validate_filter_condition(cls, values):
+        operator = values.get("operator")
+        if operator in FILTER_GROUPS:
+            conditions = values.get("conditions")
+            if not conditions:
+                raise ValueError(f"Conditions are required for {operator}")
+            if operator == "not" and len(conditions) != 1:
+                raise ValueError("not takes exactly one condition")
+            return values
+        if operator not in FILTER_COMPARISONS:
+            raise ValueError(f"Invalid filter operator {operator}")
+        if not values.get("column_name"):
+            raise ValueError("column_name is required for filter condition")
+        if values.get("value") is None:
+            raise ValueError("value is required for filter condition")
+        if operator in ["in", "not_in"] and not isinstance(values["value"], list):
+            raise ValueError(f"value should be a list for {operator}")
+        if operator == "between" and (
+            not isinstance(values["value"], list) or len(values["value"]) != 2
+        ):
+            raise ValueError("value should be a [low, high] list for between")
+
+        if isinstance(values["column_name"], str):
+            values["column_name"] = ColumnOption(
+                title=values["column_name"], value=values["column_name"]
+            )
+        return values
+
+
 weekday_names = {
     0: "Monday",
     1: "Tuesday",
@@ -111,8 +182,14 @@ class NodeData(BaseModel):
     is_bkd_custom: Optional[bool] = None
     group_by: Optional[List[str | ColumnOption]] = None
     aggregation_type: Optional[str | AggregationType] = None
+    aggregations: Optional[List[GroupByAggregation]] = None  # applicable for group_by
+    statistics: Optional[bool] = None  # applicable for avg
+    exact: Optional[bool] = None  # applicable for avg
+    keep: Optional[str] = None  # applicable for duplicate: first, last or all
     compare_columns: Optional[List[str | ColumnOption]] = None  # applicable for compare
-    matching_columns: Optional[List[str | ColumnOption]] = None  # applicable for compare
+    matching_columns: Optional[List[str | ColumnOption]] = None  # applicable for compare and overlap
+    match_count: Optional[bool] = None  # applicable for overlap
+    condition: Optional[FilterCondition] = None  # applicable for compound_filter
     datasource: Optional[List[str]] = None  # applicable for compare
 
     def __repr__(self):
@@ -145,6 +222,18 @@ class NodeData(BaseModel):
                 node_representation += (
                     f" is {self.operation_formula.title} {self.operation_value.value}"
                 )
+            elif self.operation_name == "compound_filter":
+                node_representation += f" where {self.condition.__repr__()}"
+            elif self.operation_name == "duplicate":
+                if self.column_name:
+                    node_representation += f" on {', '.join([col.value for col in self.column_name])}"
+                if self.keep:
+                    node_representation += f" keeping {self.keep}"
+            elif self.operation_name == "avg":
+                if self.statistics:
+                    node_representation += " with statistics"
+                if self.exact:
+                    node_representation += " (exact)"
             elif self.operation_name == "count":
                 if self.unique is True:
                     node_representation += " unique"
@@ -183,11 +272,15 @@ class NodeData(BaseModel):
 
             elif self.operation_name == "group_by":
                 node_representation += f" with group by {', '.join([col.value for col in self.group_by])} and aggregation type {self.aggregation_type.value}"
+                for aggregation in self.aggregations or []:
+                    node_representation += f", {aggregation.aggregation_type.value} on {aggregation.column_name.value}"
 
                 if self.aggregation_type == "count" and self.unique:
                     node_representation += " unique"
             elif self.operation_name == "compare":
-                node_representation += f" with compare columns {', '.join(self.compare_columns)} and matching columns {', '.join(self.matching_columns)}"
+                node_representation += f" with compare columns {', '.join([col.value for col in self.compare_columns])} and matching columns {', '.join([col.value for col in self.matching_columns])}"
+            elif self.operation_name == "overlap" and self.matching_columns:
+                node_representation += f" with matching columns {', '.join([col.value for col in self.matching_columns])}"
 
         return node_representation
 
@@ -248,7 +341,7 @@ class NodeData(BaseModel):
             "group_by",
             "compare",
             "overlap",
-
+            "compound_filter",
         ]:
             raise ValueError("Invalid operation name for transform node")
 
@@ -306,6 +399,21 @@ class NodeData(BaseModel):
                     title=values["operation_value"], value=values["operation_value"]
                 )
 
+        elif values["operation_name"] == "duplicate":
+            # optional key columns, the whole row is compared without them
+            column_name = values.get("column_name")
+            if isinstance(column_name, (str, ColumnOption)):
+                column_name = [column_name]
+            if column_name:
+                values["column_name"] = [
+                    ColumnOption(title=column, value=column)
+                    if isinstance(column, str)
+                    else column
+                    for column in column_name
+                ]
+            if values.get("keep") and values["keep"] not in ["first", "last", "all"]:
+                raise ValueError("Keep should be one of first, last or all")
+
         elif values["operation_name"] == "count":
             if "unique" not in values.keys() or values["unique"] is None:
                 raise ValueError("Unique is required for operation")
@@ -351,7 +459,7 @@ class NodeData(BaseModel):
                     data_types=["string", "number"],
                 )
 
-            if values["aggregation_type"].value not in ["sum", "min", "max", "count", "avg"]:
+            if values["aggregation_type"].value not in GROUP_BY_AGGREGATION_TYPES:
                 raise ValueError("Invalid aggregation type for operation")
 
             if values["aggregation_type"] == "count":
@@ -387,6 +495,21 @@ class NodeData(BaseModel):
                 new_matching_columns.append(column)
             values["matching_columns"] = new_matching_columns
 
+        elif values["operation_name"] == "compound_filter":
+            if not values.get("condition"):
+                raise ValueError("condition is required for operation")
+
+        elif values["operation_name"] == "overlap":
+            if not values.get("datasource"):
+                raise ValueError("Datasource is required for operation")
+
+            # rows are compared whole without matching columns
+            new_matching_columns = []
+            for column in values.get("matching_columns") or []:
+                if isinstance(column, str):
+                    column = ColumnOption(title=column, value=column)
+                new_matching_columns.append(column)
+            values["matching_columns"] = new_matching_columns or None
 
         return values
 
@@ -404,7 +527,6 @@ class Node(BaseModel):
     processed: Optional[bool] = False
     steps: Optional[List[Any]] = None
     resource: Optional[Any] = None
-    data_file_name: Optional[str] = None  # applicable for compare
 
 
 class Edge(BaseModel):
@@ -435,6 +557,9 @@ class PipelineMapDetails(BaseModel):
 
         return f"{initial_directory}/{pipeline_map_path}"
 
+    def get_checkpoint_path(self):
+        return self.get_file_path().replace(PIPELINE_MAP_NAME, PIPELINE_CHECKPOINT_NAME)
+
 
 class ListPipeLineMaps(BaseModel):
     audit_firm: str
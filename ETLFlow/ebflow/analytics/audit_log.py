@@ -0,0 +1,153 @@
+import csv
+import io
+import os
+import threading
+from typing import Dict, Iterator, List, Optional
+
+from ebflow.analytics.checkpoint import is_blob_path
+
+AUDIT_TRAIL_HEADER = ["timestamp", "message"]
+DEFAULT_BATCH_SIZE = 50
+DEFAULT_KEEP_ENTRIES = 200
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+DEFAULT_BACKUP_COUNT = 5
+
+
+def to_csv(rows: List[List[str]]) -> str:
+    content = io.StringIO()
+    csv.writer(content, lineterminator="\n").writerows(rows)
+    return content.getvalue()
+
+
+def get_rotated_path(path: str, index: int) -> str:
+    root, extension = os.path.splitext(path)
+    return f"{root}.{index}{extension}"
+
+
+class AuditLogSink:
+    """
+    Streams the audit trail of a pipeline run, passed as
+    `process(log_sink=AuditLogSink(path))`.
+
+    Entries are buffered and flushed every `batch_size` entries and after
+    every node, so the progress of a long run can be followed while it runs
+    and a crashed run still leaves its log behind.
+
+    With an Azure blob URL the entries are appended to an append blob. With
+    a local path they are appended to a CSV file, rotated once it grows over
+    `max_bytes` (`backup_count` older files are kept), and shipped in one
+    upload to `ship_to` by `close()`.
+
+    Only the last `keep_entries` entries stay in memory, in
+    `DataAndAnalytics.audit_trail`.
+    """
+
+    def __init__(
+        self,
+        path: str,
+        ship_to: Optional[str] = None,
+        batch_size: int = DEFAULT_BATCH_SIZE,
+        keep_entries: int = DEFAULT_KEEP_ENTRIES,
+        max_bytes: int = DEFAULT_MAX_BYTES,
+        backup_count: int = DEFAULT_BACKUP_COUNT,
+    ):
+        self.path = path
+        self.ship_to = ship_to
+        self.batch_size = batch_size
+        self.keep_entries = keep_entries
+        self.max_bytes = max_bytes
+        self.backup_count = backup_count
+        self.buffer: List[Dict[str, str]] = []
+        self.entries_written = 0
+        self.opened = False
+        self.blob_client = None
+        self.lock = threading.Lock()
+
+    def write(self, entry: Dict[str, str]):
+        with self.lock:
+            self.buffer.append(entry)
+            if len(self.buffer) >= self.batch_size:
+                self.flush_buffer()
+
+    def flush(self):
+        with self.lock:
+            self.flush_buffer()
+
+    def close(self):
+        """Flush the remaining entries and ship the local log, if asked to."""
+        with self.lock:
+            self.flush_buffer()
+            if self.opened and self.ship_to is not None and not is_blob_path(self.path):
+                self.ship()
+
+    def open(self):
+        header = to_csv([AUDIT_TRAIL_HEADER])
+        if is_blob_path(self.path):
+            from frictionless_azureblob import create_blob_client
+
+            self.blob_client = create_blob_client(self.path)
+            # replaces the log of a previous run, as the whole CSV upload did
+            self.blob_client.create_append_blob()
+            self.blob_client.append_block(header.encode("utf-8"))
+        else:
+            os.makedirs(os.path.dirname(os.path.abspath(self.path)), exist_ok=True)
+            with open(self.path, "w", newline="") as file:
+                file.write(header)
+        self.opened = True
+
+    def flush_buffer(self):
+        if not self.buffer:
+            return
+        if not self.opened:
+            self.open()
+        content = to_csv(
+            [[entry[key] for key in AUDIT_TRAIL_HEADER] for entry in self.buffer]
+        )
+        if self.blob_client is not None:
+            self.blob_client.append_block(content.encode("utf-8"))
+        else:
+            self.write_local(content)
+        self.entries_written += len(self.buffer)
+        self.buffer = []
+
+    def write_local(self, content: str):
+        size = os.path.getsize(self.path)
+        if size + len(content) > self.max_bytes and size > len(to_csv([AUDIT_TRAIL_HEADER])):
+            self.rotate()
+        with open(self.path, "a", newline="") as file:
+            file.write(content)
+
+    def rotate(self):
+        for index in range(self.backup_count, 0, -1):
+            source = self.path if index == 1 else get_rotated_path(self.path, index - 1)
+            if os.path.exists(source):
+                os.replace(source, get_rotated_path(self.path, index))
+        with open(self.path, "w", newline="") as file:
+            file.write(to_csv([AUDIT_TRAIL_HEADER]))
+
+    def get_local_files(self) -> List[str]:
+        """The local log files, oldest first."""
+        files = [
+            get_rotated_path(self.path, index)
+            for index in range(self.backup_count, 0, -1)
+        ] + [self.path]
+        return [path for path in files if os.path.exists(path)]
+
+    def read_local(self) -> Iterator[bytes]:
+        """The local log files as one CSV, with a single header."""
+        for idx, path in enumerate(self.get_local_files()):
+            with open(path, "rb") as file:
+                if idx > 0:
+                    file.readline()
+                for line in file:
+                    yield line
+
+    def ship(self):
+        if is_blob_path(self.ship_to):
+            from frictionless_azureblob import create_blob_client
+
+            create_blob_client(self.ship_to).upload_blob(self.read_local(), overwrite=True)
+            return
+        os.makedirs(os.path.dirname(os.path.abspath(self.ship_to)), exist_ok=True)
+        with open(self.ship_to, "wb") as file:
+            file.writelines(self.read_local())
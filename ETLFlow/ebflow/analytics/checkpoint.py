@@ -0,0 +1,127 @@
+import json
+import os
+import tempfile
+import threading
+from datetime import datetime
+from typing import Any, Dict, Optional
+
+from ebflow.analytics.analytics_schema import Node
+
+
+def is_blob_path(path: str) -> bool:
+    return path.startswith("http://") or path.startswith("https://")
+
+
+class PipelineCheckpoint:
+    """
+    Progress of a pipeline run, persisted after every completed node so a
+    failed run can be resumed with `process(checkpoint=..., resume=True)`.
+
+    For every completed node the checkpoint keeps its fingerprint (see
+    `compute_fingerprints`) and, for loads, the fingerprint of each input that
+    was written together with the output location. A load is only skipped on
+    resume when the fingerprint of its input is unchanged.
+
+    `path` is a local file or an Azure blob URL, usually
+    `PipelineMapDetails.get_checkpoint_path()` next to `pipeline_map.json`.
+    Without a path the checkpoint is kept in memory only.
+    """
+
+    def __init__(self, path: Optional[str] = None, nodes: Optional[Dict] = None):
+        self.path = path
+        self.nodes: Dict[str, Dict[str, Any]] = nodes or {}
+        self.state: Optional[str] = None
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def load(self) -> "PipelineCheckpoint":
+        content = None
+        if self.path is None:
+            return self
+        if is_blob_path(self.path):
+            from azure.core.exceptions import ResourceNotFoundError
+            from frictionless_azureblob import create_blob_client
+
+            try:
+                content = create_blob_client(self.path).download_blob().readall()
+            except ResourceNotFoundError:
+                pass
+        elif os.path.exists(self.path):
+            with open(self.path, "rb") as file:
+                content = file.read()
+
+        if content:
+            data = json.loads(content)
+            self.nodes = data.get("nodes", {})
+            self.state = data.get("state")
+        return self
+
+    def save(self):
+        if self.path is None:
+            return
+        content = json.dumps(
+            {"state": self.state, "nodes": self.nodes}, indent=2
+        ).encode("utf-8")
+        if is_blob_path(self.path):
+            from frictionless_azureblob import create_blob_client
+
+            create_blob_client(self.path).upload_blob(content, overwrite=True)
+            return
+        directory = os.path.dirname(os.path.abspath(self.path))
+        os.makedirs(directory, exist_ok=True)
+        # write and rename, so a crash never leaves a half written checkpoint
+        file_descriptor, temp_path = tempfile.mkstemp(dir=directory)
+        with os.fdopen(file_descriptor, "wb") as file:
+            file.write(content)
+        os.replace(temp_path, self.path)
+
+    def reset(self):
+        with self.lock:
+            self.nodes = {}
+            self.state = None
+            self.save()
+
+    def detached(self) -> "PipelineCheckpoint":
+        """In-memory copy, for worker processes that report back to the parent."""
+        return PipelineCheckpoint(
+            nodes={node_id: dict(record) for node_id, record in self.nodes.items()}
+        )
+
+    def merge(self, nodes: Dict[str, Dict[str, Any]]):
+        with self.lock:
+            self.nodes.update(nodes)
+            self.save()
+
+    def complete_node(self, node: Node, fingerprint: str):
+        with self.lock:
+            record = self.nodes.setdefault(node.id, {})
+            record["fingerprint"] = fingerprint
+            record["completed_at"] = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+            self.save()
+
+    def complete_load(self, upstream_node: Node, load_node: Node, fingerprint: str):
+        with self.lock:
+            record = self.nodes.setdefault(load_node.id, {})
+            record.setdefault("inputs", {})[upstream_node.id] = fingerprint
+            record["output"] = load_node.data.file_path
+            record["completed_at"] = datetime.utcnow().strftime("%Y-%m-%dT%H:%M:%SZ")
+            self.save()
+
+    def is_load_completed(
+        self, upstream_node: Node, load_node: Node, fingerprint: str
+    ) -> bool:
+        record = self.nodes.get(load_node.id, {})
+        return record.get("inputs", {}).get(upstream_node.id) == fingerprint
+
+    def set_state(self, state: str):
+        with self.lock:
+            self.state = state
+            self.save()
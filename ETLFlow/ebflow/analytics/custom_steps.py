@@ -1,12 +1,38 @@
-import hashlib
+from copy import deepcopy
 import attrs
 import petl as etl
+import simpleeval
 from decimal import Decimal
-from datetime import datetime, timedelta
-from typing import List, Any, Dict
-from frictionless import Resource, Step, fields
+from datetime import date, datetime
+from typing import List, Any, Dict, Optional
+from frictionless import Field, Resource, Step, fields
+from petl.util.base import Record
 from frictionless.resources import TableResource
 from frictionless.transformer.transformer import DataWithErrorHandling
+from ebflow.analytics.aggregates import (
+    DEFAULT_MAX_GROUPS,
+    StatisticsAccumulator,
+    create_accumulator,
+    hash_aggregate,
+)
+from ebflow.analytics.duplicates import (
+    DEFAULT_MAX_KEYS,
+    flag_duplicates_in_rows,
+    get_key_digest,
+)
+from ebflow.analytics.expressions import DEFAULT_BATCH_ROWS, CompiledExpression, get_numpy
+from ebflow.analytics.joins import compare_values, hash_outer_join
+from ebflow.analytics.predicates import CompiledPredicate
+from ebflow.analytics.temporal import (
+    DEFAULT_MAX_PARSED,
+    DateBatch,
+    DateParser,
+    get_flag_values,
+    get_microseconds,
+    get_weekdays,
+    to_date,
+    to_time,
+)
 
 
 @attrs.define(kw_only=True, repr=False)
@@ -68,25 +94,29 @@ class eb_filter(Step):
         elif self.operation == "<=":
             return lambda row: row[self.column_name] <= row[check_field]
 
-    def transform_resource(self, resource):
-        table = resource.to_petl()
-        field = resource.schema.get_field(self.column_name)
+    def get_predicate(self, schema):
+        """Row predicate for the given schema, None when the rows are kept as they are."""
+        field = schema.get_field(self.column_name)
         value_field = None
         try:
-            value_field = resource.schema.get_field(self.value)
+            value_field = schema.get_field(self.value)
         except Exception:
             pass
         try:
             if value_field:
-                lambda_func = self.get_filter_function_for_column(value_field.name)
-                filtered_data = etl.select(table, lambda_func)
-            else:
-                value_new = self.get_value_with_data_type(field, self.value)
-                lambda_func = self.get_filter_function(value_new)
-                filtered_data = etl.select(table, lambda_func)
+                return self.get_filter_function_for_column(value_field.name)
+            value_new = self.get_value_with_data_type(field, self.value)
+            return self.get_filter_function(value_new)
         except Exception:
-            filtered_data = table
-        resource.data = filtered_data
+            return None
+
+    def transform_resource(self, resource):
+        table = resource.to_petl()
+        lambda_func = self.get_predicate(resource.schema)
+        if lambda_func is None:
+            resource.data = table
+        else:
+            resource.data = etl.select(table, lambda_func)
 
     # Metadata
 
@@ -99,28 +129,93 @@ class eb_filter(Step):
     }
 
 
+@attrs.define(kw_only=True, repr=False)
+class compound_filter(Step):
+    """
+    Keep the rows matching `condition`, a FilterCondition tree over several
+    columns, compiled once into a single predicate (see CompiledPredicate).
+    Unlike eb-filter, an invalid condition fails instead of keeping every
+    row. `kept` and `dropped` count the rows of the last run.
+    """
+
+    type = "compound-filter"
+    counts = (0, 0)
+
+    condition: Any
+    label: Optional[str] = None
+    # Transform
+
+    @property
+    def kept(self) -> int:
+        return self.counts[0]
+
+    @property
+    def dropped(self) -> int:
+        return self.counts[1]
+
+    def get_predicate(self, schema):
+        """Counting row predicate for the given schema."""
+        function = CompiledPredicate(self.condition, schema).function
+        # counted per run, a branch of a fan-out can run the same step
+        counts = [0, 0]
+        self.counts = counts
+
+        def predicate(row):
+            if function(row):
+                counts[0] += 1
+                return True
+            counts[1] += 1
+            return False
+
+        return predicate
+
+    def transform_resource(self, resource: Resource):
+        table = resource.to_petl()  # type: ignore
+        predicate = self.get_predicate(resource.schema)
+
+        def data():
+            rows = iter(table)
+            yield list(next(rows))
+            for row in rows:
+                if predicate(row):
+                    yield row
+
+        resource.data = data
+
+    # Metadata
+
+    metadata_profile_patch = {
+        "type": "object",
+        "required": ["condition"],
+        "properties": {
+            "condition": {},
+            "label": {"type": "string"},
+        },
+    }
+
+
 class identify_duplicate:
-    def __init__(self):
-        self.hash_values = []
+    """
+    Row function flagging every occurrence of a row, or of its `key_columns`,
+    after the first. Keys are kept as digests in a set (see `flag_duplicates`
+    for the other flagging modes and bounded memory).
+    """
+
+    def __init__(self, key_columns: Optional[List[str]] = None):
+        self.key_columns = key_columns
+        self.hash_values = set()
 
     def __call__(self, row):
-        row_str = ",".join(map(str, row))
-        hash_object = hashlib.sha256()
-        hash_object.update(row_str.encode("utf-8"))
-        hash_value = hash_object.hexdigest()
-        is_duplicate = False
+        values = row if self.key_columns is None else [row[name] for name in self.key_columns]
+        hash_value = get_key_digest(values)
         if hash_value in self.hash_values:
-            is_duplicate = True
-        else:
-            self.hash_values.append(hash_value)
-        if is_duplicate:
             return "Y"
-        else:
-            return "N"
+        self.hash_values.add(hash_value)
+        return "N"
 
 
 class non_working_days:
-    custom_dates: List[str]
+    custom_dates: List[date]
     weekdays: List[int]
     date_column: str
 
@@ -128,27 +223,34 @@ class non_working_days:
         try:
             self.weekdays = weekdays
             self.date_column = date_column
-            self.custom_dates = [
-                datetime.fromisoformat(dt).strftime("%Y-%m-%d") for dt in custom_dates
-            ]
+            self.custom_dates = [datetime.fromisoformat(dt).date() for dt in custom_dates]
         except Exception as ex:
             raise ValueError(f"Error in Custom Date for 'Non-Working Days': {str(ex)}")
+        self.non_working_weekdays = set(weekdays)
+        self.holidays = set(self.custom_dates)
+        self.columns = [date_column]
+        self.parse = DateParser()
 
     def __call__(self, row):
-        is_non_working_day = "N"
-        value_to_check = row[self.date_column]
-        date_in_string_format = (
-            value_to_check.strftime("%Y-%m-%d")
-            if isinstance(value_to_check, datetime)
-            else value_to_check
-        )
+        value_to_check = to_date(self.parse(row[self.date_column]))
+        if value_to_check is None:
+            return None
         if (
-            value_to_check.weekday() in self.weekdays
-            or date_in_string_format in self.custom_dates
+            value_to_check.weekday() in self.non_working_weekdays
+            or value_to_check in self.holidays
         ):
-            is_non_working_day = "Y"
+            return "Y"
+        return "N"
 
-        return is_non_working_day
+    def evaluate_batch(self, batch: DateBatch) -> List[Any]:
+        """The flags of a batch, as NumPy array operations on datetime64 days."""
+        numpy = batch.numpy
+        days = batch.get_days(self.date_column)
+        holidays = numpy.array(sorted(self.holidays), dtype="datetime64[D]")
+        flags = numpy.isin(
+            get_weekdays(days), list(self.non_working_weekdays)
+        ) | numpy.isin(days, holidays)
+        return get_flag_values(numpy, flags, ~numpy.isnat(days))
 
 
 class outside_working_hours:
@@ -160,15 +262,32 @@ class outside_working_hours:
         self.start_time = start_time
         self.end_time = end_time
         self.date_column = date_column
+        try:
+            self.start = datetime.strptime(start_time, "%H:%M").time()
+            self.end = datetime.strptime(end_time, "%H:%M").time()
+        except Exception as ex:
+            raise ValueError(f"Error in Working Hours for 'Outside Working Hours': {str(ex)}")
+        self.columns = [date_column]
+        self.parse = DateParser()
 
     def __call__(self, row):
-        is_outside_working_hours = "N"
-        value_to_check = row[self.date_column]
-        if (
-            value_to_check.time() < datetime.strptime(self.start_time, "%H:%M").time()
-        ) or (value_to_check.time() > datetime.strptime(self.end_time, "%H:%M").time()):
-            is_outside_working_hours = "Y"
-        return is_outside_working_hours
+        value_to_check = to_time(self.parse(row[self.date_column]))
+        if value_to_check is None:
+            return None
+        if value_to_check < self.start or value_to_check > self.end:
+            return "Y"
+        return "N"
+
+    def evaluate_batch(self, batch: DateBatch) -> List[Any]:
+        """The flags of a batch, comparing the times of day in microseconds."""
+        numpy = batch.numpy
+        times = batch.get_times_of_day(self.date_column)
+        valid = ~numpy.isnat(times)
+        microseconds = times.view("int64")
+        flags = (microseconds < get_microseconds(self.start)) | (
+            microseconds > get_microseconds(self.end)
+        )
+        return get_flag_values(numpy, flags, valid)
 
 
 class backdating:
@@ -182,49 +301,145 @@ class backdating:
         self.date_column = date_column
         self.is_bkd_custom = is_bkd_custom
         self.bkd_column = bkd_column
+        self.columns = [date_column]
         if is_bkd_custom:
             try:
                 self.custom_date = datetime.fromisoformat(bkd_column).date()
             except Exception as ex:
                 raise ValueError(f"Error in Custom Date for 'Backdating': {str(ex)}")
+        else:
+            self.columns.append(bkd_column)
+        self.parse = DateParser()
 
     def __call__(self, row):
-        value = None
-        value_to_check = (
-            datetime.fromisoformat(row[self.date_column])
-            if isinstance(row[self.date_column], str)
-            else row[self.date_column]
-        )
-        value_to_check = (
-            value_to_check.date()
-            if isinstance(value_to_check, datetime)
-            else value_to_check
-        )
+        value_to_check = to_date(self.parse(row[self.date_column]))
         if self.is_bkd_custom:
-            value = self.custom_date - value_to_check
+            bkd_value = self.custom_date
         else:
-            bkd_value = (
-                datetime.fromisoformat(row[self.bkd_column])
-                if isinstance(row[self.bkd_column], str)
-                else row[self.bkd_column]
-            )
-            bkd_value = (
-                bkd_value.date() if isinstance(bkd_value, datetime) else bkd_value
-            )
-            if value_to_check is None or bkd_value is None:
-                value = timedelta(days=0)
-            else:
-                value = bkd_value - value_to_check
+            bkd_value = to_date(self.parse(row[self.bkd_column]))
+        if value_to_check is None or bkd_value is None:
+            return 0
+        return (bkd_value - value_to_check).days
+
+    def evaluate_batch(self, batch: DateBatch) -> List[Any]:
+        """The day deltas of a batch, as one datetime64 subtraction."""
+        numpy = batch.numpy
+        days = batch.get_days(self.date_column)
+        if self.is_bkd_custom:
+            bkd_days = numpy.datetime64(self.custom_date, "D")
+        else:
+            bkd_days = batch.get_days(self.bkd_column)
+        deltas = bkd_days - days
+        valid = ~numpy.isnat(deltas)
+        return numpy.where(valid, deltas.astype("int64"), 0).tolist()
+
+
+@attrs.define(kw_only=True, repr=False)
+class temporal_flags(Step):
+    """
+    Any combination of non-working day, outside working hours and
+    backdating flags added in a single pass. `flags` maps every new field to
+    its flag (non_working_days, outside_working_hours or backdating), in
+    order. The flags share one DateParser, so a date string read by several
+    of them is parsed once, and at most `max_parsed` distinct strings are
+    kept parsed. A flag reads the input fields only, not the ones added
+    before it.
+
+    With NumPy the flags are computed `batch_rows` rows at a time, on
+    datetime64 arrays of their date columns; without it, row by row.
+    """
+
+    type = "temporal-flags"
+
+    flags: Dict[str, Any]
+    max_parsed: int = DEFAULT_MAX_PARSED
+    batch_rows: int = DEFAULT_BATCH_ROWS
+    # Transform
+
+    def is_vectorized(self) -> bool:
+        return get_numpy() is not None
 
-        return value.days
+    def get_functions(self) -> List[Any]:
+        self.parse = DateParser(self.max_parsed)
+        for flag in self.flags.values():
+            flag.parse = self.parse
+        return list(self.flags.values())
+
+    def transform_resource(self, resource: Resource):
+        table = resource.to_petl()  # type: ignore
+        for name in self.flags:
+            resource.schema.add_field(fields.AnyField(name=name))
+        functions = self.get_functions()
+        vectorized = self.is_vectorized()
+
+        def data():
+            rows = iter(table)
+            header = tuple(next(rows))
+            yield list(header) + list(self.flags)
+            if vectorized:
+                yield from self.evaluate_rows(rows, header, functions)
+                return
+            for row in rows:
+                record = Record(row, header)
+                yield list(row) + [function(record) for function in functions]
+
+        resource.data = data
+
+    def evaluate_rows(self, rows, header, functions):
+        """Append every flag to the rows, `batch_rows` rows at a time."""
+        numpy = get_numpy()
+        indexes = {
+            column: header.index(column)
+            for function in functions
+            for column in function.columns
+        }
+        batch: List[Any] = []
+
+        def flush():
+            columns = {
+                column: [row[index] for row in batch] for column, index in indexes.items()
+            }
+            date_batch = DateBatch(numpy, columns, self.parse)
+            values = [function.evaluate_batch(date_batch) for function in functions]
+            for row, flags in zip(batch, zip(*values)):
+                yield list(row) + list(flags)
+            batch.clear()
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= self.batch_rows:
+                yield from flush()
+        if batch:
+            yield from flush()
+
+    # Metadata
+
+    metadata_profile_patch = {
+        "type": "object",
+        "required": ["flags"],
+        "properties": {
+            "flags": {"type": "object"},
+            "max_parsed": {"type": "integer"},
+            "batch_rows": {"type": "integer"},
+        },
+    }
 
 
 @attrs.define(kw_only=True, repr=False)
 class multiple_aggregate(Step):
+    """
+    Group by `group_names` and compute every entry of `aggregation`, a
+    mapping of output field to (field name, function), in one hash-based
+    pass (see `hash_aggregate`). Groups are sorted by key, as before.
+    Beyond `max_groups` groups, rows spill to `spill_directory`.
+    """
+
     type = "multiple_aggregate"
 
     aggregation: Dict[str, Any]
     group_names: List[str]
+    max_groups: int = DEFAULT_MAX_GROUPS
+    spill_directory: Optional[str] = None
     # Transform
 
     def transform_resource(self, resource: Resource):
@@ -235,13 +450,25 @@ class multiple_aggregate(Step):
             resource.schema.add_field(field)
         for name in self.aggregation.keys():
             resource.schema.add_field(fields.AnyField(name=name))
-        data = etl.aggregate(
-            table,
-            key=tuple(self.group_names),
-            aggregation=list(self.aggregation.values())[0][1],
-            value=list(self.aggregation.values())[0][0],
-        )  # type: ignore
-        resource.data = etl.rename(data, {"value": list(self.aggregation.keys())[0]})  # type: ignore
+        aggregation = dict(self.aggregation)
+        group_names = list(self.group_names)
+
+        def data():
+            rows = iter(table)
+            header = list(next(rows))
+            yield group_names + list(aggregation.keys())
+            yield from hash_aggregate(
+                rows,
+                [header.index(name) for name in group_names],
+                [
+                    (header.index(field_name), function)
+                    for field_name, function in aggregation.values()
+                ],
+                max_groups=self.max_groups,
+                spill_directory=self.spill_directory,
+            )
+
+        resource.data = data
 
     # Metadata
 
@@ -251,30 +478,316 @@ class multiple_aggregate(Step):
         "properties": {
             "groupNames": {"type": "array"},
             "aggregation": {"type": "object"},
+            "maxGroups": {"type": "integer"},
+            "spillDirectory": {"type": "string"},
+        },
+    }
+
+
+@attrs.define(kw_only=True, repr=False)
+class calculated_field(Step):
+    """
+    Add a field computed by a compiled expression, evaluated over
+    `batch_rows` rows at a time on column arrays (see
+    `CompiledExpression.evaluate_batch`).
+    """
+
+    type = "calculated-field"
+
+    name: str
+    expression: CompiledExpression
+    batch_rows: int = DEFAULT_BATCH_ROWS
+    # Transform
+
+    def transform_resource(self, resource: Resource):
+        table = resource.to_petl()  # type: ignore
+        resource.schema.add_field(fields.AnyField(name=self.name))
+        expression = self.expression
+
+        def data():
+            rows = iter(table)
+            header = list(next(rows))
+            yield header + [self.name]
+            indexes = {
+                name: header.index(column)
+                for name, column in expression.variables.items()
+                if name in expression.names
+            }
+            yield from expression.evaluate_rows(rows, indexes, self.batch_rows)
+
+        resource.data = data
+
+    # Metadata
+
+    metadata_profile_patch = {
+        "type": "object",
+        "required": ["name", "expression"],
+        "properties": {
+            "name": {"type": "string"},
+            "expression": {},
+            "batchRows": {"type": "integer"},
+        },
+    }
+
+
+@attrs.define(kw_only=True, repr=False)
+class flag_duplicates(Step):
+    """
+    Add a Y/N field flagging duplicate rows, compared on `key_columns` or on
+    the whole row. `keep` is first, last or all (see
+    `flag_duplicates_in_rows`). Beyond `max_keys` distinct keys the keys are
+    sorted on disk, in `spill_directory`.
+    """
+
+    type = "flag-duplicates"
+
+    name: str = "is_duplicate"
+    key_columns: Optional[List[str]] = None
+    keep: str = "first"
+    max_keys: int = DEFAULT_MAX_KEYS
+    spill_directory: Optional[str] = None
+    # Transform
+
+    def transform_resource(self, resource: Resource):
+        table = resource.to_petl()  # type: ignore
+        resource.schema.add_field(fields.AnyField(name=self.name))
+
+        def data():
+            rows = iter(table)
+            header = list(next(rows))
+            yield header + [self.name]
+            key_indexes = None
+            if self.key_columns:
+                key_indexes = [header.index(name) for name in self.key_columns]
+            for row, is_duplicate in flag_duplicates_in_rows(
+                rows,
+                key_indexes,
+                keep=self.keep,
+                max_keys=self.max_keys,
+                spill_directory=self.spill_directory,
+            ):
+                yield list(row) + ["Y" if is_duplicate else "N"]
+
+        resource.data = data
+
+    # Metadata
+
+    metadata_profile_patch = {
+        "type": "object",
+        "required": [],
+        "properties": {
+            "name": {"type": "string"},
+            "keyColumns": {"type": "array"},
+            "keep": {"type": "string"},
+            "maxKeys": {"type": "integer"},
+            "spillDirectory": {"type": "string"},
+        },
+    }
+
+
+@attrs.define(kw_only=True, repr=False)
+class compare_join(Step):
+    """
+    Full outer join with `resource` on `left_fields` and `right_fields`, as
+    a hash join (see `hash_outer_join`), keeping the fields of the resource
+    that are not join keys. With `compare_fields`, a left and a right field,
+    a `name` field holds their comparison (see `compare_values`).
+
+    Rows of the right side that matched nothing get its key values in the
+    left key fields, as with petl's outerjoin.
+    """
+
+    type = "compare-join"
+
+    resource: Resource
+    left_fields: List[str]
+    right_fields: List[str]
+    compare_fields: Optional[List[str]] = None
+    name: str = "matching_columns_match"
+    # Transform
+
+    def transform_resource(self, resource: Resource):
+        source = self.resource
+        # the schema is set once the source is renamed or propagated
+        if not source.schema.fields:  # type: ignore
+            source.infer()  # type: ignore
+        left_table = resource.to_petl()  # type: ignore
+        right_table = source.to_petl()  # type: ignore
+        for field in source.schema.fields:  # type: ignore
+            if field.name not in self.right_fields:
+                resource.schema.add_field(field.to_copy())
+        if self.compare_fields:
+            resource.schema.add_field(fields.AnyField(name=self.name))
+
+        def data():
+            left_rows = iter(left_table)
+            right_rows = iter(right_table)
+            left_header = list(next(left_rows))
+            right_header = list(next(right_rows))
+            left_keys = [left_header.index(name) for name in self.left_fields]
+            right_keys = [right_header.index(name) for name in self.right_fields]
+            right_values = [
+                idx
+                for idx, name in enumerate(right_header)
+                if name not in self.right_fields
+            ]
+            compare_indexes = None
+            if self.compare_fields:
+                compare_indexes = (
+                    left_header.index(self.compare_fields[0]),
+                    right_header.index(self.compare_fields[-1]),
+                )
+            yield left_header + [right_header[idx] for idx in right_values] + (
+                [self.name] if compare_indexes else []
+            )
+            for left, right in hash_outer_join(
+                left_rows, right_rows, left_keys, right_keys
+            ):
+                if left is None:
+                    row = [None] * len(left_header)
+                    for left_idx, right_idx in zip(left_keys, right_keys):
+                        row[left_idx] = right[right_idx]
+                else:
+                    row = list(left)
+                if right is None:
+                    row += [None] * len(right_values)
+                else:
+                    row += [right[idx] for idx in right_values]
+                if compare_indexes:
+                    row.append(
+                        compare_values(
+                            None if left is None else left[compare_indexes[0]],
+                            None if right is None else right[compare_indexes[1]],
+                        )
+                    )
+                yield row
+
+        resource.data = data
+
+    # Metadata
+
+    metadata_profile_patch = {
+        "type": "object",
+        "required": ["resource", "leftFields", "rightFields"],
+        "properties": {
+            "resource": {"type": "object"},
+            "leftFields": {"type": "array"},
+            "rightFields": {"type": "array"},
+            "compareFields": {"type": "array"},
+            "name": {"type": "string"},
+        },
+    }
+
+
+@attrs.define(kw_only=True, repr=False)
+class global_aggregate(Step):
+    """
+    Aggregates over the whole table (sum, min, max, count, count_unique),
+    computed in a single pass with a constant state per aggregate, instead of
+    grouping every row under a constant key with table_aggregate.
+
+    `aggregation` maps every output field to a (field name, function) pair.
+    Like the grouped aggregate, an empty table gives no row.
+    """
+
+    type = "global_aggregate"
+
+    aggregation: Dict[str, Any]
+    # Transform
+
+    def transform_resource(self, resource: Resource):
+        table = resource.to_petl()  # type: ignore
+        resource.schema.fields.clear()
+        for name in self.aggregation.keys():
+            resource.schema.add_field(fields.AnyField(name=name))
+        aggregation = dict(self.aggregation)
+
+        def data():
+            rows = iter(table)
+            header = list(next(rows))
+            accumulators = [
+                (header.index(field_name), create_accumulator(function))
+                for field_name, function in aggregation.values()
+            ]
+            yield list(aggregation.keys())
+            empty = True
+            for row in rows:
+                empty = False
+                for index, accumulator in accumulators:
+                    accumulator.add(row[index])
+            if not empty:
+                yield [accumulator.result() for _, accumulator in accumulators]
+
+        resource.data = data
+
+    # Metadata
+
+    metadata_profile_patch = {
+        "type": "object",
+        "required": ["aggregation"],
+        "properties": {
+            "aggregation": {"type": "object"},
         },
     }
 
 
 @attrs.define(kw_only=True, repr=False)
 class average(Step):
+    """
+    Mean of a column, from a single streaming pass (see
+    `StatisticsAccumulator`). With `statistics` the variance, standard
+    deviation, min, max, count and number of non-numeric values are returned
+    as well. Non-numeric values are counted, the step only fails when the
+    column holds no number at all. With `exact` the arithmetic is Decimal.
+    """
+
     type = "find_average"
 
     field_name: str
+    statistics: bool = False
+    exact: bool = False
     # Transform
 
+    def get_field_names(self) -> List[str]:
+        if not self.statistics:
+            return [f"avg_{self.field_name}"]
+        return [
+            f"{prefix}_{self.field_name}"
+            for prefix in ["avg", "variance", "stddev", "min", "max", "count", "errors"]
+        ]
+
     def transform_resource(self, resource: Resource):
         table = resource.to_petl()  # type: ignore
-        field_stats = table.stats(field=self.field_name)
-        if field_stats.errors > 0:
-            raise ValueError(
-                f"Error in finding average for field {self.field_name}, must be non-numeric"
-            )
-        mean = field_stats.mean
-        new_table_data = [[f"avg_{self.field_name}"], [round(mean, 5)]]
-        new_table = etl.head(new_table_data, 1)
+        field_names = self.get_field_names()
         resource.schema.fields.clear()
-        resource.schema.add_field(fields.AnyField(name=f"avg_{self.field_name}"))
-        resource.data = new_table
+        for name in field_names:
+            resource.schema.add_field(fields.AnyField(name=name))
+
+        def rounded(value):
+            return None if value is None else round(value, 5)
+
+        def data():
+            accumulator = StatisticsAccumulator(exact=self.exact)
+            for value in etl.values(table, self.field_name):
+                accumulator.add(value)
+            if accumulator.errors > 0 and accumulator.count == 0:
+                raise ValueError(
+                    f"Error in finding average for field {self.field_name}, must be non-numeric"
+                )
+            yield field_names
+            values = [rounded(accumulator.get_mean())]
+            if self.statistics:
+                values += [
+                    rounded(accumulator.get_variance()),
+                    rounded(accumulator.get_stddev()),
+                    accumulator.min,
+                    accumulator.max,
+                    accumulator.count,
+                    accumulator.errors,
+                ]
+            yield values
+
+        resource.data = data
 
     # Metadata
 
@@ -283,6 +796,8 @@ class average(Step):
         "required": ["fieldName"],
         "properties": {
             "fieldName": {"type": "string"},
+            "statistics": {"type": "boolean"},
+            "exact": {"type": "boolean"},
         },
     }
 
@@ -295,7 +810,7 @@ class convert_numeric_none_to_zero(Step):
     def transform_resource(self, resource: Resource):
         table = resource.to_petl()  # type: ignore
         for field in resource.schema.fields:
-            if field.type in ["number", "integer", "decimal"]:
+            if field.type in NUMERIC_TYPES:
                 table = table.replace(field.name, None, 0)
         resource.data = table
 
@@ -306,3 +821,141 @@ class convert_numeric_none_to_zero(Step):
         "required": [],
         "properties": {},
     }
+
+
+# field types whose empty cells are zero-filled before the steps of a load
+NUMERIC_TYPES = ["number", "integer", "decimal"]
+
+
+@attrs.define(kw_only=True, repr=False)
+class normalize_and_zero_fill(Step):
+    """
+    table_normalize and convert_numeric_none_to_zero in a single pass: rows
+    are read typed, and the empty cells of the numeric fields, indexed once
+    from the schema, become 0. One pass instead of one petl replace view per
+    numeric field stacked on top of the normalized table.
+    """
+
+    type = "normalize-and-zero-fill"
+    # Transform
+
+    def transform_resource(self, resource: Resource):
+        current = resource.to_copy()
+        numeric_indexes = [
+            idx
+            for idx, field in enumerate(resource.schema.fields)
+            if field.type in NUMERIC_TYPES
+        ]
+
+        def data():
+            with current:
+                yield current.header.to_list()  # type: ignore
+                for row in current.row_stream:  # type: ignore
+                    cells = row.to_list()
+                    for idx in numeric_indexes:
+                        if cells[idx] is None:
+                            cells[idx] = 0
+                    yield cells
+
+        resource.data = data
+
+    # Metadata
+
+    metadata_profile_patch = {
+        "type": "object",
+        "required": [],
+        "properties": {},
+    }
+
+
+@attrs.define(kw_only=True, repr=False)
+class fused_row_steps(Step):
+    """
+    Several row-wise steps (field-add, temporal-flags, eb-filter,
+    compound-filter, field-remove) applied in a single pass over the rows,
+    instead of one pass and one re-read of the resource per step. The schema
+    is updated exactly as the steps would.
+    """
+
+    type = "fused_row_steps"
+
+    steps: List[Step]
+    # Transform
+
+    def transform_resource(self, resource: Resource):
+        table = resource.to_petl()  # type: ignore
+        header = list(resource.schema.field_names)
+        operations = []
+        for step in self.steps:
+            if step.type == "field-add":
+                descriptor = deepcopy(step.descriptor) or {}
+                descriptor["name"] = step.name
+                descriptor.setdefault("type", "any")
+                resource.schema.add_field(
+                    Field.from_descriptor(descriptor), position=step.position
+                )
+                function = step.function
+                if step.formula:
+                    function = lambda row, formula=step.formula: simpleeval.simple_eval(
+                        formula, names=row
+                    )
+                index = step.position - 1 if step.position else len(header)
+                operations.append(("add", index, step.value or function, tuple(header)))
+                header.insert(index, step.name)
+            elif step.type == "temporal-flags":
+                for name, function in zip(step.flags, step.get_functions()):
+                    resource.schema.add_field(fields.AnyField(name=name))
+                    operations.append(("add", len(header), function, tuple(header)))
+                    header.append(name)
+            elif step.type in ["eb-filter", "compound-filter"]:
+                predicate = step.get_predicate(resource.schema)
+                if predicate is not None:
+                    operations.append(("filter", predicate, tuple(header)))
+            elif step.type == "field-remove":
+                indexes = set(
+                    index for index, name in enumerate(header) if name in step.names
+                )
+                for name in step.names:
+                    if name in resource.schema.field_names:
+                        resource.schema.remove_field(name)
+                operations.append(("remove", indexes))
+                header = [name for name in header if name not in step.names]
+            else:
+                raise ValueError(f"Step {step.type} can not be fused")
+
+        def data():
+            rows = iter(table)
+            next(rows)
+            yield list(header)
+            for row in rows:
+                values = list(row)
+                for operation in operations:
+                    if operation[0] == "add":
+                        _, index, value, fields_before = operation
+                        if callable(value):
+                            value = value(Record(values, fields_before))
+                        values.insert(index, value)
+                    elif operation[0] == "filter":
+                        _, predicate, fields_before = operation
+                        if not predicate(Record(values, fields_before)):
+                            break
+                    else:
+                        values = [
+                            value
+                            for index, value in enumerate(values)
+                            if index not in operation[1]
+                        ]
+                else:
+                    yield values
+
+        resource.data = data
+
+    # Metadata
+
+    metadata_profile_patch = {
+        "type": "object",
+        "required": ["steps"],
+        "properties": {
+            "steps": {"type": "array"},
+        },
+    }
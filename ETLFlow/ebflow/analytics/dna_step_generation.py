@@ -1,94 +1,86 @@
-import copy
 import os
 from frictionless import steps
 from ebflow.analytics.analytics_schema import NodeData
 from ebflow.analytics.custom_steps import (
     average,
-    identify_duplicate,
     non_working_days,
     outside_working_hours,
     backdating,
     multiple_aggregate,
-    convert_numeric_none_to_zero,
+    normalize_and_zero_fill,
     eb_filter,
+    global_aggregate,
+    calculated_field,
+    flag_duplicates,
+    compare_join,
+    compound_filter,
+    temporal_flags,
 )
-import random
-from ebflow.utils.custom_steps import custom_row_compare, custom_table_join
+from ebflow.analytics.expressions import CompiledExpression
+from ebflow.analytics.intermediate import materialize
+from ebflow.utils.custom_steps import custom_row_compare
 from frictionless.resources import TableResource
 from frictionless import Resource, Pipeline, transform
 
 
 class DNATransformStep:
-    def __init__(self, node_data: NodeData, node=None):
+    def __init__(self, node_data: NodeData, node=None, workspace=None):
         self.node_data = node_data
         self.message = None
         self.pipeline_nodes = node
-        self.files_to_be_deleted = []
+        # intermediate files and spills go to the workspace of the run
+        self.workspace = workspace
+        self.spill_directory = workspace.spill_directory if workspace else None
 
     @classmethod
     def generate_preprocessing_steps(cls):
         return [
-            steps.table_normalize(),
-            convert_numeric_none_to_zero(),
+            normalize_and_zero_fill(),
         ]
 
     def generate_sum(self):
         return [
-            steps.field_add(
-                name="sum_group",
-                value="SUM",
-            ),
-            steps.table_aggregate(
-                group_name="sum_group",
+            global_aggregate(
                 aggregation={
                     f"sum_{self.node_data.column_name.value}": (
                         self.node_data.column_name.value,
-                        sum,
+                        "sum",
                     )
                 },
             ),
-            steps.field_remove(names=["sum_group"]),
         ]
 
     def generate_average(self):
         return [
-            average(field_name=self.node_data.column_name.value),
+            average(
+                field_name=self.node_data.column_name.value,
+                statistics=bool(self.node_data.statistics),
+                exact=bool(self.node_data.exact),
+            ),
         ]
 
     def generate_max(self):
         return [
-            steps.field_add(
-                name="max_group",
-                value="MAX",
-            ),
-            steps.table_aggregate(
-                group_name="max_group",
+            global_aggregate(
                 aggregation={
                     f"max_{self.node_data.column_name.value}": (
                         self.node_data.column_name.value,
-                        max,
+                        "max",
                     )
                 },
             ),
-            steps.field_remove(names=["max_group"]),
         ]
 
     def generate_min(self):
         return [
-            steps.field_add(
-                name="min_group",
-                value="MIN",
-            ),
-            steps.table_aggregate(
-                group_name="min_group",
+            global_aggregate(
                 aggregation={
                     f"min_{self.node_data.column_name.value}": (
                         self.node_data.column_name.value,
-                        min,
+                        "min",
                     )
                 },
             ),
-            steps.field_remove(names=["min_group"]),
         ]
 
     def generate_net(self):
@@ -105,63 +97,39 @@ class DNATransformStep:
         ]
 
     def generate_count(self):
-
-        step_data = [
-            steps.field_add(
-                name="count_group",
-                value="COUNT",
-            ),
-        ]
         if self.node_data.unique:
-            step_data.append(
-                steps.table_aggregate(
-                    group_name="count_group",
-                    aggregation={
-                        f"count_unique_{self.node_data.column_name.value}": (
-                            self.node_data.column_name.value,
-                            lambda x: len(set([i for i in x if i is not None])),
-                        )
-                    },
-                )
-            )
+            name = f"count_unique_{self.node_data.column_name.value}"
+            function = "count_unique"
         else:
-            step_data.append(
-                steps.table_aggregate(
-                    group_name="count_group",
-                    aggregation={
-                        f"count_{self.node_data.column_name.value}": (
-                            self.node_data.column_name.value,
-                            lambda x: len(list([i for i in x if i is not None])),
-                        )
-                    },
-                )
-            )
-        step_data.append(steps.field_remove(names=["count_group"]))
-        return step_data
+            name = f"count_{self.node_data.column_name.value}"
+            function = "count"
+        return [
+            global_aggregate(
+                aggregation={name: (self.node_data.column_name.value, function)},
+            ),
+        ]
 
     def generate_multiple_calculation(self):
-        expr = self.node_data.data.expression
-        col_data = self.node_data.data.column
-        expression = expr
-        for key, value in col_data.items():
-            expression = expression.replace(key, str(value))
-
-        def prepare_formula(row, e=expr, cols=copy.deepcopy(col_data)):
-            for key, value in cols.items():
-                e = e.replace(key, str(row[value]) if row[value] else "0")
-
-            return eval(e)
-
+        expression = CompiledExpression(
+            self.node_data.data.expression, self.node_data.data.column
+        )
+        name = f"maths_{'_'.join(list(self.node_data.data.column.values()))}"
+        if self.node_data.data.vectorized:
+            return [calculated_field(name=name, expression=expression)]
         return [
-            steps.field_add(
-                name=f"maths_{'_'.join(list(self.node_data.data.column.values()))}",
-                function=prepare_formula,
-            ),
+            steps.field_add(name=name, function=expression),
         ]
 
     def generate_duplicate(self):
+        key_columns = None
+        if self.node_data.column_name:
+            key_columns = [col.value for col in self.node_data.column_name]
         return [
-            steps.field_add(name="is_duplicate", function=identify_duplicate()),
+            flag_duplicates(
+                key_columns=key_columns,
+                keep=self.node_data.keep or "first",
+                spill_directory=self.spill_directory,
+            ),
         ]
 
     def generate_remove_column(self):
@@ -178,115 +146,92 @@ class DNATransformStep:
             ),
         ]
 
+    def generate_compound_filter(self):
+        return [
+            compound_filter(condition=self.node_data.condition, label=self.node_data.label),
+        ]
+
     def generate_group_by(self):
+        aggregations = [
+            (
+                self.node_data.column_name.value,
+                self.node_data.aggregation_type.value,
+                self.node_data.unique,
+            )
+        ] + [
+            (
+                aggregation.column_name.value,
+                aggregation.aggregation_type.value,
+                aggregation.unique,
+            )
+            for aggregation in self.node_data.aggregations or []
+        ]
         aggregation = {}
-        if self.node_data.aggregation_type.value == "sum":
-            aggregation = {
-                f"sum_{self.node_data.column_name.value}": (
-                    self.node_data.column_name.value,
-                    sum,
-                )
-            }
-        elif self.node_data.aggregation_type.value == "min":
-            aggregation = {
-                f"min_{self.node_data.column_name.value}": (
-                    self.node_data.column_name.value,
-                    min,
-                )
-            }
-        elif self.node_data.aggregation_type.value == "max":
-            aggregation = {
-                f"max_{self.node_data.column_name.value}": (
-                    self.node_data.column_name.value,
-                    max,
-                )
-            }
-        elif self.node_data.aggregation_type.value == "avg":
-
-            def avg(x):
-                count = 0
-                total = 0
-                for i in x:
-                    total += i
-                    count += 1
-                try:
-                    avg = total / count
-                except ZeroDivisionError:
-                    avg = 0
-                return round(avg, 5)
-
-            aggregation = {
-                f"avg_{self.node_data.column_name.value}": (
-                    self.node_data.column_name.value,
-                    lambda x: avg(x),
-                )
-            }
-        elif self.node_data.aggregation_type.value == "count":
-            if self.node_data.unique:
-                aggregation = {
-                    f"count_unique_{self.node_data.column_name.value}": (
-                        self.node_data.column_name.value,
-                        lambda x: len(set([i for i in x if i is not None])),
-                    )
-                }
+        for column_name, aggregation_type, unique in aggregations:
+            if aggregation_type == "count" and unique:
+                aggregation[f"count_unique_{column_name}"] = (column_name, "count_unique")
             else:
-                aggregation = {
-                    f"count_{self.node_data.column_name.value}": (
-                        self.node_data.column_name.value,
-                        lambda x: len(list([i for i in x if i is not None])),
-                    )
-                }
+                aggregation[f"{aggregation_type}_{column_name}"] = (
+                    column_name,
+                    aggregation_type,
+                )
         return [
             multiple_aggregate(
                 group_names=[col.value for col in self.node_data.group_by],
                 aggregation=aggregation,
+                spill_directory=self.spill_directory,
             ),
         ]
 
     def generate_nwd(self):
         return [
-            steps.field_add(
-                name=f"nwd_{self.node_data.column_name.value}",
-                function=non_working_days(
-                    date_column=self.node_data.column_name.value,
-                    custom_dates=(
-                        self.node_data.custom_dates
-                        if self.node_data.custom_dates
-                        else []
+            temporal_flags(
+                flags={
+                    f"nwd_{self.node_data.column_name.value}": non_working_days(
+                        date_column=self.node_data.column_name.value,
+                        custom_dates=(
+                            self.node_data.custom_dates
+                            if self.node_data.custom_dates
+                            else []
+                        ),
+                        weekdays=self.node_data.weekdays if self.node_data.weekdays else [],
                     ),
-                    weekdays=self.node_data.weekdays if self.node_data.weekdays else [],
-                ),
+                },
             ),
         ]
 
     def generate_owh(self):
         return [
-            steps.field_add(
-                name=f"owh_{self.node_data.column_name.value}",
-                function=outside_working_hours(
-                    date_column=self.node_data.column_name.value,
-                    start_time=self.node_data.start_time,
-                    end_time=self.node_data.end_time,
-                ),
+            temporal_flags(
+                flags={
+                    f"owh_{self.node_data.column_name.value}": outside_working_hours(
+                        date_column=self.node_data.column_name.value,
+                        start_time=self.node_data.start_time,
+                        end_time=self.node_data.end_time,
+                    ),
+                },
             ),
         ]
 
     def generate_bkd(self):
         return [
-            steps.field_add(
-                name=f"bkd_{self.node_data.column_name.value}",
-                function=backdating(
-                    date_column=self.node_data.column_name.value,
-                    bkd_column=self.node_data.bkd_column.value,
-                    is_bkd_custom=self.node_data.is_bkd_custom,
-                ),
+            temporal_flags(
+                flags={
+                    f"bkd_{self.node_data.column_name.value}": backdating(
+                        date_column=self.node_data.column_name.value,
+                        bkd_column=self.node_data.bkd_column.value,
+                        is_bkd_custom=self.node_data.is_bkd_custom,
+                    ),
+                },
             ),
         ]
 
     # components for compare functionality
 
     def change_resource_field_name2(self, resource, table_name=""):
-        resource.infer()
+        # intermediates carry their schema, only sources are inferred
+        if not resource.schema.fields:
+            resource.infer()
         field_update_steps = [steps.table_normalize()]
         if table_name:
             table_name = table_name + "_"
@@ -319,23 +264,29 @@ class DNATransformStep:
 
     def rename_matching_column(self, collist, table_name):
         for index, col in enumerate(collist):
-            collist[index] = table_name + "_" + col
+            collist[index] = table_name + "_" + getattr(col, "value", col)
         return collist
 
-    def return_field_add_function_for_compare(self, field_name1, field_name2):
-        def compare_fields(row, fn1=field_name1, fn2=field_name2):
-            if str(row[fn1]).isnumeric() == str(row[fn2]).isnumeric():
-                return str(int(row[fn1]) - int(row[fn2]))
-            else:
-                return str(str(row[fn1]) == str(row[fn2]))
-
-        return compare_fields
     def get_column_name_from_resource(self, resource):
         return resource.schema.field_names
     
+    def get_transformed_resource(self, node):
+        """
+        Output of a transform node, run once through its steps into a typed
+        intermediate file of the workspace, rather than for every read.
+        """
+        resource = transform(
+            node.resource.to_copy(),
+            steps=[steps.table_normalize()] + (node.steps or []),
+        )
+        if self.workspace is None:
+            return resource
+        path = self.workspace.new_path(node.data.label, ".intermediate")
+        resource = materialize(resource, path)
+        self.workspace.track(path)
+        return resource
+
     def collect_previous_steps(self, NodeData,first_datasource_name, second_datasource_name):
-        
-        random_number = str(random.randint(11111111, 99999999))
         collected_steps = dict()
         if (NodeData is not None and NodeData.type == "transform" and NodeData.operation_name in ["compare","overlap"]):
             # first resource data
@@ -349,20 +300,11 @@ class DNATransformStep:
                         # what  is the extract node is already processed
                         collected_steps['first_node_processed_data'] = self.change_resource_field_name2(first_nodeData.resource, first_datasource_name)
                 else:
-                    if first_nodeData.steps:
-                        process_first_precious_node_steps = transform(
-                            first_nodeData.resource,
-                            steps=[
-                                steps.table_normalize(),
-                                first_nodeData.steps[0]
-                            ]
-                        )
-                        process_first_precious_node_steps.write(f"{random_number}_first_node.csv")
-                        first_node_resource = TableResource(f"{random_number}_first_node.csv", format="csv")
-                        first_res = self.change_resource_field_name2(first_node_resource, first_datasource_name)
-                        collected_steps['first_node_processed_data'] = first_res
-                        collected_steps['first_node_columns'] = self.get_column_name_from_resource(first_res)
-                        self.files_to_be_deleted.append(f"{random_number}_first_node.csv")
+                    first_res = self.change_resource_field_name2(
+                        self.get_transformed_resource(first_nodeData), first_datasource_name
+                    )
+                    collected_steps['first_node_processed_data'] = first_res
+                    collected_steps['first_node_columns'] = self.get_column_name_from_resource(first_res)
             # second resource data
             if (NodeData.datasource[1] and "/" not in NodeData.datasource[1]):
                 second_nodeData = self.get_node_details_from_node_id(NodeData.datasource[1])
@@ -373,19 +315,11 @@ class DNATransformStep:
                     else:
                         collected_steps['second_node_processed_data'] = self.change_resource_field_name2(second_nodeData.resource, second_datasource_name)
                 else:
-                    process_second_precious_node_steps = transform(
-                        second_nodeData.resource,
-                        steps=[
-                            steps.table_normalize(),
-                            second_nodeData.steps[0]
-                        ]
+                    second_res = self.change_resource_field_name2(
+                        self.get_transformed_resource(second_nodeData), second_datasource_name
                     )
-                    process_second_precious_node_steps.write(f"{random_number}_second_node.csv")
-                    second_node_resource = TableResource(f"{random_number}_second_node.csv", format="csv")
-                    second_res = self.change_resource_field_name2(second_node_resource, second_datasource_name)
                     collected_steps['second_node_processed_data'] = second_res
                     collected_steps['second_node_columns'] = self.get_column_name_from_resource(second_res)
-                    self.files_to_be_deleted.append(f"{random_number}_second_node.csv")
         return collected_steps
     
     def get_node_label(self, node_id):
@@ -397,89 +331,68 @@ class DNATransformStep:
         return  label
     
     def generate_compare(self):
-        random_number = str(random.randint(11111111, 99999999))
-        
+        first_label = self.get_node_label(self.node_data.datasource[0])
+        second_label = self.get_node_label(self.node_data.datasource[1])
         collected_steps = self.collect_previous_steps(
-            self.node_data.model_copy(), 
-            self.get_node_label(self.node_data.datasource[0]), 
-            self.get_node_label(self.node_data.datasource[1])
+            self.node_data.model_copy(), first_label, second_label
         )
-        
-
+        # the joined table is read lazily by the load, nothing is written in between
         transformation_step = transform(
             collected_steps['first_node_processed_data'],
             steps=[
                 steps.table_normalize(),
-                custom_table_join(
+                compare_join(
                     resource=collected_steps['second_node_processed_data'],
-                    mode="outer",
                     left_fields=self.rename_matching_column(
-                        self.node_data.matching_columns.copy(),
-                        self.get_node_label(self.node_data.datasource[0]),
+                        self.node_data.matching_columns.copy(), first_label
                     ),
                     right_fields=self.rename_matching_column(
-                        self.node_data.matching_columns.copy(),
-                        self.get_node_label(self.node_data.datasource[1]),
+                        self.node_data.matching_columns.copy(), second_label
                     ),
-                ),
-                steps.field_add(
-                    name="matching_columns_match",
-                    function=self.return_field_add_function_for_compare(
+                    compare_fields=[
                         self.rename_matching_column(
-                            self.node_data.compare_columns.copy(),
-                            self.get_node_label(self.node_data.datasource[0]),
+                            self.node_data.compare_columns.copy(), first_label
                         )[0],
                         self.rename_matching_column(
-                            self.node_data.compare_columns.copy(),
-                            self.get_node_label(self.node_data.datasource[1]),
+                            self.node_data.compare_columns.copy(), second_label
                         )[-1],
-                    ),
+                    ],
                 ),
             ],
         )
-        transformation_step.write(f"{random_number}_temp_gen_compare.csv")
-        single_resource = TableResource(
-            f"{random_number}_temp_gen_compare.csv", format="csv"
-        )
-        self.files_to_be_deleted.append(f"{random_number}_temp_gen_compare.csv")
         return {
-            "data": single_resource,
+            "data": transformation_step,
             "steps": [],
-            "temp_file_name": self.files_to_be_deleted,
         }
 
-
     def generate_overlap(self):
-        random_number = str(random.randint(11111111, 99999999))
-        
+        first_label = self.get_node_label(self.node_data.datasource[0])
+        second_label = self.get_node_label(self.node_data.datasource[1])
         collected_steps = self.collect_previous_steps(
-            self.node_data.model_copy(), 
-            self.get_node_label(self.node_data.datasource[0]), 
-            self.get_node_label(self.node_data.datasource[1])
+            self.node_data.model_copy(), first_label, second_label
         )
+        matching_columns = self.node_data.matching_columns or []
         transformation_step = transform(
             collected_steps['first_node_processed_data'].to_copy(),
             steps=[
                 steps.table_normalize(),
                 custom_row_compare(
-                    resource=collected_steps['second_node_processed_data'].to_copy()
-                )
+                    resource=collected_steps['second_node_processed_data'].to_copy(),
+                    left_fields=self.rename_matching_column(
+                        matching_columns.copy(), first_label
+                    ),
+                    right_fields=self.rename_matching_column(
+                        matching_columns.copy(), second_label
+                    ),
+                    count_name="overlap_count" if self.node_data.match_count else None,
+                ),
             ],
         )
-        
-        transformation_step.write(f"{random_number}_temp_gen_overlap_first.csv")
-        first_data_source = TableResource(
-            f"{random_number}_temp_gen_overlap_first.csv", format="csv"
-        )
-        self.files_to_be_deleted.append(f"{random_number}_temp_gen_overlap_first.csv")
-        
         return {
-            "data": first_data_source,
+            "data": transformation_step,
             "steps": [],
-            "temp_file_name": self.files_to_be_deleted,
         }
-    
-    
+
     def generate_step(self):
         self.message = self.node_data.__repr__()
         if self.node_data.operation_name == "compare":
@@ -506,6 +419,8 @@ class DNATransformStep:
             return self.generate_remove_column()
         elif self.node_data.operation_name == "filter":
             return self.generate_filter()
+        elif self.node_data.operation_name == "compound_filter":
+            return self.generate_compound_filter()
         elif self.node_data.operation_name == "group_by":
             return self.generate_group_by()
         elif self.node_data.operation_name == "nwd":
@@ -0,0 +1,200 @@
+from typing import Any, Dict, Hashable, List, Tuple
+
+from frictionless.resources import TableResource
+
+
+class Accumulator:
+    """
+    A DQS metric computed incrementally: `prepare` is called with the header
+    of the resource, `add` with the cells of every row of a scan, as read
+    from the source like the aggregations they replace, and `result` gives
+    the metric once the scan is over. Accumulators with the same key compute
+    the same metric, so it is computed once whichever score asks for it.
+    """
+
+    key: Tuple[Hashable, ...] = ()
+
+    def prepare(self, labels: List[str]) -> None:
+        pass
+
+    def add(self, cells: List[Any]) -> None:
+        raise NotImplementedError
+
+    def result(self) -> Any:
+        raise NotImplementedError
+
+
+class RowCount(Accumulator):
+    def __init__(self):
+        self.key = ("count",)
+        self.count = 0
+
+    def add(self, cells):
+        self.count += 1
+
+    def result(self):
+        return self.count
+
+
+class FieldGaps(Accumulator):
+    """Number of rows where the field is empty (or falsy, as 0)."""
+
+    def __init__(self, field: str):
+        self.key = ("gaps", field)
+        self.field = field
+        self.gaps = 0
+
+    def prepare(self, labels):
+        self.index = labels.index(self.field)
+
+    def add(self, cells):
+        if not cells[self.index]:
+            self.gaps += 1
+
+    def result(self):
+        return self.gaps
+
+
+class FieldSum(Accumulator):
+    """Sum of the field, empty cells count as 0."""
+
+    def __init__(self, field: str):
+        self.key = ("sum", field)
+        self.field = field
+        self.total = 0
+
+    def prepare(self, labels):
+        self.index = labels.index(self.field)
+
+    def add(self, cells):
+        self.total += cells[self.index] or 0
+
+    def result(self):
+        return self.total
+
+
+class NetAmountSum(Accumulator):
+    """Sum of the amounts, credits (indicator C) counted as negative."""
+
+    def __init__(
+        self,
+        amount_field: str = "amount",
+        indicator_field: str = "amountCreditDebitIndicator",
+    ):
+        self.key = ("net_amount", amount_field, indicator_field)
+        self.amount_field = amount_field
+        self.indicator_field = indicator_field
+        self.total = 0
+
+    def prepare(self, labels):
+        self.amount_index = labels.index(self.amount_field)
+        self.indicator_index = labels.index(self.indicator_field)
+
+    def add(self, cells):
+        amount = cells[self.amount_index]
+        if amount:
+            self.total += -amount if cells[self.indicator_index] == "C" else amount
+
+    def result(self):
+        return self.total
+
+
+class FieldAny(Accumulator):
+    """Whether the field has a value in any row."""
+
+    def __init__(self, field: str):
+        self.key = ("any", field)
+        self.field = field
+        self.found = False
+
+    def prepare(self, labels):
+        self.index = labels.index(self.field)
+
+    def add(self, cells):
+        if not self.found and cells[self.index]:
+            self.found = True
+
+    def result(self):
+        return self.found
+
+
+class DistinctCount(Accumulator):
+    """Number of distinct combinations of the fields, over rows where they all have a value."""
+
+    def __init__(self, fields: List[str]):
+        self.key = ("distinct", tuple(fields))
+        self.fields = list(fields)
+        self.values = set()
+
+    def prepare(self, labels):
+        self.indexes = [labels.index(field) for field in self.fields]
+
+    def add(self, cells):
+        value = tuple(cells[index] for index in self.indexes)
+        if all(value):
+            self.values.add(value)
+
+    def result(self):
+        return len(self.values)
+
+
+class JournalSequence(Accumulator):
+    """
+    The journal id sequence check, as (non numeric id found, missing sequence
+    count, null sequence count). The 1st row is always considered in
+    sequence; a missing sequence is a numeric id not following the previous
+    one and a null sequence an empty id. The check stops at the first non
+    numeric id.
+    """
+
+    def __init__(self, field: str = "journalId"):
+        self.key = ("jid", field)
+        self.field = field
+        self.journal_id = None
+        self.journal_id_prev = None
+        self.null_seq_count = 0
+        self.missing_seq_count = 0
+        self.non_numeric_journal_id = False
+
+    def prepare(self, labels):
+        self.index = labels.index(self.field)
+
+    def add(self, cells):
+        if self.non_numeric_journal_id:
+            return
+        value = cells[self.index]
+        if not value:
+            self.null_seq_count += 1
+        else:
+            try:
+                self.journal_id = float(value)
+            except ValueError:
+                self.non_numeric_journal_id = True
+                return
+            if self.journal_id_prev and self.journal_id - self.journal_id_prev != 1:
+                self.missing_seq_count += 1
+        self.journal_id_prev = self.journal_id
+
+    def result(self):
+        return self.non_numeric_journal_id, self.missing_seq_count, self.null_seq_count
+
+
+def scan_metrics(
+    resource: TableResource, accumulators: List[Accumulator]
+) -> Dict[Tuple[Hashable, ...], Any]:
+    """Compute all the metrics in a single read of the resource, by key."""
+    registered: Dict[Tuple[Hashable, ...], Accumulator] = {}
+    for accumulator in accumulators:
+        registered.setdefault(accumulator.key, accumulator)
+    add_functions = tuple(accumulator.add for accumulator in registered.values())
+
+    with resource.to_copy() as current:
+        labels = current.header.labels
+        for accumulator in registered.values():
+            accumulator.prepare(labels)
+        for row in current.row_stream:  # type: ignore
+            cells = row.cells
+            for add in add_functions:
+                add(cells)
+
+    return {key: accumulator.result() for key, accumulator in registered.items()}
@@ -1,19 +1,16 @@
-from frictionless import Pipeline
-
+from ebflow.analytics.dqs.accumulators import DistinctCount, RowCount
 from ebflow.analytics.dqs.dqs import DQS
-from ebflow.utils.custom_steps import custom_aggregate
 
 
 class COADQS(DQS):
-    def statistical(self):
-        resource = self.resource.to_copy()
-        resource.transform(
-            Pipeline(steps=[custom_aggregate(aggregation={"num_records": len})])
-        )
-
-        data = resource.read_rows()[0]
+    def get_accumulators(self):
+        return super().get_accumulators() + [
+            DistinctCount(["glAccountNumber"]),
+            DistinctCount(["businessUnitCode"]),
+        ]
 
-        coa_total_record = data["num_records"]
+    def statistical(self):
+        coa_total_record = self.get_metric(RowCount())
         total_fields = len(self.resource.header)
         # COA --- statistical score -- glAccountNumber
         coa_gl_account_number_count = self.get_unique_value_count(["glAccountNumber"])
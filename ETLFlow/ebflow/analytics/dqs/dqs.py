@@ -1,14 +1,16 @@
 from abc import ABC, abstractmethod
-from typing import Any
+from typing import Any, Dict, Hashable, List, Optional, Tuple
 
-from frictionless import Pipeline, steps
 from frictionless.resources import TableResource
 
-from ebflow.utils.custom_steps import (
-    value_counts,
-    custom_aggregate,
-    custom_sum,
-    check_field_gaps,
+from ebflow.analytics.dqs.accumulators import (
+    Accumulator,
+    DistinctCount,
+    FieldAny,
+    FieldGaps,
+    FieldSum,
+    RowCount,
+    scan_metrics,
 )
 
 
@@ -21,6 +23,7 @@ class DQS(ABC):
             {"name": cdm_field["cdm_field"], "type": cdm_field["data_type"]}
             for cdm_field in cdm_fields
         ]
+        self.metrics: Optional[Dict[Tuple[Hashable, ...], Any]] = None
 
     @staticmethod
     def get_percent(count, total):
@@ -29,52 +32,43 @@ class DQS(ABC):
         else:
             return round((count / total) * 100)
 
-    def get_unique_value_count(self, fields: [str]):
-        count = self.resource.to_copy()
-        count.transform(
-            Pipeline(
-                steps=[
-                    steps.row_filter(
-                        function=lambda row: all([row[field] for field in fields])
-                    ),
-                    value_counts(field_names=fields),
-                    custom_aggregate(aggregation={"row_count": len}),
-                ]
+    def get_accumulators(self) -> List[Accumulator]:
+        """
+        Metrics of the profile, statistical and business rule scores. They are
+        all computed in the first scan of the resource, whichever score is
+        asked for first.
+        """
+        return [RowCount()] + [FieldGaps(field) for field in self.resource.header]
+
+    def get_metrics(self, accumulators: List[Accumulator]) -> List[Any]:
+        if self.metrics is None:
+            self.metrics = scan_metrics(
+                self.resource, self.get_accumulators() + accumulators
             )
-        )
-        count = count.read_rows()
-        count = int(count[0]["row_count"]) if count else 0
-        return count
+        missing = [
+            accumulator
+            for accumulator in accumulators
+            if accumulator.key not in self.metrics
+        ]
+        if missing:
+            self.metrics.update(scan_metrics(self.resource, missing))
+        return [self.metrics[accumulator.key] for accumulator in accumulators]
+
+    def get_metric(self, accumulator: Accumulator) -> Any:
+        return self.get_metrics([accumulator])[0]
+
+    def get_unique_value_count(self, fields: [str]):
+        return self.get_metric(DistinctCount(fields))
 
     def get_field_sum(self, field: str):
-        field_sum = self.resource.to_copy()
-        field_sum.transform(
-            Pipeline(
-                steps=[custom_aggregate(aggregation={"field_sum": (field, custom_sum)})]
-            )
-        )
-        field_sum = float(field_sum.read_rows()[0]["field_sum"])
-        return field_sum
+        return float(self.get_metric(FieldSum(field)))
 
     def all_rows_blank(self, fields: [str]):
         present = 0
         controls_new_list = list()
 
-        controls = self.resource.to_copy()
-        controls.transform(
-            Pipeline(
-                steps=[
-                    custom_aggregate(
-                        group_name=None,
-                        aggregation={
-                            field_name: (field_name, any) for field_name in fields
-                        },
-                    )
-                ]
-            )
-        )
-
-        for field_name, has_value in controls.read_rows()[0].items():
+        has_values = self.get_metrics([FieldAny(field_name) for field_name in fields])
+        for field_name, has_value in zip(fields, has_values):
             controls_new_list.append({field_name: has_value})
             present += 1 if has_value else 0
 
@@ -120,18 +114,13 @@ class DQS(ABC):
             )
         ]
 
-        resource = self.resource.to_copy()
-        aggregate_dict: dict[str, Any] = {"num_records": len}
-        aggregate_dict.update(
-            {field: (field, check_field_gaps) for field in all_fields}
-        )
-
-        resource.transform(
-            Pipeline(steps=[custom_aggregate(aggregation=aggregate_dict)])
+        num_records = self.get_metric(RowCount())
+        field_gaps = dict(
+            zip(
+                all_fields,
+                self.get_metrics([FieldGaps(field) for field in all_fields]),
+            )
         )
-        field_gaps = resource.read_rows()[0].to_dict()
-
-        num_records = field_gaps["num_records"]
 
         filled_fields = [
             field for field in all_fields if field_gaps[field] < num_records
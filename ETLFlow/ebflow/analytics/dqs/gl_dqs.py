@@ -1,51 +1,42 @@
 import math
-from typing import Any
-
-from frictionless import Pipeline, steps
 
+from ebflow.analytics.dqs.accumulators import (
+    DistinctCount,
+    FieldAny,
+    FieldSum,
+    JournalSequence,
+    NetAmountSum,
+    RowCount,
+)
 from ebflow.analytics.dqs.dqs import DQS
-from ebflow.utils.custom_steps import custom_sum, custom_aggregate, jid_details
 
 
 class GLDQS(DQS):
-    def statistical(self):
-        # transform resource for required data
-        resource = self.resource.to_copy()
-        resource.transform(
-            Pipeline(
-                steps=[
-                    steps.field_add(
-                        name="net_amount",
-                        descriptor={"type": "number"},
-                        formula='amount * (-1 if amountCreditDebitIndicator == "C" else 1) if amount else 0',
-                    ),
-                    custom_aggregate(
-                        aggregation={
-                            "num_records": len,
-                            "total_amount_sum": ("amount", custom_sum),
-                            "local_amount_sum": ("localAmount", custom_sum),
-                            "sum_net_amount": ("net_amount", custom_sum),
-                        }
-                    ),
-                ]
-            )
+    def get_accumulators(self):
+        return (
+            super().get_accumulators()
+            + [
+                FieldSum("amount"),
+                FieldSum("localAmount"),
+                NetAmountSum(),
+                DistinctCount(["glAccountNumber"]),
+                DistinctCount(["businessUnitCode"]),
+                JournalSequence(),
+            ]
+            + [FieldAny(field_name) for field_name in self.resource.header]
         )
 
-        data = resource.read_rows()[0]
-
-        # gl-detail-statistical score -total record
-        gl_detail_total_record = data["num_records"]
+    def statistical(self):
+        (
+            gl_detail_total_record,
+            gl_detail_total_amount_sum,
+            gl_detail_local_amount_sum,
+            sum_net_amount,
+        ) = self.get_metrics(
+            [RowCount(), FieldSum("amount"), FieldSum("localAmount"), NetAmountSum()]
+        )
         total_fields = len(self.resource.header)
 
-        # gl-detail-statistical score -total amount sum
-        gl_detail_total_amount_sum = data["total_amount_sum"]
-
-        # gl-detail-statistical score - sum of local amount
-        gl_detail_local_amount_sum = data["local_amount_sum"]
-
-        # gl-detail-statistical score - Debits/Credits
-        sum_net_amount = data["sum_net_amount"]
-
         # gl-detail-statistical score - GL Account Code Count
         gl_detail_account_code_count = self.get_unique_value_count(["glAccountNumber"])
 
@@ -65,37 +56,12 @@ class GLDQS(DQS):
         ]
 
     def business_rule(self):
-        resource = self.resource.to_copy()
-        all_fields = self.resource.header
-
-        aggregation_list: [str, Any] = {
-            "num_records": len,
-            "total_amount_sum": ("amount", custom_sum),
-            "jid_data": ("journalId", jid_details),
-        }
-        aggregation_list.update(
-            {field_name: (field_name, any) for field_name in all_fields}
-        )
-
-        resource.transform(
-            Pipeline(
-                steps=[
-                    steps.field_add(
-                        name="net_amount",
-                        descriptor={"type": "number"},
-                        formula='amount * (-1 if amountCreditDebitIndicator == "C" else 1) if amount else 0',
-                    ),
-                    custom_aggregate(aggregation=aggregation_list),
-                ]
-            )
+        all_fields = list(self.resource.header)
+        total_rows, sum_net_amount, jid_data, *has_values = self.get_metrics(
+            [RowCount(), FieldSum("amount"), JournalSequence()]
+            + [FieldAny(field_name) for field_name in all_fields]
         )
-
-        data = resource.read_rows()[0]
-
-        total_rows = data["num_records"]
-
-        # GL - Detail Business Rule ----------------- Netting
-        sum_net_amount = data["total_amount_sum"]
+        data = dict(zip(all_fields, has_values))
 
         # GL - Detail Business Rule ----------------- Controls checks:
         controls_columns = [
@@ -127,7 +93,7 @@ class GLDQS(DQS):
             [field for field in journals_columns if data[field]]
         )
 
-        non_numeric_journal_id, missing_seq_count, null_seq_count = data["jid_data"]
+        non_numeric_journal_id, missing_seq_count, null_seq_count = jid_data
 
         control_check_percentage = self.get_percent(
             controls_columns_present, controls_columns_total
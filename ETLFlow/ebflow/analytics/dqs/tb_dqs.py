@@ -1,36 +1,26 @@
-from frictionless import Pipeline
-
+from ebflow.analytics.dqs.accumulators import DistinctCount, FieldSum, RowCount
 from ebflow.analytics.dqs.dqs import DQS
-from ebflow.utils.custom_steps import custom_aggregate, custom_sum
 
 
 class TBDQS(DQS):
+    def get_accumulators(self):
+        return super().get_accumulators() + [
+            FieldSum("amountBeginning"),
+            FieldSum("amountEnding"),
+            DistinctCount(["glAccountNumber"]),
+            DistinctCount(["businessUnitCode"]),
+        ]
+
     def statistical(self):
-        resource = self.resource.to_copy()
-        resource.transform(
-            Pipeline(
-                steps=[
-                    custom_aggregate(
-                        aggregation={
-                            "num_records": len,
-                            "amount_beginning_sum": ("amountBeginning", custom_sum),
-                            "amount_ending_sum": ("amountEnding", custom_sum),
-                        }
-                    )
-                ]
+        # TB --statistical score-- record count -------
+        # TB --statistical score-- Amount Beginning and Ending Sum -------
+        total_record_trail_bal, amount_beginning_sum, amount_ending_sum = (
+            self.get_metrics(
+                [RowCount(), FieldSum("amountBeginning"), FieldSum("amountEnding")]
             )
         )
-
-        data = resource.read_rows()[0]
-
-        # TB --statistical score-- record count -------
-        total_record_trail_bal = data["num_records"]
         total_fields = len(self.resource.header)
 
-        # TB --statistical score-- Amount Beginning and Ending Sum -------
-        amount_beginning_sum = data["amount_beginning_sum"]
-        amount_ending_sum = data["amount_ending_sum"]
-
         # TB --statistical score-- glAccountNumber -------
         gl_account_code_count = self.get_unique_value_count(["glAccountNumber"])
 
@@ -50,18 +40,7 @@ class TBDQS(DQS):
         ]
 
     def business_rule(self):
-        resource = self.resource.to_copy()
-        resource.transform(
-            Pipeline(
-                steps=[
-                    custom_aggregate(
-                        aggregation={"amount_ending_sum": ("amountEnding", custom_sum)}
-                    )
-                ]
-            )
-        )
-
-        sum_net_amount = resource.read_rows()[0]["amount_ending_sum"]
+        sum_net_amount = self.get_metric(FieldSum("amountEnding"))
 
         # TB --business rule score- netting  -------
         return [{"netting": "pass" if -0.001 <= sum_net_amount <= 0.001 else "fail"}]
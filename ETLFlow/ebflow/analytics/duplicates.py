@@ -0,0 +1,217 @@
+import hashlib
+import heapq
+from decimal import Decimal
+from itertools import groupby
+from typing import Any, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ebflow.analytics.aggregates import read_spill
+from ebflow.analytics.fan_out import SpillBuffer
+
+KEEP_OPTIONS = ["first", "last", "all"]
+# distinct keys held in memory before duplicate detection sorts them on disk
+DEFAULT_MAX_KEYS = 1000000
+KEY_SEPARATOR = "\x1f"
+
+
+def get_value_text(value: Any) -> str:
+    """
+    Text of a key value tagged with its kind, so that two values have the
+    same text when they are equal: numbers of any type (int, float, Decimal,
+    bool) by their exact value, as 1, 1.0 and Decimal("1.00"), and other
+    values by their type and text, so the string "1" is not the number 1.
+    """
+    if isinstance(value, str):
+        return "s:" + value
+    if isinstance(value, (int, float, Decimal)):
+        number = Decimal(value)
+        if not number.is_finite():
+            return "f:" + str(value)
+        if number == number.to_integral_value():
+            return "i:" + str(int(number))
+        return "d:" + format(number, "f").rstrip("0")
+    if value is None:
+        return "n:"
+    return type(value).__name__ + ":" + str(value)
+
+
+def get_key_digest(values: Sequence[Any]) -> bytes:
+    """
+    16 byte digest of the key values, kept instead of the values themselves.
+    Equal values, as compared with ==, have the same digest (see
+    `get_value_text`).
+    """
+    text = KEY_SEPARATOR.join(map(get_value_text, values))
+    return hashlib.blake2b(text.encode("utf-8"), digest_size=16).digest()
+
+
+class ExternalSorter:
+    """Sorts items in runs of `run_size`, spilled to disk and merged."""
+
+    def __init__(self, run_size: int, spill_directory: Optional[str] = None):
+        self.run_size = run_size
+        self.spill_directory = spill_directory
+        self.run: List[Tuple] = []
+        self.spills: List[SpillBuffer] = []
+
+    def add(self, item: Tuple):
+        self.run.append(item)
+        if len(self.run) >= self.run_size:
+            spill = SpillBuffer(self.spill_directory)
+            for sorted_item in sorted(self.run):
+                spill.append(sorted_item)
+            self.spills.append(spill)
+            self.run = []
+
+    def sorted(self) -> Iterator[Tuple]:
+        self.run.sort()
+        return heapq.merge(*[read_spill(spill) for spill in self.spills], iter(self.run))
+
+
+def flag_group(indexes: List[int], keep: str) -> List[int]:
+    """Row indexes of one key flagged as duplicates, `indexes` in row order."""
+    if len(indexes) < 2:
+        return []
+    if keep == "first":
+        return indexes[1:]
+    if keep == "last":
+        return indexes[:-1]
+    return indexes
+
+
+def sort_duplicates(
+    pairs: Iterable[Tuple[bytes, int]],
+    keep: str,
+    run_size: int,
+    spill_directory: Optional[str] = None,
+) -> Iterator[int]:
+    """Sorted indexes of the duplicate rows, from (digest, index) pairs sorted on disk."""
+    by_digest = ExternalSorter(run_size, spill_directory)
+    for pair in pairs:
+        by_digest.add(pair)
+    by_index = ExternalSorter(run_size, spill_directory)
+    for _, group in groupby(by_digest.sorted(), key=lambda pair: pair[0]):
+        for index in flag_group([index for _, index in group], keep):
+            by_index.add((index,))
+    return (item[0] for item in by_index.sorted())
+
+
+def merge_flags(
+    rows: Iterable[Tuple[int, Any, bool]], flagged: Iterator[int]
+) -> Iterator[Tuple[Any, bool]]:
+    """Rows with a flag that is set when known, or when their index is in `flagged`."""
+    next_flagged = next(flagged, None)
+    for index, row, known in rows:
+        while next_flagged is not None and next_flagged < index:
+            next_flagged = next(flagged, None)
+        yield row, known or next_flagged == index
+
+
+def flag_first(
+    rows: Iterable[Sequence[Any]],
+    get_key,
+    max_keys: int,
+    spill_directory: Optional[str],
+) -> Iterator[Tuple[Any, bool]]:
+    seen = set()
+    tail: Optional[SpillBuffer] = None
+    tail_keys = None
+    for index, row in enumerate(rows):
+        digest = get_key(row)
+        if tail is None:
+            if digest in seen:
+                yield row, True
+                continue
+            if len(seen) < max_keys:
+                seen.add(digest)
+                yield row, False
+                continue
+            # out of memory for keys: the rest of the rows waits on disk
+            tail = SpillBuffer(spill_directory)
+            tail_keys = ExternalSorter(max_keys, spill_directory)
+        known = digest in seen
+        if not known:
+            tail_keys.add((digest, index))
+        tail.append((index, row, known))
+    if tail is None:
+        return
+    pairs = tail_keys.sorted()
+    yield from merge_flags(
+        read_spill(tail),
+        sort_duplicates(pairs, "first", max_keys, spill_directory),
+    )
+
+
+def flag_last_or_all(
+    rows: Iterable[Sequence[Any]],
+    get_key,
+    keep: str,
+    max_keys: int,
+    spill_directory: Optional[str],
+) -> Iterator[Tuple[Any, bool]]:
+    # rows are kept on disk for the second pass, rather than reading the source again
+    spill = SpillBuffer(spill_directory)
+    occurrences: Optional[Dict[bytes, Tuple[int, int]]] = {}
+    try:
+        for index, row in enumerate(rows):
+            digest = get_key(row)
+            spill.append((digest, row))
+            if occurrences is None:
+                continue
+            if digest in occurrences:
+                occurrences[digest] = (occurrences[digest][0] + 1, index)
+            elif len(occurrences) < max_keys:
+                occurrences[digest] = (1, index)
+            else:
+                occurrences = None
+
+        if occurrences is not None:
+            for index, (digest, row) in enumerate(spill.replay()):
+                count, last_index = occurrences[digest]
+                yield row, count > 1 and (keep == "all" or index != last_index)
+            return
+
+        flagged = sort_duplicates(
+            ((digest, index) for index, (digest, _) in enumerate(spill.replay())),
+            keep,
+            max_keys,
+            spill_directory,
+        )
+        yield from merge_flags(
+            ((index, row, False) for index, (_, row) in enumerate(spill.replay())),
+            flagged,
+        )
+    finally:
+        spill.close()
+
+
+def flag_duplicates_in_rows(
+    rows: Iterable[Sequence[Any]],
+    key_indexes: Optional[List[int]] = None,
+    keep: str = "first",
+    max_keys: int = DEFAULT_MAX_KEYS,
+    spill_directory: Optional[str] = None,
+) -> Iterator[Tuple[Any, bool]]:
+    """
+    Every row with whether it duplicates another row with the same key, the
+    values at `key_indexes` or the whole row.
+
+    `first` flags every occurrence of a key but the first, `last` every
+    occurrence but the last and `all` every occurrence of a key seen more
+    than once. Keys are kept as digests in a hash set, so `first` flags the
+    rows as they stream by; `last` and `all` keep the rows on disk for a
+    second pass. Beyond `max_keys` distinct keys the digests are sorted on
+    disk instead, with the pending rows spilled to disk as well.
+    """
+    if keep not in KEEP_OPTIONS:
+        raise ValueError(
+            f"Invalid keep option {keep}, use one of {', '.join(KEEP_OPTIONS)}"
+        )
+
+    def get_key(row):
+        return get_key_digest(
+            row if key_indexes is None else [row[index] for index in key_indexes]
+        )
+
+    if keep == "first":
+        return flag_first(rows, get_key, max_keys, spill_directory)
+    return flag_last_or_all(rows, get_key, keep, max_keys, spill_directory)
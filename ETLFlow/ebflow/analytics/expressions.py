@@ -0,0 +1,184 @@
+import ast
+import functools
+from decimal import Decimal
+from typing import Any, Dict, Iterator, List
+
+DEFAULT_BATCH_ROWS = 10000
+
+ALLOWED_NODES = (
+    ast.Expression,
+    ast.BinOp,
+    ast.UnaryOp,
+    ast.Constant,
+    ast.Name,
+    ast.Load,
+    ast.Add,
+    ast.Sub,
+    ast.Mult,
+    ast.Div,
+    ast.FloorDiv,
+    ast.Mod,
+    ast.Pow,
+    ast.UAdd,
+    ast.USub,
+    ast.Call,
+)
+DIVISION_NODES = (ast.Div, ast.FloorDiv, ast.Mod)
+# built-in functions an expression can call, with their (min, max) number of arguments
+ALLOWED_FUNCTIONS = {
+    "abs": (1, 1),
+    "round": (1, 2),
+    "min": (2, None),
+    "max": (2, None),
+}
+FUNCTIONS = {"abs": abs, "round": round, "min": min, "max": max}
+
+
+def get_numpy():
+    """NumPy, when installed. It is optional, only the batch mode uses it."""
+    try:
+        import numpy
+
+        return numpy
+    except ImportError:
+        return None
+
+
+def get_array_functions(numpy) -> Dict[str, Any]:
+    """The allowed functions, element-wise over NumPy arrays."""
+    return {
+        "abs": numpy.abs,
+        "round": numpy.round,
+        "min": lambda *values: functools.reduce(numpy.minimum, values),
+        "max": lambda *values: functools.reduce(numpy.maximum, values),
+    }
+
+
+def check_call(node: ast.Call):
+    if not isinstance(node.func, ast.Name) or node.func.id not in ALLOWED_FUNCTIONS:
+        raise ValueError("Invalid expression")
+    min_args, max_args = ALLOWED_FUNCTIONS[node.func.id]
+    if (
+        node.keywords
+        or len(node.args) < min_args
+        or (max_args is not None and len(node.args) > max_args)
+    ):
+        raise ValueError(f"Invalid arguments for {node.func.id} in expression")
+
+
+def to_number(value: Any) -> Any:
+    """
+    A column value as the number the expression sees. Empty values count as
+    0, and Decimals with a fractional part become floats, as when the value
+    was written into the expression text.
+    """
+    if not value:
+        return 0
+    if isinstance(value, Decimal):
+        return int(value) if value.as_tuple().exponent >= 0 else float(value)
+    if isinstance(value, str):
+        try:
+            return int(value)
+        except ValueError:
+            return float(value)
+    return value
+
+
+class CompiledExpression:
+    """
+    An arithmetic expression over column variables, parsed and checked once
+    and compiled to a code object. Only numbers, variables, + - * / // % **,
+    parentheses and calls of abs, round, min and max are allowed.
+    `variables` maps every variable used in the expression to the column it
+    reads.
+    """
+
+    def __init__(self, expression: str, variables: Dict[str, str]):
+        self.expression = expression
+        self.variables = dict(variables)
+        try:
+            tree = ast.parse(expression.strip(), mode="eval")
+        except SyntaxError:
+            raise ValueError("Expression is syntactically incorrect")
+        names = set()
+        functions = set()
+        for node in ast.walk(tree):
+            if not isinstance(node, ALLOWED_NODES):
+                raise ValueError("Invalid expression")
+            if isinstance(node, ast.Call):
+                check_call(node)
+                functions.add(id(node.func))
+            if isinstance(node, ast.Constant) and not isinstance(node.value, (int, float)):
+                raise ValueError("Invalid expression")
+            if isinstance(node, ast.Name) and id(node) not in functions:
+                names.add(node.id)
+            if (
+                isinstance(node, ast.BinOp)
+                and isinstance(node.op, DIVISION_NODES)
+                and isinstance(node.right, ast.Constant)
+                and node.right.value == 0
+            ):
+                raise ValueError("Expression contains division by zero")
+        if names - set(self.variables):
+            raise ValueError("Expression contains extra variables")
+        self.names = sorted(names)
+        self.code = compile(tree, "<expression>", "eval")
+
+    def __call__(self, row) -> Any:
+        return eval(
+            self.code,
+            {"__builtins__": {}, **FUNCTIONS},
+            {name: to_number(row[self.variables[name]]) for name in self.names},
+        )
+
+    def evaluate_batch(self, columns: Dict[str, List[Any]], size: int) -> List[Any]:
+        """
+        Evaluate over whole columns at once. With NumPy the expression runs on
+        float arrays, so every result is a float; without it, value by value
+        with the compiled code.
+        """
+        numpy = get_numpy()
+        values = {
+            name: [to_number(value) for value in columns[name]] for name in self.names
+        }
+        if numpy is None or not self.names:
+            return [
+                eval(
+                    self.code,
+                    {"__builtins__": {}, **FUNCTIONS},
+                    {name: values[name][idx] for name in self.names},
+                )
+                for idx in range(size)
+            ]
+        arrays = {name: numpy.asarray(values[name], dtype=float) for name in self.names}
+        with numpy.errstate(divide="raise", invalid="raise"):
+            try:
+                result = eval(
+                    self.code,
+                    {"__builtins__": {}, **get_array_functions(numpy)},
+                    arrays,
+                )
+            except FloatingPointError as ex:
+                raise ValueError(f"Error in expression {self.expression}: {str(ex)}")
+        return numpy.broadcast_to(result, (size,)).tolist()
+
+    def evaluate_rows(
+        self, rows: Iterator[List[Any]], indexes: Dict[str, int], batch_rows: int
+    ) -> Iterator[List[Any]]:
+        """Append the value of the expression to every row, `batch_rows` rows at a time."""
+        batch: List[List[Any]] = []
+
+        def flush():
+            columns = {
+                name: [row[indexes[name]] for row in batch] for name in self.names
+            }
+            for row, value in zip(batch, self.evaluate_batch(columns, len(batch))):
+                yield list(row) + [value]
+            batch.clear()
+
+        for row in rows:
+            batch.append(row)
+            if len(batch) >= batch_rows:
+                yield from flush()
+        if batch:
+            yield from flush()
@@ -0,0 +1,187 @@
+import pickle
+import tempfile
+import threading
+from collections import deque
+from typing import Any, Iterable, Iterator, List, Optional
+
+from ebflow.analytics.workspace import find_workspace
+
+DEFAULT_BUFFER_ROWS = 10000
+DEFAULT_REPLAY_ROWS = 1000
+
+_EXHAUSTED = object()
+
+
+class SpillBuffer:
+    """
+    FIFO of rows kept in an anonymous temporary file, used when a branch falls
+    too far behind the others to keep its backlog in memory. The size of the
+    file counts against the quota of the workspace owning `spill_directory`.
+    """
+
+    def __init__(self, spill_directory: Optional[str] = None):
+        self.spill_directory = spill_directory
+        self.workspace = find_workspace(spill_directory)
+        self.file = None
+        self.file_size = 0
+        self.write_position = 0
+        self.read_position = 0
+        self.pending = 0
+
+    def resize(self, size: int):
+        if self.workspace is not None:
+            self.workspace.charge(size - self.file_size)
+        self.file_size = size
+
+    def append(self, row: List[Any]):
+        if self.file is None:
+            self.file = tempfile.TemporaryFile(dir=self.spill_directory)
+        self.file.seek(self.write_position)
+        pickle.dump(row, self.file, protocol=pickle.HIGHEST_PROTOCOL)
+        self.write_position = self.file.tell()
+        self.pending += 1
+        if self.write_position > self.file_size:
+            self.resize(self.write_position)
+
+    def popleft(self) -> List[Any]:
+        self.file.seek(self.read_position)
+        row = pickle.load(self.file)
+        self.read_position = self.file.tell()
+        self.pending -= 1
+        if self.pending == 0:
+            # everything was replayed, reuse the file from the start
+            self.file.seek(0)
+            self.file.truncate()
+            self.write_position = self.read_position = 0
+            self.resize(0)
+        return row
+
+    def replay(self) -> Iterator[Any]:
+        """Every row appended so far, from the start, without consuming them."""
+        position = 0
+        while self.file is not None and position < self.write_position:
+            self.file.seek(position)
+            row = pickle.load(self.file)
+            position = self.file.tell()
+            yield row
+
+    def close(self):
+        if self.file is not None:
+            self.file.close()
+            self.file = None
+            self.resize(0)
+
+
+class RowTee:
+    """
+    Reads a row iterator exactly once and hands every row to each branch.
+
+    Branches pull at their own pace; rows a branch has not consumed yet are
+    buffered in memory up to `buffer_rows` and spilled to disk beyond that,
+    so a slow branch never forces the source to be read again.
+    """
+
+    def __init__(
+        self,
+        rows: Iterable[List[Any]],
+        branches: int,
+        buffer_rows: int = DEFAULT_BUFFER_ROWS,
+        spill_directory: Optional[str] = None,
+    ):
+        self.source = iter(rows)
+        self.buffer_rows = buffer_rows
+        self.lock = threading.Lock()
+        self.buffers = [deque() for _ in range(branches)]
+        self.spills = [SpillBuffer(spill_directory) for _ in range(branches)]
+        self.active = [True] * branches
+        self.exhausted = False
+        self.rows_read = 0
+
+    def next_row(self, branch: int):
+        with self.lock:
+            if self.buffers[branch]:
+                return self.buffers[branch].popleft()
+            if self.spills[branch].pending:
+                return self.spills[branch].popleft()
+            if self.exhausted:
+                return _EXHAUSTED
+
+            try:
+                row = next(self.source)
+            except StopIteration:
+                self.exhausted = True
+                return _EXHAUSTED
+
+            self.rows_read += 1
+            for other in range(len(self.buffers)):
+                if other == branch or not self.active[other]:
+                    continue
+                # once a branch spilled, keep spilling so its rows stay in order
+                if (
+                    self.spills[other].pending
+                    or len(self.buffers[other]) >= self.buffer_rows
+                ):
+                    self.spills[other].append(row)
+                else:
+                    self.buffers[other].append(row)
+            return row
+
+    def release(self, branch: int):
+        """Stop buffering for a branch that finished or failed."""
+        with self.lock:
+            self.active[branch] = False
+            self.buffers[branch].clear()
+            self.spills[branch].close()
+
+    def close(self):
+        for branch in range(len(self.buffers)):
+            self.release(branch)
+
+
+class BranchReader:
+    """
+    Re-iterable data source for one tee branch, meant to be used as the `data`
+    of an inline TableResource.
+
+    frictionless opens a resource more than once (to infer it and then to
+    read it), so the first `replay_rows` rows are kept and replayed to later
+    iterations; only one iteration may go past that window.
+    """
+
+    def __init__(
+        self,
+        tee: RowTee,
+        branch: int,
+        header: List[str],
+        replay_rows: int = DEFAULT_REPLAY_ROWS,
+    ):
+        self.tee = tee
+        self.branch = branch
+        self.header = header
+        self.replay_rows = replay_rows
+        self.replay = []
+        self.position = 0
+        self.finished = False
+
+    def __call__(self) -> Iterator[List[Any]]:
+        yield self.header
+        position = 0
+        while True:
+            if position < len(self.replay):
+                row = self.replay[position]
+            elif position == self.position:
+                if self.finished:
+                    return
+                row = self.tee.next_row(self.branch)
+                if row is _EXHAUSTED:
+                    self.finished = True
+                    return
+                self.position += 1
+                if len(self.replay) < self.replay_rows:
+                    self.replay.append(row)
+            else:
+                raise ValueError(
+                    f"Fan-out branch re-read past its replay window of {self.replay_rows} rows"
+                )
+            position += 1
+            yield row
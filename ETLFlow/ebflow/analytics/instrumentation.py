@@ -0,0 +1,361 @@
+import io
+import threading
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime
+from typing import Any, Dict, List, Optional
+
+import attrs
+import jsonlines
+from frictionless import Step
+from frictionless_azureblob import get_transferred_bytes
+
+from ebflow.analytics.analytics_schema import Node
+from ebflow.analytics.checkpoint import is_blob_path
+
+# time spent in nested (upstream) steps, per thread, to derive the self time of a step
+nested_time = threading.local()
+
+
+class Span:
+    """
+    Measurements of one node, or of one generated step of a node.
+
+    Steps are lazy, so a step span is filled while the rows are pulled
+    through it by the load that writes them. `wall_time` and `cpu_time`
+    include the upstream steps feeding it, `self_wall_time` and
+    `self_cpu_time` do not. A table read several times (infer, then write)
+    adds up the time of every read and keeps the largest row count.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        node_id: str,
+        label: Optional[str],
+        operation: str,
+        step: Optional[str] = None,
+        index: Optional[int] = None,
+    ):
+        self.kind = kind
+        self.node_id = node_id
+        self.label = label
+        self.operation = operation
+        self.step = step
+        self.index = index
+        self.started_at: Optional[str] = None
+        self.wall_time = 0.0
+        self.cpu_time = 0.0
+        self.self_wall_time = 0.0
+        self.self_cpu_time = 0.0
+        self.rows_in: Optional[int] = None
+        self.rows_out: Optional[int] = None
+        self.iterations = 0
+        self.bytes_read = 0
+        self.bytes_written = 0
+        self.peak_memory: Optional[int] = None
+        self.upstream: Optional["Span"] = None
+
+    @classmethod
+    def for_node(cls, kind: str, node: Node, **kwargs) -> "Span":
+        return cls(
+            kind,
+            node.id,
+            node.data.label,
+            node.data.operation_name or node.data.type,
+            **kwargs,
+        )
+
+    def to_dict(self) -> Dict[str, Any]:
+        return {
+            "kind": self.kind,
+            "node_id": self.node_id,
+            "label": self.label,
+            "operation": self.operation,
+            "step": self.step,
+            "index": self.index,
+            "started_at": self.started_at,
+            "wall_time": round(self.wall_time, 6),
+            "cpu_time": round(self.cpu_time, 6),
+            "self_wall_time": round(self.self_wall_time, 6),
+            "self_cpu_time": round(self.self_cpu_time, 6),
+            "rows_in": self.rows_in,
+            "rows_out": self.rows_out,
+            "iterations": self.iterations,
+            "bytes_read": self.bytes_read,
+            "bytes_written": self.bytes_written,
+            "peak_memory": self.peak_memory,
+        }
+
+    def describe(self) -> str:
+        rows_in = "?" if self.rows_in is None else self.rows_in
+        rows_out = "?" if self.rows_out is None else self.rows_out
+        description = (
+            f"{self.step if self.kind == 'step' else self.label + ' ' + self.operation}"
+            f" (time={self.wall_time:.3f}s self={self.self_wall_time:.3f}s"
+            f" cpu={self.cpu_time:.3f}s rows={rows_in}->{rows_out}"
+        )
+        if self.iterations > 1:
+            description += f" reads={self.iterations}"
+        if self.bytes_read or self.bytes_written:
+            description += f" blob_read={self.bytes_read}B blob_written={self.bytes_written}B"
+        if self.peak_memory is not None:
+            description += f" peak_memory={self.peak_memory}B"
+        return description + ")"
+
+
+class InstrumentedData:
+    """Row source of an instrumented step, timing and counting every row pulled."""
+
+    def __init__(self, data: Any, span: Span):
+        self.data = data
+        self.span = span
+
+    def __repr__(self):
+        return "<instrumented-data>"
+
+    def __iter__(self):
+        span = self.span
+        stack = nested_time.__dict__.setdefault("stack", [])
+        iterator = iter(self.data() if callable(self.data) else self.data)
+        rows = 0
+        span.iterations += 1
+        try:
+            while True:
+                stack.append([0.0, 0.0])
+                start_wall = time.perf_counter()
+                start_cpu = time.thread_time()
+                try:
+                    row = next(iterator)
+                except StopIteration:
+                    return
+                finally:
+                    wall = time.perf_counter() - start_wall
+                    cpu = time.thread_time() - start_cpu
+                    nested_wall, nested_cpu = stack.pop()
+                    if stack:
+                        stack[-1][0] += wall
+                        stack[-1][1] += cpu
+                    span.wall_time += wall
+                    span.cpu_time += cpu
+                    span.self_wall_time += wall - nested_wall
+                    span.self_cpu_time += cpu - nested_cpu
+                rows += 1
+                yield row
+        finally:
+            # the first row of a table is its header
+            span.rows_out = max(span.rows_out or 0, rows - 1)
+
+
+@attrs.define(kw_only=True, repr=False)
+class instrumented_step(Step):
+    type = "instrumented"
+
+    step: Step
+    span: Any
+    # Transform
+
+    def transform_resource(self, resource):
+        data = resource.data
+        upstream = getattr(data, "data", data)
+        if isinstance(upstream, InstrumentedData):
+            self.span.upstream = upstream.span
+        self.step.transform_resource(resource)
+        if resource.data is not data:
+            resource.data = InstrumentedData(resource.data, self.span)
+
+    # Metadata
+
+    metadata_profile_patch = {
+        "type": "object",
+        "required": ["step"],
+        "properties": {
+            "step": {"type": "object"},
+        },
+    }
+
+
+class PipelineProfiler:
+    """
+    Runtime instrumentation of a pipeline run, passed as
+    `process(profiler=PipelineProfiler())`.
+
+    Records a span for every node and for every step generated for it: wall
+    and CPU time, rows in and out, bytes moved through the Azure blob loader
+    and, with `trace_memory`, the tracemalloc peak. Memory and blob counters
+    are taken around each node, so with several workers the memory peak of
+    concurrent nodes overlaps.
+    """
+
+    def __init__(self, trace_memory: bool = True):
+        self.trace_memory = trace_memory
+        self.spans: List[Span] = []
+        self.started_tracing = False
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def detached(self) -> "PipelineProfiler":
+        """Empty profiler for a worker process, its spans are merged back."""
+        return PipelineProfiler(trace_memory=self.trace_memory)
+
+    def merge(self, spans: List[Span]):
+        with self.lock:
+            self.spans.extend(spans)
+
+    def start(self):
+        if self.trace_memory and not tracemalloc.is_tracing():
+            tracemalloc.start()
+            self.started_tracing = True
+
+    def stop(self):
+        if self.started_tracing:
+            tracemalloc.stop()
+            self.started_tracing = False
+
+    def add_span(self, span: Span) -> Span:
+        with self.lock:
+            self.spans.append(span)
+        return span
+
+    def get_node_span(self, node: Node) -> Span:
+        with self.lock:
+            for span in self.spans:
+                if span.kind == "node" and span.node_id == node.id:
+                    return span
+            span = Span.for_node("node", node)
+            self.spans.append(span)
+            return span
+
+    @contextmanager
+    def profile_node(self, node: Node):
+        span = self.get_node_span(node)
+        span.started_at = span.started_at or datetime.utcnow().strftime(
+            "%Y-%m-%dT%H:%M:%SZ"
+        )
+        start_read, start_written = get_transferred_bytes()
+        start_memory = None
+        if tracemalloc.is_tracing():
+            tracemalloc.reset_peak()
+            start_memory = tracemalloc.get_traced_memory()[0]
+        start_wall = time.perf_counter()
+        start_cpu = time.thread_time()
+        try:
+            yield span
+        finally:
+            wall = time.perf_counter() - start_wall
+            cpu = time.thread_time() - start_cpu
+            span.wall_time += wall
+            span.cpu_time += cpu
+            span.self_wall_time += wall
+            span.self_cpu_time += cpu
+            span.iterations += 1
+            end_read, end_written = get_transferred_bytes()
+            span.bytes_read += end_read - start_read
+            span.bytes_written += end_written - start_written
+            if start_memory is not None and tracemalloc.is_tracing():
+                peak = tracemalloc.get_traced_memory()[1] - start_memory
+                span.peak_memory = max(span.peak_memory or 0, peak)
+
+    def instrument(self, steps: List[Step], node: Node) -> List[Step]:
+        """Wrap the steps generated for `node`, each gets a span of its own."""
+        return [
+            instrumented_step(
+                step=step,
+                span=self.add_span(
+                    Span.for_node("step", node, step=step.type, index=index)
+                ),
+            )
+            for index, step in enumerate(steps)
+        ]
+
+    def instrument_fused(self, step: Step, spans: List[Span]) -> Step:
+        """
+        Wrap a step fused from several instrumented steps. Their spans are
+        replaced by one, owned by the node of the last fused step.
+        """
+        last = spans[-1]
+        span = Span(
+            "step",
+            last.node_id,
+            last.label,
+            last.operation,
+            step=f"fused({' + '.join(span.step for span in spans)})",
+            index=last.index,
+        )
+        with self.lock:
+            positions = [
+                idx
+                for idx, existing in enumerate(self.spans)
+                if any(existing is fused for fused in spans)
+            ]
+            for idx in reversed(positions):
+                del self.spans[idx]
+            self.spans.insert(positions[0] if positions else len(self.spans), span)
+        return instrumented_step(step=step, span=span)
+
+    def record_load(self, node: Node, steps: List[Step]):
+        """Rows read from the source and rows written by one input of a load."""
+        spans = [step.span for step in steps if isinstance(step, instrumented_step)]
+        if not spans:
+            return
+        node_span = self.get_node_span(node)
+        with self.lock:
+            node_span.rows_in = (node_span.rows_in or 0) + (spans[0].rows_out or 0)
+            node_span.rows_out = (node_span.rows_out or 0) + (spans[-1].rows_out or 0)
+
+    def finalize(self):
+        """Fill in rows in of steps and nodes, once the rows have been pulled."""
+        for span in self.spans:
+            if span.kind == "step" and span.upstream is not None:
+                span.rows_in = span.upstream.rows_out
+        for span in self.spans:
+            if span.kind != "node" or span.operation == "load":
+                continue
+            steps = self.get_step_spans(span.node_id)
+            if steps:
+                span.rows_in = steps[0].rows_in
+                span.rows_out = steps[-1].rows_out
+
+    def get_step_spans(self, node_id: str) -> List[Span]:
+        return [
+            span
+            for span in self.spans
+            if span.kind == "step" and span.node_id == node_id
+        ]
+
+    def summary(self) -> List[str]:
+        """EXPLAIN ANALYZE style lines, one per node followed by its steps."""
+        self.finalize()
+        lines = []
+        for span in self.spans:
+            if span.kind != "node":
+                continue
+            lines.append(span.describe())
+            for step_span in self.get_step_spans(span.node_id):
+                lines.append(f"  -> {step_span.describe()}")
+        return lines
+
+    def export(self, path: str):
+        """Write the spans as JSON lines to a local file or an Azure blob."""
+        self.finalize()
+        content = io.StringIO()
+        with jsonlines.Writer(content) as writer:
+            writer.write_all(span.to_dict() for span in self.spans)
+        if is_blob_path(path):
+            from frictionless_azureblob import create_blob_client
+
+            create_blob_client(path).upload_blob(
+                content.getvalue().encode("utf-8"), overwrite=True
+            )
+        else:
+            with open(path, "w") as file:
+                file.write(content.getvalue())
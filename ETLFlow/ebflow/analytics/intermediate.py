@@ -0,0 +1,193 @@
+import json
+import pickle
+from typing import Any, Iterable, Iterator, List, Optional
+
+from frictionless import Schema, fields
+from frictionless.resources import TableResource
+
+DEFAULT_BATCH_ROWS = 10000
+PICKLE_FORMAT = "ebflow-columns"
+SCHEMA_METADATA_KEY = b"frictionless_schema"
+
+
+def get_pyarrow():
+    """pyarrow, when installed. It is optional, intermediates are pickled without it."""
+    try:
+        import pyarrow
+        import pyarrow.ipc
+
+        return pyarrow
+    except ImportError:
+        return None
+
+
+def get_arrow_schema(schema: Schema) -> Optional[Any]:
+    """
+    Arrow schema matching a frictionless schema, or None when a field has no
+    lossless Arrow type, as any, object or array fields holding values of any
+    type. Numbers are Decimals of unknown precision and scale, they are
+    stored as their text and read back through their field, from the
+    frictionless schema kept in the metadata.
+    """
+    pyarrow = get_pyarrow()
+    if pyarrow is None:
+        return None
+    types = {
+        "integer": pyarrow.int64(),
+        "boolean": pyarrow.bool_(),
+        "string": pyarrow.string(),
+        "number": pyarrow.string(),
+        "date": pyarrow.date32(),
+        "time": pyarrow.time64("us"),
+        "datetime": pyarrow.timestamp("us"),
+    }
+    arrow_fields = []
+    for field in schema.fields:
+        if field.type not in types:
+            return None
+        arrow_fields.append(pyarrow.field(field.name, types[field.type]))
+    metadata = {SCHEMA_METADATA_KEY: json.dumps(schema.to_descriptor()).encode("utf-8")}
+    return pyarrow.schema(arrow_fields, metadata=metadata)
+
+
+def get_number_indexes(schema: Schema) -> List[int]:
+    return [idx for idx, field in enumerate(schema.fields) if field.type == "number"]
+
+
+def iterate_batches(
+    rows: Iterable[List[Any]], batch_rows: int
+) -> Iterator[List[List[Any]]]:
+    """Rows regrouped into lists of columns, `batch_rows` rows at a time."""
+    batch: List[List[Any]] = []
+    for row in rows:
+        batch.append(row)
+        if len(batch) >= batch_rows:
+            yield [list(column) for column in zip(*batch)]
+            batch = []
+    if batch:
+        yield [list(column) for column in zip(*batch)]
+
+
+def write_intermediate(
+    rows: Iterable[List[Any]],
+    schema: Schema,
+    path: str,
+    batch_rows: int = DEFAULT_BATCH_ROWS,
+) -> str:
+    """
+    Write typed rows with their schema to `path`, column by column, and
+    return the format used: Arrow IPC when pyarrow is installed and every
+    field has an Arrow type, otherwise pickled column batches.
+    """
+    arrow_schema = get_arrow_schema(schema)
+    if arrow_schema is not None:
+        pyarrow = get_pyarrow()
+        number_indexes = get_number_indexes(schema)
+        with pyarrow.ipc.new_file(path, arrow_schema) as writer:
+            for columns in iterate_batches(rows, batch_rows):
+                for idx in number_indexes:
+                    columns[idx] = [
+                        None if value is None else str(value) for value in columns[idx]
+                    ]
+                writer.write_batch(
+                    pyarrow.record_batch(
+                        [
+                            pyarrow.array(column, type=field.type)
+                            for column, field in zip(columns, arrow_schema)
+                        ],
+                        schema=arrow_schema,
+                    )
+                )
+        return "arrow"
+
+    with open(path, "wb") as file:
+        header = {"format": PICKLE_FORMAT, "schema": schema.to_descriptor()}
+        pickle.dump(header, file, protocol=pickle.HIGHEST_PROTOCOL)
+        for columns in iterate_batches(rows, batch_rows):
+            pickle.dump(columns, file, protocol=pickle.HIGHEST_PROTOCOL)
+    return PICKLE_FORMAT
+
+
+def read_rows(path: str, file_format: str) -> Iterator[List[Any]]:
+    if file_format == "arrow":
+        pyarrow = get_pyarrow()
+        with pyarrow.memory_map(path) as source:
+            reader = pyarrow.ipc.open_file(source)
+            schema = Schema.from_descriptor(
+                json.loads(reader.schema.metadata[SCHEMA_METADATA_KEY])
+            )
+            # the text is always written with a dot and no group separator
+            number_fields = [
+                (
+                    idx,
+                    fields.NumberField(
+                        name=schema.fields[idx].name,
+                        float_number=schema.fields[idx].float_number,
+                    ),
+                )
+                for idx in get_number_indexes(schema)
+            ]
+            for batch_index in range(reader.num_record_batches):
+                batch = reader.get_batch(batch_index)
+                columns = [column.to_pylist() for column in batch.columns]
+                for idx, field in number_fields:
+                    columns[idx] = [
+                        None if value is None else field.read_cell(value)[0]
+                        for value in columns[idx]
+                    ]
+                yield from (list(row) for row in zip(*columns))
+        return
+
+    with open(path, "rb") as file:
+        pickle.load(file)
+        while True:
+            try:
+                columns = pickle.load(file)
+            except EOFError:
+                return
+            yield from (list(row) for row in zip(*columns))
+
+
+class IntermediateData:
+    """Header and rows of an intermediate file, read again on every iteration."""
+
+    def __init__(self, path: str, file_format: str, header: List[str]):
+        self.path = path
+        self.file_format = file_format
+        self.header = header
+
+    def __repr__(self):
+        return f"<intermediate-data {self.path}>"
+
+    def __iter__(self):
+        yield list(self.header)
+        yield from read_rows(self.path, self.file_format)
+
+
+def read_intermediate(path: str, file_format: str, schema: Schema) -> TableResource:
+    """
+    Resource over an intermediate file, with the schema it was written
+    with, so nothing is inferred or parsed from text when it is read.
+    """
+    return TableResource(
+        data=IntermediateData(path, file_format, schema.field_names),
+        schema=schema.to_copy(),
+        format="inline",
+    )
+
+
+def materialize(
+    resource: TableResource, path: str, batch_rows: int = DEFAULT_BATCH_ROWS
+) -> TableResource:
+    """
+    Run `resource` once into an intermediate file at `path` and return a
+    resource reading it back with the same schema and typed values.
+    """
+    resource = resource.to_copy()
+    with resource:
+        schema = resource.schema.to_copy()
+        file_format = write_intermediate(
+            (row.to_list() for row in resource.row_stream), schema, path, batch_rows
+        )
+    return read_intermediate(path, file_format, schema)
+
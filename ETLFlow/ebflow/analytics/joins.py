@@ -0,0 +1,206 @@
+import math
+from decimal import Decimal
+from itertools import chain
+from typing import Any, Callable, Dict, Iterable, Iterator, List, Optional, Sequence, Tuple
+
+from ebflow.analytics.duplicates import DEFAULT_MAX_KEYS, get_key_digest
+
+Row = Sequence[Any]
+DEFAULT_FALSE_POSITIVE_RATE = 0.001
+
+
+def is_number(value: Any) -> bool:
+    return isinstance(value, (int, float, Decimal)) and not isinstance(value, bool)
+
+
+def compare_values(value1: Any, value2: Any) -> str:
+    """
+    Difference of two numbers (int, float or Decimal, negatives included) or
+    of two strings of digits, otherwise whether the values are equal, as text.
+    """
+    if is_number(value1) and is_number(value2):
+        if isinstance(value1, int) and isinstance(value2, int):
+            return str(value1 - value2)
+        return str(Decimal(str(value1)) - Decimal(str(value2)))
+    if str(value1).isnumeric() and str(value2).isnumeric():
+        return str(int(value1) - int(value2))
+    return str(str(value1) == str(value2))
+
+
+def get_key(row: Row, key_indexes: List[int]) -> Tuple:
+    return tuple(row[index] for index in key_indexes)
+
+
+def split_smaller_side(
+    left_rows: Iterable[Row], right_rows: Iterable[Row]
+) -> Tuple[bool, List[Row], Iterator[Row]]:
+    """
+    Read both sides in turn until one of them ends, without knowing their
+    sizes up front. Returns whether the left side is the smaller one, its
+    rows, and the rows of the larger side, the ones read so far first. At
+    most twice the rows of the smaller side are held.
+    """
+    iterators = (iter(left_rows), iter(right_rows))
+    read: Tuple[List[Row], List[Row]] = ([], [])
+    while True:
+        for side in (0, 1):
+            try:
+                read[side].append(next(iterators[side]))
+            except StopIteration:
+                other = 1 - side
+                return side == 0, read[side], chain(read[other], iterators[other])
+
+
+def hash_outer_join(
+    left_rows: Iterable[Row],
+    right_rows: Iterable[Row],
+    left_key_indexes: List[int],
+    right_key_indexes: List[int],
+) -> Iterator[Tuple[Optional[Row], Optional[Row]]]:
+    """
+    Full outer join of two row streams on the values at the key indexes,
+    yielding (left row, right row) pairs with None for the missing side.
+
+    The smaller side is held in a hash table and the larger one streamed
+    past it once: matched and unmatched rows of the larger side come in its
+    order, followed by the rows of the smaller side that matched nothing.
+    Like the sorted outer join, None keys match each other.
+    """
+    build_is_left, build_rows, probe_rows = split_smaller_side(left_rows, right_rows)
+    build_key, probe_key = (
+        (left_key_indexes, right_key_indexes)
+        if build_is_left
+        else (right_key_indexes, left_key_indexes)
+    )
+
+    def pair(probe_row, build_row):
+        return (build_row, probe_row) if build_is_left else (probe_row, build_row)
+
+    table: Dict[Tuple, List[Row]] = {}
+    for row in build_rows:
+        table.setdefault(get_key(row, build_key), []).append(row)
+    build_rows.clear()
+
+    matched = set()
+    for row in probe_rows:
+        key = get_key(row, probe_key)
+        matches = table.get(key)
+        if matches is None:
+            yield pair(row, None)
+            continue
+        matched.add(key)
+        for build_row in matches:
+            yield pair(row, build_row)
+
+    for key, rows in table.items():
+        if key in matched:
+            continue
+        for build_row in rows:
+            yield pair(None, build_row)
+
+
+class BloomFilter:
+    """
+    Set of digests in a fixed number of bits, sized for `capacity` digests at
+    `false_positive_rate`. Lookups can answer yes for a digest never added,
+    never no for one that was.
+    """
+
+    def __init__(
+        self, capacity: int, false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE
+    ):
+        capacity = max(capacity, 1)
+        self.size = max(
+            8, int(-capacity * math.log(false_positive_rate) / math.log(2) ** 2)
+        )
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+
+    def get_positions(self, digest: bytes) -> Iterator[int]:
+        # double hashing on the two halves of the digest
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:16], "little") | 1
+        return ((first + idx * second) % self.size for idx in range(self.hashes))
+
+    def add(self, digest: bytes):
+        for position in self.get_positions(digest):
+            self.bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, digest: bytes) -> bool:
+        return all(
+            self.bits[position >> 3] & (1 << (position & 7))
+            for position in self.get_positions(digest)
+        )
+
+
+def get_row_digest(row: Row, key_indexes: Optional[List[int]]) -> bytes:
+    return get_key_digest(
+        row if key_indexes is None else [row[index] for index in key_indexes]
+    )
+
+
+def build_key_counts(
+    get_rows: Callable[[], Iterable[Row]],
+    key_indexes: Optional[List[int]],
+    count_matches: bool = False,
+    max_keys: int = DEFAULT_MAX_KEYS,
+    false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+) -> Any:
+    """
+    Digests of the keys of the rows from `get_rows`, with the number of rows
+    of every key when `count_matches`. Beyond `max_keys` distinct keys, the
+    remaining rows are counted and all the rows read again into a Bloom
+    filter sized for them instead. Counts need every key, so they are not
+    capped.
+    """
+    keys: Dict[bytes, int] = {}
+    rows = iter(get_rows())
+    for row in rows:
+        digest = get_row_digest(row, key_indexes)
+        if digest in keys:
+            keys[digest] += 1
+        elif count_matches or len(keys) < max_keys:
+            keys[digest] = 1
+        else:
+            break
+    else:
+        return keys
+
+    keys.clear()
+    capacity = max_keys + 1 + sum(1 for _ in rows)
+    bloom = BloomFilter(capacity, false_positive_rate)
+    for row in get_rows():
+        bloom.add(get_row_digest(row, key_indexes))
+    return bloom
+
+
+def flag_overlaps(
+    left_rows: Iterable[Row],
+    get_right_rows: Callable[[], Iterable[Row]],
+    left_key_indexes: Optional[List[int]] = None,
+    right_key_indexes: Optional[List[int]] = None,
+    count_matches: bool = False,
+    max_keys: int = DEFAULT_MAX_KEYS,
+    false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE,
+) -> Iterator[Tuple[Row, bool, Optional[int]]]:
+    """
+    Every left row with whether a right row has the same key, the values at
+    the key indexes or the whole row, and with `count_matches` the number of
+    such right rows (None otherwise).
+
+    The right keys are hashed once (see `build_key_counts`) and the left
+    side streamed past them, instead of scanning the right side for every
+    left row. Keys compare by value, as with ==, through digests of their
+    typed values (see `get_key_digest`): 1 and Decimal("1.00") match, 1 and
+    "1" do not.
+    """
+    keys = build_key_counts(
+        get_right_rows, right_key_indexes, count_matches, max_keys, false_positive_rate
+    )
+    for row in left_rows:
+        digest = get_row_digest(row, left_key_indexes)
+        if count_matches:
+            matches = keys.get(digest, 0)
+            yield row, matches > 0, matches
+        else:
+            yield row, digest in keys, None
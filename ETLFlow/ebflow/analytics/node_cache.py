@@ -0,0 +1,117 @@
+import hashlib
+import os
+import uuid
+from typing import Dict, List, Optional
+
+from ebflow.analytics.analytics_schema import Node
+from ebflow.analytics.pipeline_graph import PipelineGraph
+
+DEFAULT_CACHE_BYTES = 2 * 1024 * 1024 * 1024
+
+
+def get_source_tag(file_path: str) -> str:
+    """
+    Version tag of a source file: the ETag for Azure blobs, size and
+    modification time for local files.
+    """
+    if file_path.startswith("http://") or file_path.startswith("https://"):
+        from frictionless_azureblob import create_blob_client
+
+        return create_blob_client(file_path).get_blob_properties().etag
+    stat = os.stat(file_path)
+    return f"{stat.st_size}-{stat.st_mtime_ns}"
+
+
+def get_file_extension(file_path: str) -> str:
+    extension = os.path.splitext(file_path.split("?")[0])[1]
+    return extension.lstrip(".").lower() or "csv"
+
+
+def compute_fingerprints(
+    graph: PipelineGraph, execution_order: List[Node]
+) -> Dict[str, str]:
+    """
+    Content address of every node's output: a hash of the node's NodeData,
+    the fingerprints of its inputs and, for extract nodes or data sources
+    given as paths, the version tag of the source file. Any change upstream
+    therefore changes the fingerprint of every node below it.
+    """
+    fingerprints: Dict[str, str] = {}
+    for node in execution_order:
+        digest = hashlib.sha256()
+        digest.update(
+            node.data.model_dump_json(exclude={"processed", "error"}).encode("utf-8")
+        )
+        source_paths = []
+        if node.data.type == "extract":
+            source_paths.append(node.data.file_path)
+        for datasource in node.data.datasource or []:
+            if "/" in datasource and "." in datasource:
+                source_paths.append(datasource)
+        for source_path in source_paths:
+            digest.update(get_source_tag(source_path).encode("utf-8"))
+        for upstream_id in graph.predecessors[node.id]:
+            digest.update(fingerprints[upstream_id].encode("utf-8"))
+        fingerprints[node.id] = digest.hexdigest()
+    return fingerprints
+
+
+class NodeOutputCache:
+    """
+    Local directory of materialised node outputs, addressed by fingerprint.
+
+    Entries are plain files named `<fingerprint>.<format>`; their modification
+    time records the last use, and the least recently used entries are evicted
+    once the directory grows beyond `max_bytes`. The cache keeps no state in
+    memory, so it can be shared between worker processes.
+    """
+
+    def __init__(self, directory: str, max_bytes: int = DEFAULT_CACHE_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+
+    def get_path(self, fingerprint: str, extension: str) -> str:
+        return os.path.join(self.directory, f"{fingerprint}.{extension}")
+
+    def get(self, fingerprint: str, extension: str) -> Optional[str]:
+        path = self.get_path(fingerprint, extension)
+        try:
+            os.utime(path)
+        except FileNotFoundError:
+            return None
+        return path
+
+    def reserve(self, extension: str) -> str:
+        """Temporary path to write a new entry to before it is committed."""
+        return os.path.join(self.directory, f".{uuid.uuid4().hex}.{extension}")
+
+    def commit(self, temp_path: str, fingerprint: str, extension: str) -> str:
+        path = self.get_path(fingerprint, extension)
+        os.replace(temp_path, path)
+        self.evict(keep=path)
+        return path
+
+    def evict(self, keep: Optional[str] = None):
+        entries = []
+        for name in os.listdir(self.directory):
+            path = os.path.join(self.directory, name)
+            if name.startswith(".") or path == keep:
+                continue
+            try:
+                stat = os.stat(path)
+            except FileNotFoundError:
+                continue
+            entries.append((stat.st_mtime_ns, stat.st_size, path))
+
+        total = sum(size for _, size, _ in entries)
+        if keep is not None and os.path.exists(keep):
+            total += os.path.getsize(keep)
+        for _, size, path in sorted(entries):
+            if total <= self.max_bytes:
+                break
+            try:
+                os.unlink(path)
+            except FileNotFoundError:
+                pass
+            total -= size
@@ -0,0 +1,94 @@
+from collections import deque
+from typing import Dict, List, Optional
+
+from ebflow.analytics.analytics_schema import AnalyticsPipeline, Node
+
+
+class PipelineGraph:
+    """
+    Index of an analytics pipeline, built once per run.
+
+    Keeps an id -> node lookup together with successor and predecessor
+    adjacency lists, so scheduling never has to scan `pipeline.nodes` or
+    depend on the order in which edges were declared.
+    """
+
+    def __init__(self, pipeline: AnalyticsPipeline):
+        self.edges = pipeline.edges
+        self.nodes: Dict[str, Node] = {node.id: node for node in pipeline.nodes}
+        self.successors: Dict[str, List[str]] = {node_id: [] for node_id in self.nodes}
+        self.predecessors: Dict[str, List[str]] = {
+            node_id: [] for node_id in self.nodes
+        }
+        for edge in pipeline.edges:
+            if edge.source not in self.nodes or edge.target not in self.nodes:
+                raise ValueError(f"Invalid pipeline, edge {edge.id} has unknown node")
+            self.successors[edge.source].append(edge.target)
+            self.predecessors[edge.target].append(edge.source)
+
+    def get_node(self, node_id: str) -> Optional[Node]:
+        return self.nodes.get(node_id)
+
+    def get_inputs(self, node_id: str) -> List[Node]:
+        return [self.nodes[source] for source in self.predecessors[node_id]]
+
+    def get_outputs(self, node_id: str) -> List[Node]:
+        return [self.nodes[target] for target in self.successors[node_id]]
+
+    def topological_order(self) -> List[Node]:
+        """
+        Kahn's algorithm; ties are broken by node declaration order so runs are
+        deterministic. Raises ValueError when the pipeline contains a cycle.
+        """
+        in_degree = {
+            node_id: len(sources) for node_id, sources in self.predecessors.items()
+        }
+        ready = deque(node_id for node_id, degree in in_degree.items() if degree == 0)
+        order = []
+        while ready:
+            node_id = ready.popleft()
+            order.append(self.nodes[node_id])
+            for target in self.successors[node_id]:
+                in_degree[target] -= 1
+                if in_degree[target] == 0:
+                    ready.append(target)
+
+        if len(order) != len(self.nodes):
+            raise ValueError("Invalid pipeline, cycle detected")
+        return order
+
+    def components(self) -> List[List[str]]:
+        """
+        Weakly connected components, i.e. branches that share no node with each
+        other and can therefore run independently.
+        """
+        component_of: Dict[str, int] = {}
+        component_index = 0
+        for node_id in self.nodes:
+            if node_id in component_of:
+                continue
+            component_index += 1
+            component_of[node_id] = component_index
+            pending = [node_id]
+            while pending:
+                current = pending.pop()
+                for neighbour in self.successors[current] + self.predecessors[current]:
+                    if neighbour not in component_of:
+                        component_of[neighbour] = component_index
+                        pending.append(neighbour)
+
+        components: Dict[int, List[str]] = {}
+        for node_id in self.nodes:
+            components.setdefault(component_of[node_id], []).append(node_id)
+        return list(components.values())
+
+    def subpipeline(self, node_ids: List[str]) -> AnalyticsPipeline:
+        selected = set(node_ids)
+        return AnalyticsPipeline.model_construct(
+            nodes=[self.nodes[node_id] for node_id in node_ids],
+            edges=[
+                edge
+                for edge in self.edges
+                if edge.source in selected and edge.target in selected
+            ],
+        )
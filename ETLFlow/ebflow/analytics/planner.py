@@ -0,0 +1,271 @@
+import os
+import zipfile
+from typing import Any, Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from ebflow.analytics.aggregates import DEFAULT_MAX_GROUPS
+from ebflow.analytics.analytics_schema import Node, NodeData
+from ebflow.analytics.pipeline_graph import PipelineGraph
+
+DEFAULT_SAMPLE_BYTES = 64 * 1024
+
+# normalize_and_zero_fill, added in front of every load
+PREPROCESSING_PASSES = 1
+
+# operations whose steps hold the whole table (or a row per input row) in memory
+OPERATION_MATERIALIZES = {
+    "compare": ["hash table of the smaller table (compare_join)"],
+    "overlap": ["hash set of the keys of the second table (custom_row_compare)"],
+}
+
+# operations that reduce the table to a single row
+SINGLE_ROW_OPERATIONS = ["sum", "avg", "min", "max", "count"]
+
+
+class NodePlan(BaseModel):
+    id: str
+    label: Optional[str] = None
+    type: str
+    operation_name: Optional[str] = None
+    source_bytes: Optional[int] = None
+    estimated_input_rows: Optional[int] = None
+    estimated_output_rows: Optional[int] = None
+    passes: int = 0
+    estimated_cost: Optional[int] = None
+    materializes: List[str] = []
+    warnings: List[str] = []
+    fields: Optional[List[str]] = None
+    inputs: List["NodePlan"] = []
+
+    def describe(self) -> str:
+        description = self.label or self.id
+        if self.operation_name:
+            description += f" {self.operation_name}"
+        else:
+            description += f" {self.type}"
+        rows = "?" if self.estimated_input_rows is None else self.estimated_input_rows
+        description += f" (rows={rows} passes={self.passes}"
+        if self.estimated_cost is not None:
+            description += f" cost={self.estimated_cost}"
+        description += ")"
+        for materialize in self.materializes:
+            description += f"\n  ! {materialize}"
+        for warning in self.warnings:
+            description += f"\n  ? {warning}"
+        return description
+
+
+class PipelinePlan(BaseModel):
+    nodes: List[NodePlan]
+
+    @property
+    def roots(self) -> List[NodePlan]:
+        """Load nodes, the tops of the plan tree."""
+        return [node for node in self.nodes if node.type == "load"]
+
+    def get_node(self, node_id: str) -> Optional[NodePlan]:
+        for node in self.nodes:
+            if node.id == node_id:
+                return node
+        return None
+
+    def find_oversized(self, max_materialized_rows: int) -> List[NodePlan]:
+        """Materializing nodes estimated to read more than `max_materialized_rows`."""
+        return [
+            node
+            for node in self.nodes
+            if node.materializes
+            and node.estimated_input_rows is not None
+            and node.estimated_input_rows > max_materialized_rows
+        ]
+
+    def render(self) -> str:
+        lines = []
+
+        def render_node(node: NodePlan, depth: int):
+            prefix = "  " * depth + ("-> " if depth else "")
+            for idx, line in enumerate(node.describe().split("\n")):
+                lines.append(prefix + line if idx == 0 else "  " * depth + line)
+            for upstream in node.inputs:
+                render_node(upstream, depth + 1)
+
+        for root in self.roots:
+            render_node(root, 0)
+        return "\n".join(lines)
+
+
+def read_source_sample(
+    file_path: str, file_name: Optional[str], sample_bytes: int
+) -> Tuple[Optional[int], Optional[bytes]]:
+    """Size in bytes and the first `sample_bytes` of a source file."""
+    is_blob = file_path.startswith("http://") or file_path.startswith("https://")
+    if file_path.endswith(".zip"):
+        if is_blob:
+            # the size of the inner file is unknown without downloading the archive
+            return None, None
+        with zipfile.ZipFile(file_path) as archive:
+            info = archive.getinfo(f"cdm/{file_name}")
+            with archive.open(info) as file:
+                return info.file_size, file.read(sample_bytes)
+    if is_blob:
+        from frictionless_azureblob import create_blob_client
+
+        blob_client = create_blob_client(file_path)
+        size = blob_client.get_blob_properties().size
+        sample = blob_client.download_blob(
+            offset=0, length=min(sample_bytes, size)
+        ).readall()
+        return size, sample
+    with open(file_path, "rb") as file:
+        return os.path.getsize(file_path), file.read(sample_bytes)
+
+
+def estimate_rows(size: Optional[int], sample: Optional[bytes]) -> Optional[int]:
+    """
+    Data rows of a delimited file, from its size and the average width of the
+    sampled rows. The header line is not counted.
+    """
+    if size is None or sample is None:
+        return None
+    lines = sample.splitlines(keepends=True)
+    if len(sample) >= size:
+        return max(len(lines) - 1, 0)
+    # the last sampled line is usually cut off
+    lines = lines[:-1]
+    if len(lines) < 2:
+        return None
+    header_bytes = len(lines[0])
+    row_width = sum(len(line) for line in lines[1:]) / (len(lines) - 1)
+    return int((size - header_bytes) / row_width)
+
+
+def estimate_source(
+    plan: NodePlan, file_path: str, file_name: Optional[str], sample_bytes: int
+) -> Optional[int]:
+    try:
+        size, sample = read_source_sample(file_path, file_name, sample_bytes)
+    except Exception as ex:
+        plan.warnings.append(f"Could not sample {file_path}: {str(ex)}")
+        return None
+    if size is None:
+        plan.warnings.append(f"Row count unknown for {file_path}")
+    plan.source_bytes = (plan.source_bytes or 0) + (size or 0)
+    return estimate_rows(size, sample)
+
+
+def add_rows(*rows: Optional[int]) -> Optional[int]:
+    if any(row is None for row in rows):
+        return None
+    return sum(rows)
+
+
+def get_operation_passes(node_data: NodeData, input_rows: Optional[int]) -> int:
+    """
+    Full passes over the rows made by the steps of a row-wise operation: one
+    streaming pass, plus the replay of the rows from disk to flag the last or
+    all duplicates, or the read back of the rows a group_by spills once it
+    may hold more than DEFAULT_MAX_GROUPS groups.
+    """
+    passes = 1
+    if node_data.operation_name == "duplicate" and node_data.keep in ["last", "all"]:
+        passes += 1
+    if (
+        node_data.operation_name == "group_by"
+        and input_rows is not None
+        and input_rows > DEFAULT_MAX_GROUPS
+    ):
+        passes += 1
+    return passes
+
+
+def build_plan(
+    graph: PipelineGraph,
+    execution_order: List[Node],
+    sample_bytes: int = DEFAULT_SAMPLE_BYTES,
+    schemas: Optional[Dict[str, Any]] = None,
+) -> PipelinePlan:
+    """
+    Estimate, without running anything, how many rows every node reads, how
+    many full passes its chain of generated steps makes and which steps hold
+    the whole table in memory. With `schemas` (see `propagate_schemas`) every
+    node also lists the fields it outputs.
+    """
+    plans: Dict[str, NodePlan] = {}
+    for node in execution_order:
+        plan = NodePlan(
+            id=node.id,
+            label=node.data.label,
+            type=node.data.type,
+            operation_name=node.data.operation_name,
+            inputs=[plans[source] for source in graph.predecessors[node.id]],
+        )
+        if schemas and schemas.get(node.id) is not None:
+            plan.fields = schemas[node.id].field_names
+        operation = node.data.operation_name
+
+        if node.data.type == "extract":
+            rows = estimate_source(
+                plan, node.data.file_path, node.data.file_name, sample_bytes
+            )
+            plan.estimated_input_rows = plan.estimated_output_rows = rows
+            plan.estimated_cost = rows
+
+        elif node.data.type == "load":
+            plan.estimated_input_rows = add_rows(
+                *[upstream.estimated_output_rows for upstream in plan.inputs]
+            )
+            plan.estimated_output_rows = plan.estimated_input_rows
+            plan.passes = PREPROCESSING_PASSES + max(
+                upstream.passes for upstream in plan.inputs
+            )
+            if plan.estimated_input_rows is not None:
+                plan.estimated_cost = plan.estimated_input_rows * plan.passes
+
+        elif operation in ["compare", "overlap"]:
+            # these read their data sources themselves, by node id or by path
+            side_rows = []
+            plan.passes = 0
+            plan.materializes = list(OPERATION_MATERIALIZES[operation])
+            for datasource in (node.data.datasource or [])[:2]:
+                if "/" in datasource and "." in datasource:
+                    side_rows.append(
+                        estimate_source(plan, datasource, None, sample_bytes)
+                    )
+                    plan.passes += 2
+                else:
+                    side = plans.get(datasource)
+                    side_rows.append(side.estimated_output_rows if side else None)
+                    # infer and rename; transformed sides run their steps once
+                    # into a typed intermediate, which needs no infer
+                    if side is None or side.type == "extract":
+                        plan.passes += 2
+                    else:
+                        plan.passes += side.passes + 1
+            first_rows = side_rows[0] if side_rows else None
+            plan.estimated_input_rows = add_rows(*side_rows) if side_rows else None
+            # infer of the joined or flagged table, then the read by the load
+            plan.passes += 2
+            if plan.estimated_input_rows is not None:
+                plan.estimated_cost = plan.estimated_input_rows * plan.passes
+            if operation == "compare":
+                plan.estimated_output_rows = plan.estimated_input_rows
+            else:
+                plan.estimated_output_rows = first_rows
+
+        else:
+            upstream = plan.inputs[0]
+            plan.estimated_input_rows = upstream.estimated_output_rows
+            plan.estimated_output_rows = (
+                1 if operation in SINGLE_ROW_OPERATIONS else plan.estimated_input_rows
+            )
+            passes = get_operation_passes(node.data, plan.estimated_input_rows)
+            plan.passes = upstream.passes + passes
+            plan.materializes = list(OPERATION_MATERIALIZES.get(operation, []))
+            if operation == "count" and node.data.unique:
+                plan.materializes.append("count_unique keeps every distinct value")
+            if plan.estimated_input_rows is not None:
+                plan.estimated_cost = plan.estimated_input_rows * passes
+
+        plans[node.id] = plan
+    return PipelinePlan(nodes=[plans[node.id] for node in execution_order])
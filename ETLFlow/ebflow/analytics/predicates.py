@@ -0,0 +1,162 @@
+import operator
+from datetime import datetime
+from decimal import Decimal, InvalidOperation
+from typing import Any, Callable, List, Tuple
+
+from frictionless import Field, Schema
+
+from ebflow.analytics.analytics_schema import FILTER_GROUPS, FilterCondition
+
+COMPARISON_OPERATORS = {
+    "==": operator.eq,
+    "!=": operator.ne,
+    ">": operator.gt,
+    "<": operator.lt,
+    ">=": operator.ge,
+    "<=": operator.le,
+}
+
+# estimated share of rows a comparison keeps, used to order the checks
+ESTIMATED_SELECTIVITY = {
+    "==": 0.1,
+    "!=": 0.9,
+    ">": 0.33,
+    "<": 0.33,
+    ">=": 0.33,
+    "<=": 0.33,
+    "between": 0.25,
+}
+MAX_IN_SELECTIVITY = 0.9
+
+
+def convert_value(field: Field, value: Any) -> Any:
+    """A filter value as the type of the column it is compared with."""
+    try:
+        if field.type in ["decimal", "number"]:
+            return Decimal(str(value))
+        elif field.type == "integer":
+            return int(value)
+        elif field.type == "datetime":
+            return datetime.fromisoformat(str(value))
+        elif field.type == "date":
+            return datetime.fromisoformat(str(value)).date()
+        elif field.type == "time":
+            return datetime.fromisoformat(str(value)).time()
+        elif field.type == "boolean":
+            if isinstance(value, str):
+                return value.strip().lower() in ["true", "yes", "y", "1"]
+            return bool(value)
+        elif field.type == "string":
+            return str(value)
+        return value
+    except (ValueError, TypeError, InvalidOperation):
+        raise ValueError(
+            f"Invalid value {value} for column {field.name} of type {field.type}"
+        )
+
+
+def get_in_selectivity(values: List[Any]) -> float:
+    return min(ESTIMATED_SELECTIVITY["=="] * len(values), MAX_IN_SELECTIVITY)
+
+
+class CompiledPredicate:
+    """
+    A FilterCondition tree compiled once, for a given schema, into a single
+    function of a row (a list, tuple or petl Record in schema order). Values
+    are converted to the column types up front, in and not_in values are
+    held in sets, and the conditions of a group are checked in order of
+    estimated selectivity: for `and` the one dropping most rows first, for
+    `or` the one keeping most rows first, so most rows are decided by the
+    first check. Comparing a value of another type, e.g. an empty cell,
+    with an ordering operator does not match.
+    """
+
+    def __init__(self, condition: FilterCondition, schema: Schema):
+        self.condition = condition
+        self.schema = schema
+        self.function, self.selectivity = self.compile(condition)
+
+    def __call__(self, row) -> bool:
+        return self.function(row)
+
+    def get_index(self, condition: FilterCondition) -> Tuple[int, Field]:
+        name = condition.column_name.value
+        if name not in self.schema.field_names:
+            raise ValueError(f"Column {name} not found for filter {condition.__repr__()}")
+        return self.schema.field_names.index(name), self.schema.get_field(name)
+
+    def compile(self, condition: FilterCondition) -> Tuple[Callable[[Any], bool], float]:
+        if condition.operator in FILTER_GROUPS:
+            return self.compile_group(condition)
+        return self.compile_comparison(condition)
+
+    def compile_group(
+        self, condition: FilterCondition
+    ) -> Tuple[Callable[[Any], bool], float]:
+        compiled = [self.compile(item) for item in condition.conditions]
+        if condition.operator == "not":
+            function, selectivity = compiled[0]
+            return (lambda row: not function(row)), 1 - selectivity
+
+        if condition.operator == "and":
+            compiled.sort(key=lambda item: item[1])
+            functions = tuple(function for function, _ in compiled)
+            selectivity = 1.0
+            for _, item_selectivity in compiled:
+                selectivity *= item_selectivity
+
+            def check_all(row):
+                for function in functions:
+                    if not function(row):
+                        return False
+                return True
+
+            return check_all, selectivity
+
+        compiled.sort(key=lambda item: item[1], reverse=True)
+        functions = tuple(function for function, _ in compiled)
+        rejected = 1.0
+        for _, item_selectivity in compiled:
+            rejected *= 1 - item_selectivity
+
+        def check_any(row):
+            for function in functions:
+                if function(row):
+                    return True
+            return False
+
+        return check_any, 1 - rejected
+
+    def compile_comparison(
+        self, condition: FilterCondition
+    ) -> Tuple[Callable[[Any], bool], float]:
+        index, field = self.get_index(condition)
+
+        if condition.operator in ["in", "not_in"]:
+            values = frozenset(convert_value(field, value) for value in condition.value)
+            selectivity = get_in_selectivity(condition.value)
+            if condition.operator == "in":
+                return (lambda row: row[index] in values), selectivity
+            return (lambda row: row[index] not in values), 1 - selectivity
+
+        if condition.operator == "between":
+            low, high = [convert_value(field, value) for value in condition.value]
+
+            def between(row):
+                try:
+                    return low <= row[index] <= high
+                except TypeError:
+                    return False
+
+            return between, ESTIMATED_SELECTIVITY["between"]
+
+        compare = COMPARISON_OPERATORS[condition.operator]
+        value = convert_value(field, condition.value)
+
+        def comparison(row):
+            try:
+                return compare(row[index], value)
+            except TypeError:
+                return False
+
+        return comparison, ESTIMATED_SELECTIVITY[condition.operator]
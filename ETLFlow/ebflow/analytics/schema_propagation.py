@@ -0,0 +1,170 @@
+from typing import Any, Callable, Dict, List, Optional
+
+from frictionless import Schema, fields, transform
+from frictionless.resources import TableResource
+
+from ebflow.analytics.analytics_schema import Node, NodeData
+from ebflow.analytics.dna_step_generation import DNATransformStep
+from ebflow.analytics.pipeline_graph import PipelineGraph
+
+# compare and overlap read their data sources themselves, their schema is derived here
+SELF_SOURCED_OPERATIONS = ["compare", "overlap"]
+
+
+def get_values(option: Any) -> List[str]:
+    """Column names of a NodeData attribute: a name, a ColumnOption or a list of them."""
+    if option is None:
+        return []
+    if isinstance(option, list):
+        return [value for item in option for value in get_values(item)]
+    return [getattr(option, "value", option)]
+
+
+def get_standard_name(name: str, label: str) -> str:
+    """Field name of a compare or overlap data source, as change_resource_field_name2 renames it."""
+    standard_name = str(name).strip().replace(" ", "_")
+    standard_name = standard_name.replace("/", "_").replace(".", "_")
+    return f"{label}_{standard_name}" if label else standard_name
+
+
+def get_referenced_columns(node_data: NodeData) -> List[str]:
+    """Input columns a transform node reads, other than compare and overlap."""
+    if node_data.operation_name == "delete_column":
+        # removing a column that is not there is allowed
+        return []
+    columns = get_values(node_data.column_name)
+    if node_data.operation_name == "net":
+        columns += get_values(node_data.dci_column)
+    elif node_data.operation_name == "bkd" and not node_data.is_bkd_custom:
+        columns += get_values(node_data.bkd_column)
+    elif node_data.operation_name == "group_by":
+        columns += get_values(node_data.group_by)
+        for aggregation in node_data.aggregations or []:
+            columns += get_values(aggregation.column_name)
+    elif node_data.operation_name == "compound_filter":
+        columns += node_data.condition.get_columns()
+    elif node_data.operation_name == "multiple_calculation" and node_data.data:
+        columns += list(node_data.data.column.values())
+    return columns
+
+
+def require_columns(schema: Schema, columns: List[str], node: Node):
+    missing = [name for name in columns if name not in schema.field_names]
+    if missing:
+        raise ValueError(
+            f"Column {', '.join(dict.fromkeys(missing))} not found in the input "
+            f"of node {node.data.label}"
+        )
+
+
+def apply_steps(schema: Schema, steps: List[Any]) -> Schema:
+    """
+    Output schema of `steps` over a table with `schema`. Steps set their
+    output schema when they are applied and read rows only once iterated,
+    so they run over a table made of the header alone.
+    """
+    resource = TableResource(
+        data=[schema.field_names], schema=schema.to_copy(), format="inline"
+    )
+    return transform(resource, steps=steps).schema.to_copy()
+
+
+def derive_compare_schema(
+    node: Node, sides: List[Schema], labels: List[str]
+) -> Schema:
+    data = node.data
+    renamed = []
+    for side, label in zip(sides, labels):
+        schema = Schema()
+        for field in side.fields:
+            field = field.to_copy()
+            field.name = get_standard_name(field.name, label)
+            schema.add_field(field)
+        renamed.append(schema)
+
+    matching_columns = get_values(data.matching_columns)
+    columns = matching_columns + get_values(data.compare_columns)
+    for schema, label in zip(renamed, labels):
+        require_columns(
+            schema, [get_standard_name(name, label) for name in columns], node
+        )
+
+    output = renamed[0]
+    if data.operation_name == "compare":
+        right_keys = [get_standard_name(name, labels[1]) for name in matching_columns]
+        for field in renamed[1].fields:
+            if field.name not in right_keys:
+                output.add_field(field.to_copy())
+        output.add_field(fields.AnyField(name="matching_columns_match"))
+    else:
+        output.add_field(fields.AnyField(name="overlap"))
+        if data.match_count:
+            output.add_field(fields.IntegerField(name="overlap_count"))
+    return output
+
+
+def propagate_schemas(
+    graph: PipelineGraph,
+    execution_order: List[Node],
+    open_source: Callable[[str, Optional[str]], TableResource],
+    skipped: Optional[set] = None,
+) -> Dict[str, Optional[Schema]]:
+    """
+    Output schema of every node, computed before any row is processed. Only
+    sources are inferred, once each, from a sample; the schema of a
+    transform node follows from its input schema and NodeData, the way its
+    generated steps build it. Raises a ValueError naming the node when a
+    column it reads is missing from its input.
+
+    Nodes in `skipped` (served from the cache or already completed) and
+    nodes below a source that could not be read get no schema, None.
+    """
+    skipped = skipped or set()
+    schemas: Dict[str, Optional[Schema]] = {}
+    sources: Dict[str, Optional[Schema]] = {}
+
+    def infer_source(path: str, name: Optional[str] = None) -> Optional[Schema]:
+        if path not in sources:
+            try:
+                resource = open_source(path, name)
+                resource.infer()
+                sources[path] = resource.schema
+            except Exception:
+                # surfaces as before, when the node reads its source
+                sources[path] = None
+        return sources[path]
+
+    for node in execution_order:
+        data = node.data
+        if node.id in skipped or data.type == "load":
+            schemas[node.id] = None
+        elif data.type == "extract":
+            schemas[node.id] = infer_source(data.file_path, data.file_name)
+        elif data.operation_name in SELF_SOURCED_OPERATIONS:
+            sides = []
+            labels = []
+            for datasource in (data.datasource or [])[:2]:
+                if "/" in datasource and "." in datasource:
+                    sides.append(infer_source(datasource, datasource.split("/")[-1]))
+                    labels.append("")
+                else:
+                    sides.append(schemas.get(datasource))
+                    labels.append(graph.nodes[datasource].data.label)
+            if len(sides) < 2 or any(side is None for side in sides):
+                schemas[node.id] = None
+            else:
+                schemas[node.id] = derive_compare_schema(node, sides, labels)
+        else:
+            upstream = graph.get_inputs(node.id)
+            schema = schemas.get(upstream[0].id) if upstream else None
+            if schema is None:
+                schemas[node.id] = None
+                continue
+            require_columns(schema, get_referenced_columns(data), node)
+            steps = DNATransformStep(node_data=data).generate_step()
+            try:
+                schemas[node.id] = apply_steps(schema, steps)
+            except Exception:
+                # a step that reads its rows to build the schema, found out at run time
+                schemas[node.id] = None
+    return schemas
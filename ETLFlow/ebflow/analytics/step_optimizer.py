@@ -0,0 +1,180 @@
+from typing import Iterator, List, Optional, Set
+
+from frictionless import Step
+
+from ebflow.analytics.custom_steps import (
+    fused_row_steps,
+    identify_duplicate,
+    temporal_flags,
+)
+from ebflow.analytics.instrumentation import PipelineProfiler, instrumented_step
+
+# steps that touch one row at a time, and can therefore share one pass
+ROW_WISE_STEPS = [
+    "field-add",
+    "temporal-flags",
+    "eb-filter",
+    "compound-filter",
+    "field-remove",
+]
+FILTER_STEPS = ["eb-filter", "compound-filter"]
+
+
+def unwrap(step: Step) -> Step:
+    return step.step if isinstance(step, instrumented_step) else step
+
+
+def iterate_steps(steps: List[Step]) -> Iterator[Step]:
+    """The steps as generated, out of their instrumented and fused wrappers."""
+    for step in steps:
+        step = unwrap(step)
+        if isinstance(step, fused_row_steps):
+            yield from iterate_steps(step.steps)
+        else:
+            yield step
+
+
+def is_row_wise(step: Step) -> bool:
+    step = unwrap(step)
+    if step.type == "field-add":
+        # row numbers depend on every row before, petl adds them separately
+        return not step.incremental
+    if step.type == "temporal-flags":
+        # with NumPy the flags are computed on column arrays, in batches
+        return not step.is_vectorized()
+    return step.type in ROW_WISE_STEPS
+
+
+def is_pure_field_add(step: Step) -> bool:
+    """A computed column whose value depends on its own row only."""
+    step = unwrap(step)
+    if step.type in ["calculated-field", "temporal-flags"]:
+        return True
+    return (
+        step.type == "field-add"
+        and not step.incremental
+        and not isinstance(step.function, identify_duplicate)
+    )
+
+
+def get_added_names(step: Step) -> Set[str]:
+    step = unwrap(step)
+    if step.type == "temporal-flags":
+        return set(step.flags)
+    return {step.name}
+
+
+def get_filter_columns(step: Step) -> Set[str]:
+    step = unwrap(step)
+    if step.type == "compound-filter":
+        return set(step.condition.get_columns())
+    # the value of a filter may name a column to compare with
+    return {step.column_name, str(step.value)}
+
+
+def push_down_filters(steps: List[Step]) -> List[Step]:
+    """
+    Move every filter ahead of the computed columns it does not read, so the
+    columns are only computed for the rows that are kept.
+    """
+    steps = list(steps)
+    for idx in range(len(steps)):
+        if unwrap(steps[idx]).type not in FILTER_STEPS:
+            continue
+        columns = get_filter_columns(steps[idx])
+        position = idx
+        while (
+            position > 0
+            and is_pure_field_add(steps[position - 1])
+            and not get_added_names(steps[position - 1]) & columns
+        ):
+            position -= 1
+        if position != idx:
+            steps.insert(position, steps.pop(idx))
+    return steps
+
+
+def merge_temporal_flags(
+    steps: List[Step], profiler: Optional[PipelineProfiler] = None
+) -> List[Step]:
+    """
+    Merge consecutive temporal-flags steps, e.g. nwd, owh and bkd nodes
+    chained on one date column, into one that shares its parsed dates. A
+    step reading a flag added by the one before is not merged.
+    """
+    optimized: List[Step] = []
+    run: List[Step] = []
+
+    def close_run():
+        if len(run) > 1:
+            flags = {}
+            for step in run:
+                flags.update(unwrap(step).flags)
+            merged = temporal_flags(
+                flags=flags,
+                max_parsed=unwrap(run[0]).max_parsed,
+                batch_rows=unwrap(run[0]).batch_rows,
+            )
+            spans = [step.span for step in run if isinstance(step, instrumented_step)]
+            if profiler is not None and spans:
+                merged = profiler.instrument_fused(merged, spans)
+            optimized.append(merged)
+        else:
+            optimized.extend(run)
+        run.clear()
+
+    for step in steps:
+        if unwrap(step).type != "temporal-flags":
+            close_run()
+            optimized.append(step)
+            continue
+        added = set().union(*[get_added_names(previous) for previous in run])
+        columns = {
+            column for flag in unwrap(step).flags.values() for column in flag.columns
+        }
+        if added & (columns | get_added_names(step)):
+            close_run()
+        run.append(step)
+    close_run()
+    return optimized
+
+
+def fuse_row_steps(
+    steps: List[Step], profiler: Optional[PipelineProfiler] = None
+) -> List[Step]:
+    """Replace every run of consecutive row-wise steps by one fused step."""
+    optimized = []
+    run: List[Step] = []
+
+    def close_run():
+        if len(run) > 1:
+            fused = fused_row_steps(steps=[unwrap(step) for step in run])
+            spans = [step.span for step in run if isinstance(step, instrumented_step)]
+            if profiler is not None and spans:
+                fused = profiler.instrument_fused(fused, spans)
+            optimized.append(fused)
+        else:
+            optimized.extend(run)
+        run.clear()
+
+    for step in steps:
+        if is_row_wise(step):
+            run.append(step)
+            continue
+        close_run()
+        optimized.append(step)
+    close_run()
+    return optimized
+
+
+def optimize_steps(
+    steps: List[Step], profiler: Optional[PipelineProfiler] = None
+) -> List[Step]:
+    """
+    Optimize the combined step list of a load: filters are pushed ahead of
+    the computed columns they do not depend on, consecutive temporal flags
+    are merged to share their parsed dates, then consecutive row-wise steps
+    are fused into a single pass. The output is unchanged.
+    """
+    steps = merge_temporal_flags(push_down_filters(steps), profiler)
+    return fuse_row_steps(steps, profiler)
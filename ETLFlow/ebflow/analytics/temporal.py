@@ -0,0 +1,124 @@
+import functools
+from datetime import date, datetime, time
+from typing import Any, Dict, List, Optional, Tuple
+
+# distinct date strings kept parsed by one DateParser
+DEFAULT_MAX_PARSED = 10000
+EPOCH_ORDINAL = date(1970, 1, 1).toordinal()
+# the int64 value of NaT in datetime64 and timedelta64 arrays
+NAT = -(2**63)
+
+
+def parse_date_string(value: str) -> Any:
+    """A date, time or datetime from its ISO format, None for an empty cell."""
+    value = value.strip()
+    if not value:
+        return None
+    try:
+        return datetime.fromisoformat(value)
+    except ValueError:
+        return time.fromisoformat(value)
+
+
+class DateParser:
+    """
+    Parse date and time cells, remembering the last `max_size` distinct
+    strings. Typed values (dates, datetimes, times) are returned as they are.
+    One parser is shared by all the flags of a temporal-flags pass, so a
+    value read by several of them is parsed only once.
+    """
+
+    def __init__(self, max_size: int = DEFAULT_MAX_PARSED):
+        self.parse_string = functools.lru_cache(maxsize=max_size)(parse_date_string)
+
+    def __call__(self, value: Any) -> Any:
+        if isinstance(value, str):
+            return self.parse_string(value)
+        return value
+
+
+def to_date(value: Any) -> Optional[date]:
+    if isinstance(value, datetime):
+        return value.date()
+    if isinstance(value, date):
+        return value
+    return None
+
+
+def to_time(value: Any) -> Optional[time]:
+    if isinstance(value, datetime):
+        return value.time()
+    if isinstance(value, time):
+        return value
+    return None
+
+
+def get_microseconds(value: Any) -> int:
+    """Time of day of a time or datetime, in microseconds."""
+    return ((value.hour * 60 + value.minute) * 60 + value.second) * 1000000 + value.microsecond
+
+
+class DateBatch:
+    """
+    The date columns of a batch of rows, for the NumPy path of the flags.
+    Every column is parsed and converted once, whichever flags read it,
+    straight from the date ordinals and time attributes, which is much
+    faster than converting datetime objects. Dates and times stay local
+    whatever their time zone, as row by row.
+    """
+
+    def __init__(self, numpy, columns: Dict[str, List[Any]], parse: DateParser):
+        self.numpy = numpy
+        self.columns = columns
+        self.parse = parse
+        self.arrays: Dict[Tuple[str, str], Any] = {}
+
+    def get_values(self, column: str) -> List[Any]:
+        if (column, "values") not in self.arrays:
+            parse = self.parse
+            self.arrays[(column, "values")] = [
+                parse(value) if isinstance(value, str) else value
+                for value in self.columns[column]
+            ]
+        return self.arrays[(column, "values")]
+
+    def get_days(self, column: str):
+        """Dates of datetime and date values as a datetime64[D] array, NaT for anything else."""
+        if (column, "days") not in self.arrays:
+            numpy = self.numpy
+            ordinals = numpy.array(
+                [
+                    value.toordinal() if isinstance(value, date) else 0
+                    for value in self.get_values(column)
+                ],
+                dtype=numpy.int64,
+            )
+            days = numpy.where(ordinals > 0, ordinals - EPOCH_ORDINAL, NAT)
+            self.arrays[(column, "days")] = days.view("datetime64[D]")
+        return self.arrays[(column, "days")]
+
+    def get_times_of_day(self, column: str):
+        """Times of day of datetime and time values as a timedelta64[us] array."""
+        if (column, "times") not in self.arrays:
+            numpy = self.numpy
+            microseconds = numpy.array(
+                [
+                    get_microseconds(value) if isinstance(value, (datetime, time)) else NAT
+                    for value in self.get_values(column)
+                ],
+                dtype=numpy.int64,
+            )
+            self.arrays[(column, "times")] = microseconds.view("timedelta64[us]")
+        return self.arrays[(column, "times")]
+
+
+def get_weekdays(days):
+    """Weekday of datetime64[D] values, Monday is 0; 1970-01-01 was a Thursday."""
+    return (days.astype("int64") + 3) % 7
+
+
+def get_flag_values(numpy, flags, valid) -> List[Optional[str]]:
+    """Y or N for every flag, None where the date was missing."""
+    values = numpy.where(flags, "Y", "N").astype(object)
+    values[~valid] = None
+    return values.tolist()
@@ -0,0 +1,144 @@
+import os
+import shutil
+import tempfile
+import threading
+import uuid
+from typing import Dict, Optional
+
+# open workspaces by spill directory, so spill files deep in a step can be charged
+_workspaces: Dict[str, "RunWorkspace"] = {}
+_workspaces_lock = threading.Lock()
+
+
+def find_workspace(directory: Optional[str]) -> Optional["RunWorkspace"]:
+    if directory is None:
+        return None
+    with _workspaces_lock:
+        return _workspaces.get(os.path.abspath(directory))
+
+
+class RunWorkspace:
+    """
+    Scratch directory of one pipeline run, passed as
+    `process(workspace=RunWorkspace(root))`. Without one, a run gets a
+    workspace in the system temporary directory.
+
+    Every run gets a directory of its own under `root`, so several
+    pipelines can share a worker, and `root` can point at a fast local disk
+    or a tmpfs. Intermediate files get unique names from `new_path`; spill
+    files of group_by, duplicate and fan-out go to `spill_directory`.
+
+    The bytes written are tracked against `quota_bytes`; going over it fails
+    the write with a ValueError. Worker processes get an even share of it
+    (see `detached`). The whole directory is removed when the run
+    ends, whether it succeeded or not.
+    """
+
+    def __init__(self, root: Optional[str] = None, quota_bytes: Optional[int] = None):
+        self.root = root
+        self.quota_bytes = quota_bytes
+        self.directory: Optional[str] = None
+        self.used_bytes = 0
+        self.peak_bytes = 0
+        self.files: Dict[str, int] = {}
+        self.lock = threading.Lock()
+
+    def __getstate__(self):
+        state = self.__dict__.copy()
+        del state["lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self.lock = threading.Lock()
+
+    def __enter__(self):
+        self.open()
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+    @property
+    def spill_directory(self) -> Optional[str]:
+        if self.directory is None:
+            return None
+        return os.path.join(self.directory, "spill")
+
+    def detached(self, workers: int = 1) -> "RunWorkspace":
+        """
+        Workspace of a worker process, nested in this one. The quota is split
+        evenly between the `workers` running at the same time, so together
+        they stay within the quota of the run.
+        """
+        quota_bytes = None
+        if self.quota_bytes is not None:
+            quota_bytes = self.quota_bytes // max(workers, 1)
+        return RunWorkspace(root=self.directory, quota_bytes=quota_bytes)
+
+    def open(self):
+        if self.directory is not None:
+            return
+        if self.root is not None:
+            os.makedirs(self.root, exist_ok=True)
+        self.directory = tempfile.mkdtemp(prefix="ebflow-run-", dir=self.root)
+        os.makedirs(self.spill_directory)
+        with _workspaces_lock:
+            _workspaces[os.path.abspath(self.spill_directory)] = self
+
+    def close(self):
+        """Remove every intermediate file of the run."""
+        if self.directory is None:
+            return
+        with _workspaces_lock:
+            _workspaces.pop(os.path.abspath(self.spill_directory), None)
+        shutil.rmtree(self.directory, ignore_errors=True)
+        self.directory = None
+        with self.lock:
+            self.files = {}
+            self.used_bytes = 0
+
+    def new_path(self, name: str = "", suffix: str = "") -> str:
+        """Unique path for an intermediate file, `name` and `suffix` only make it readable."""
+        self.open()
+        file_name = uuid.uuid4().hex + (f"_{name}" if name else "") + suffix
+        return os.path.join(self.directory, file_name)
+
+    def charge(self, size: int):
+        """Count `size` more bytes written, or fewer when negative."""
+        with self.lock:
+            self.charge_locked(size)
+
+    def charge_locked(self, size: int):
+        if (
+            size > 0
+            and self.quota_bytes is not None
+            and self.used_bytes + size > self.quota_bytes
+        ):
+            raise ValueError(
+                f"Workspace quota of {self.quota_bytes} bytes exceeded "
+                f"({self.used_bytes} bytes in use, {size} more requested)"
+            )
+        self.used_bytes += size
+        self.peak_bytes = max(self.peak_bytes, self.used_bytes)
+
+    def track(self, path: str):
+        """Charge a file written with a path from `new_path`, at its current size."""
+        size = os.path.getsize(path)
+        with self.lock:
+            try:
+                self.charge_locked(size - self.files.get(path, 0))
+            except ValueError:
+                self.remove_locked(path)
+                raise
+            self.files[path] = size
+
+    def remove(self, path: str):
+        """Delete an intermediate file once it is no longer needed."""
+        with self.lock:
+            self.remove_locked(path)
+
+    def remove_locked(self, path: str):
+        self.used_bytes -= self.files.pop(path, 0)
+        if os.path.exists(path):
+            os.unlink(path)
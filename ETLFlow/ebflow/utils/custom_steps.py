@@ -5,6 +5,9 @@ import attrs
 import petl
 from frictionless import Resource, Step, fields
 
+from ebflow.analytics.duplicates import DEFAULT_MAX_KEYS
+from ebflow.analytics.joins import DEFAULT_FALSE_POSITIVE_RATE, flag_overlaps
+
 
 @attrs.define(kw_only=True, repr=False)
 class fill_down(Step):
@@ -183,10 +186,11 @@ class custom_table_join(Step):
         if isinstance(source, str):
             assert target.package
             source = target.package.get_resource(source)
-        source.infer()  # type: ignore
+        # the schema is set once the source is renamed or propagated
+        if not source.schema.fields:  # type: ignore
+            source.infer()  # type: ignore
         view1 = target.to_petl()  # type: ignore
         view2 = source.to_petl()  # type: ignore
-        print(target.header, "\n", source.header)
 
         if self.field_names:
             self.left_fields = self.field_names
@@ -237,44 +241,49 @@ class custom_table_join(Step):
     
 @attrs.define(kw_only=True, repr=False)
 class custom_row_compare(Step):
-    """Join tables.
+    """Flag rows found in another table.
 
     This step can be added using the `steps` parameter
     for the `transform` function.
 
     """
 
-    type = "table-join"
+    type = "row-compare"
 
     resource: Union[Resource, str]
     """
-    Resource with which to apply join.
+    Resource whose rows are looked up.
     """
 
     field_names: [str] = []
     """
-    Field names with which the join will be performed comparing it's value between two tables.
-    If not provided natural join is tried. For more information, please see the following document:
-    https://petl.readthedocs.io/en/stable/_modules/petl/transform/joins.html
+    Field names compared between the two tables. If not provided whole rows are compared.
     """
 
     left_fields: [str] = []
 
     right_fields: [str] = []
     """
-    left_fields and right_fields are field names on the left and right table respectively on which the join is performed
+    left_fields and right_fields are field names on the left and right table respectively which are compared
     """
 
-    use_hash: bool = False
+    name: str = "overlap"
     """
-    Specify whether to use hash or not. If True, an alternative implementation of join will be used.
+    Name of the Y/N field added to the left table.
     """
 
-    mode: str = "inner"
+    count_name: Optional[str] = None
     """
-    Specifies which mode to use. The available modes are: "inner", "left", "right", "outer", "cross" and
-    "negate". The default mode is "inner".
+    If provided, a field with this name holds the number of matching rows of the right table.
+    """
+
+    max_keys: int = DEFAULT_MAX_KEYS
     """
+    Distinct keys of the right table held in a hash set. Beyond it a Bloom filter is used, which can
+    flag a row that has no match with a probability of false_positive_rate. Match counts are never capped.
+    """
+
+    false_positive_rate: float = DEFAULT_FALSE_POSITIVE_RATE
 
     # Transform
 
@@ -284,29 +293,60 @@ class custom_row_compare(Step):
         if isinstance(source, str):
             assert target.package
             source = target.package.get_resource(source)
-        source.infer()  # type: ignore
+        # the schema is set once the source is renamed or propagated
+        if not source.schema.fields:  # type: ignore
+            source.infer()  # type: ignore
         view1 = target.to_petl()  # type: ignore
         view2 = source.to_petl()  # type: ignore
-        print(target.header, "\n", source.header)
 
         if self.field_names:
             self.left_fields = self.field_names
             self.right_fields = self.field_names
-        
-        target.schema.add_field(fields.AnyField(name="overlap"))
-        
-        for i in view2[1:]:
-            print("i-----> ", i)
-        
-        table1_res= []
-        for row in view1[1:]:
-            print("row-----> ", row)
-            if tuple(row) in view2:
-                table1_res.append("Y")
-            else:
-                table1_res.append("N")
-        x = petl.addcolumn(view1, 'overlap', table1_res)
-        resource.data = x
+
+        target.schema.add_field(fields.AnyField(name=self.name))
+        if self.count_name:
+            target.schema.add_field(fields.IntegerField(name=self.count_name))
+
+        def data():
+            left_rows = iter(view1)
+            header = list(next(left_rows))
+            yield header + [self.name] + ([self.count_name] if self.count_name else [])
+            left_keys = right_keys = None
+            if self.left_fields:
+                left_keys = [header.index(name) for name in self.left_fields]
+                right_header = list(petl.header(view2))
+                right_keys = [right_header.index(name) for name in self.right_fields]
+            for row, found, matches in flag_overlaps(
+                left_rows,
+                lambda: petl.data(view2),
+                left_keys,
+                right_keys,
+                count_matches=bool(self.count_name),
+                max_keys=self.max_keys,
+                false_positive_rate=self.false_positive_rate,
+            ):
+                yield list(row) + ["Y" if found else "N"] + (
+                    [matches] if self.count_name else []
+                )
+
+        resource.data = data
+
+    # Metadata
+
+    metadata_profile_patch = {
+        "required": ["resource"],
+        "properties": {
+            "resource": {"type": ["object", "string"]},
+            "fieldNames": {"type": "array"},
+            "leftFields": {"type": "array"},
+            "rightFields": {"type": "array"},
+            "name": {"type": "string"},
+            "countName": {"type": "string"},
+            "maxKeys": {"type": "integer"},
+            "falsePositiveRate": {"type": "number"},
+        },
+    }
+
 
 @attrs.define(kw_only=True, repr=False)
 class custom_aggregate(Step):
@@ -360,39 +400,3 @@ def custom_sum(values):
         total += val or 0
 
     return total
-
-
-def check_field_gaps(values):
-    gap = 0
-    for val in values:
-        if not val:
-            gap += 1
-    return gap
-
-
-def jid_details(values):
-    """
-    considering the 1st row to always be in sequence or the percentage will never be 100.
-    missing_seq_count only include cases where the current row is numeric and prev row is not in sequence
-    null_seq_count only includes cases where current row is None
-    """
-    journal_id = None
-    journal_id_prev = None
-    null_seq_count = 0
-    missing_seq_count = 0
-    non_numeric_journal_id = False
-
-    for val in values:
-        if not val:
-            null_seq_count += 1
-        else:
-            try:
-                journal_id = float(val)
-            except ValueError:
-                non_numeric_journal_id = True
-                break
-            if journal_id_prev and journal_id - journal_id_prev != 1:
-                missing_seq_count += 1
-        journal_id_prev = journal_id
-
-    return non_numeric_journal_id, missing_seq_count, null_seq_count
@@ -0,0 +1,129 @@
+import unittest
+from frictionless import transform
+from frictionless.resources import TableResource
+import random
+import statistics
+from decimal import Decimal
+from ebflow.analytics.aggregates import (
+    StatisticsAccumulator,
+    create_accumulator,
+    hash_aggregate,
+)
+from ebflow.analytics.custom_steps import average, global_aggregate
+
+
+class TestDNAAggregates(unittest.TestCase):
+    def get_resource(self, rows):
+        return TableResource(data=[["account", "amount"]] + rows)
+
+    def test_global_aggregate(self):
+        resource = self.get_resource(
+            [["a", 10], ["b", 5], ["a", None], ["c", 20], ["b", 5]]
+        )
+        target = transform(
+            resource,
+            steps=[
+                global_aggregate(
+                    aggregation={
+                        "min_account": ("account", "min"),
+                        "count_amount": ("amount", "count"),
+                        "count_unique_account": ("account", "count_unique"),
+                        "count_unique_amount": ("amount", "count_unique"),
+                    }
+                )
+            ],
+        )
+        rows = target.read_rows()
+        self.assertEqual(len(rows), 1)
+        self.assertEqual(
+            rows[0].to_dict(),
+            {
+                "min_account": "a",
+                "count_amount": 4,
+                "count_unique_account": 3,
+                "count_unique_amount": 3,
+            },
+        )
+
+    def test_global_aggregate_empty_table(self):
+        target = transform(
+            self.get_resource([]),
+            steps=[global_aggregate(aggregation={"sum_amount": ("amount", "sum")})],
+        )
+        self.assertEqual(target.read_rows(), [])
+        self.assertEqual(target.schema.field_names, ["sum_amount"])
+
+    def test_invalid_function(self):
+        with self.assertRaises(ValueError):
+            create_accumulator("median")
+
+    def test_hash_aggregate_spill(self):
+        random.seed(7)
+        rows = [
+            [random.randint(0, 200), random.choice(["x", "y", None]), random.randint(1, 9)]
+            for _ in range(2000)
+        ]
+        aggregates = [(2, "sum"), (2, "avg"), (2, "max"), (1, "count_unique")]
+        in_memory = list(hash_aggregate(rows, [0, 1], aggregates))
+        spilled = list(hash_aggregate(rows, [0, 1], aggregates, max_groups=10))
+        self.assertEqual(spilled, in_memory)
+        self.assertEqual(len(in_memory), len(set((row[0], row[1]) for row in rows)))
+        # sorted by key, None before any value
+        self.assertEqual(in_memory[0][:2], [0, None])
+
+    def test_statistics_accumulator(self):
+        values = [1e9 + 4, 1e9 + 7, 1e9 + 13, 1e9 + 16]
+        accumulator = StatisticsAccumulator()
+        for value in values + ["abc", None]:
+            accumulator.add(value)
+        self.assertEqual(accumulator.count, 4)
+        self.assertEqual(accumulator.errors, 2)
+        self.assertEqual(accumulator.get_mean(), statistics.mean(values))
+        self.assertAlmostEqual(accumulator.get_variance(), statistics.pvariance(values))
+        self.assertEqual((accumulator.min, accumulator.max), (1e9 + 4, 1e9 + 16))
+
+    def test_statistics_accumulator_exact(self):
+        accumulator = StatisticsAccumulator(exact=True)
+        for value in [Decimal("0.10"), Decimal("0.20"), 0.3, "x"]:
+            accumulator.add(value)
+        self.assertEqual(accumulator.get_mean(), Decimal("0.2"))
+        self.assertEqual(accumulator.get_variance() * 3, Decimal("0.02"))
+        self.assertEqual(accumulator.errors, 1)
+
+    def test_statistics_accumulator_exact_large_values(self):
+        # large, nearly equal currency amounts, where a sum of squares cancels
+        cases = [
+            [Decimal("123456789012.37")] * 1001,
+            [Decimal("123456789012.34")] * 1000 + [Decimal("123456789012.35")],
+            [Decimal("635159063240.55")] * 460,
+        ]
+        for values in cases:
+            accumulator = StatisticsAccumulator(exact=True)
+            for value in values:
+                accumulator.add(value)
+            self.assertEqual(accumulator.get_mean(), statistics.mean(values))
+            self.assertGreaterEqual(accumulator.get_variance(), 0)
+            self.assertAlmostEqual(
+                accumulator.get_variance(), statistics.pvariance(values), places=20
+            )
+            self.assertAlmostEqual(
+                accumulator.get_stddev(), statistics.pstdev(values), places=12
+            )
+
+    def test_average_statistics(self):
+        resource = self.get_resource([["a", 2], ["b", 4], ["c", "n/a"], ["d", 6]])
+        target = transform(
+            resource, steps=[average(field_name="amount", statistics=True)]
+        )
+        self.assertEqual(
+            target.read_rows()[0].to_dict(),
+            {
+                "avg_amount": 4.0,
+                "variance_amount": 2.66667,
+                "stddev_amount": 1.63299,
+                "min_amount": 2.0,
+                "max_amount": 6.0,
+                "count_amount": 3,
+                "errors_amount": 1,
+            },
+        )
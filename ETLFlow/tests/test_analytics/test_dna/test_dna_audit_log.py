@@ -0,0 +1,136 @@
+import unittest
+import csv
+import tempfile
+import shutil
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+)
+from ebflow.analytics.audit_log import AuditLogSink, get_rotated_path
+import os
+
+
+class TestDNAAuditLog(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNAAuditLog, self).__init__(*args, **kwargs)
+        self.input_columns = [
+            "EMPLOYEE_ID",
+            "FIRST_NAME",
+            "LAST_NAME",
+            "EMAIL",
+            "PHONE_NUMBER",
+            "HIRE_DATE",
+            "JOB_ID",
+            "SALARY",
+            "COMMISSION_PCT",
+            "MANAGER_ID",
+            "DEPARTMENT_ID",
+            "JOINED_DATE",
+        ]
+        self.output_path = "tests/test_analytics/test_dna/data/temp/logged_sum.csv"
+
+    def setUp(self):
+        self.log_directory = tempfile.mkdtemp()
+        self.log_path = os.path.join(self.log_directory, "audit_trail.csv")
+
+    def tearDown(self):
+        shutil.rmtree(self.log_directory, ignore_errors=True)
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def get_pipeline(self):
+        return AnalyticsPipeline(
+            nodes=[
+                Node(
+                    id="n1",
+                    data=NodeData(
+                        type="extract",
+                        file_name="dna_test_file.csv",
+                        file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                        ingestion="ingestion",
+                        cdm_file="cdm_file",
+                    ),
+                ),
+                Node(
+                    id="n2",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="sum",
+                        column_name="SALARY",
+                        input_columns=self.input_columns,
+                        output_columns=["sum_SALARY"],
+                    ),
+                ),
+                Node(
+                    id="n3",
+                    data=NodeData(
+                        type="load",
+                        file_name=self.output_path.split("/")[-1],
+                        file_path=self.output_path,
+                    ),
+                ),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n2", target="n3"),
+            ],
+        )
+
+    def read_log(self, path):
+        with open(path, newline="") as file:
+            return list(csv.DictReader(file))
+
+    def test_streamed_audit_trail(self):
+        log_sink = AuditLogSink(self.log_path, batch_size=1000, keep_entries=3)
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline())
+        analytics.process(log_sink=log_sink)
+
+        # flushed after every node, before the log is closed
+        entries = self.read_log(self.log_path)
+        messages = [entry["message"] for entry in entries]
+        self.assertIn("Processing node C (3 of 3)", messages)
+        self.assertIn("Time taken:", messages[-1])
+        self.assertEqual(len(entries), log_sink.entries_written)
+
+        # only the tail of the trail is kept in memory
+        self.assertEqual(len(analytics.audit_trail), 3)
+        self.assertEqual(list(analytics.audit_trail), entries[-3:])
+
+    def test_rotation_and_ship(self):
+        shipped_path = os.path.join(self.log_directory, "shipped", "audit_trail.csv")
+        log_sink = AuditLogSink(
+            self.log_path,
+            ship_to=shipped_path,
+            batch_size=10,
+            max_bytes=500,
+            backup_count=100,
+        )
+        for idx in range(100):
+            log_sink.write({"timestamp": "2024-01-01T00:00:00Z", "message": f"entry {idx}"})
+        log_sink.close()
+
+        self.assertTrue(os.path.exists(get_rotated_path(self.log_path, 1)))
+        for path in log_sink.get_local_files():
+            self.assertLessEqual(os.path.getsize(path), 500)
+
+        entries = self.read_log(shipped_path)
+        self.assertEqual(
+            [entry["message"] for entry in entries],
+            [f"entry {idx}" for idx in range(100)],
+        )
+
+    def test_bounded_backups(self):
+        log_sink = AuditLogSink(
+            self.log_path, batch_size=10, max_bytes=500, backup_count=2
+        )
+        for idx in range(100):
+            log_sink.write({"timestamp": "2024-01-01T00:00:00Z", "message": f"entry {idx}"})
+        log_sink.close()
+
+        self.assertEqual(len(log_sink.get_local_files()), 3)
+        self.assertFalse(os.path.exists(get_rotated_path(self.log_path, 3)))
+        last_entries = self.read_log(self.log_path)
+        self.assertEqual(last_entries[-1]["message"], "entry 99")
@@ -0,0 +1,198 @@
+import unittest
+import tempfile
+import shutil
+import json
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics, process_sub_pipeline
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+    FilterOperations,
+)
+from ebflow.analytics.checkpoint import PipelineCheckpoint
+import os
+
+
+class TestDNACheckpoint(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNACheckpoint, self).__init__(*args, **kwargs)
+        self.input_columns = [
+            "EMPLOYEE_ID",
+            "FIRST_NAME",
+            "LAST_NAME",
+            "EMAIL",
+            "PHONE_NUMBER",
+            "HIRE_DATE",
+            "JOB_ID",
+            "SALARY",
+            "COMMISSION_PCT",
+            "MANAGER_ID",
+            "DEPARTMENT_ID",
+            "JOINED_DATE",
+        ]
+        self.filter_output = "tests/test_analytics/test_dna/data/temp/checkpoint_filter.csv"
+        self.avg_output = "tests/test_analytics/test_dna/data/temp/checkpoint_avg.csv"
+
+    def setUp(self):
+        self.checkpoint_directory = tempfile.mkdtemp()
+        self.checkpoint_path = os.path.join(
+            self.checkpoint_directory, "pipeline_checkpoint.json"
+        )
+
+    def tearDown(self):
+        shutil.rmtree(self.checkpoint_directory, ignore_errors=True)
+        for output_path in [self.filter_output, self.avg_output]:
+            if os.path.exists(output_path):
+                os.remove(output_path)
+
+    def get_pipeline(self, avg_column: str, department_id: str = "50"):
+        return AnalyticsPipeline(
+            nodes=[
+                Node(
+                    id="n1",
+                    data=NodeData(
+                        type="extract",
+                        file_name="dna_test_file.csv",
+                        file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                        ingestion="ingestion",
+                        cdm_file="cdm_file",
+                    ),
+                ),
+                Node(
+                    id="n2",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="filter",
+                        operation_value=department_id,
+                        operation_formula=FilterOperations(title="Equal to", value="=="),
+                        column_name="DEPARTMENT_ID",
+                        input_columns=self.input_columns,
+                        output_columns=self.input_columns,
+                    ),
+                ),
+                Node(
+                    id="n3",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="avg",
+                        column_name=avg_column,
+                        input_columns=self.input_columns,
+                        output_columns=[f"avg_{avg_column}"],
+                    ),
+                ),
+                Node(
+                    id="n4",
+                    data=NodeData(
+                        type="load",
+                        file_name=self.filter_output.split("/")[-1],
+                        file_path=self.filter_output,
+                    ),
+                ),
+                Node(
+                    id="n5",
+                    data=NodeData(
+                        type="load",
+                        file_name=self.avg_output.split("/")[-1],
+                        file_path=self.avg_output,
+                    ),
+                ),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n1", target="n3"),
+                Edge(id="e3", source="n2", target="n4"),
+                Edge(id="e4", source="n3", target="n5"),
+            ],
+        )
+
+    def get_two_branch_pipeline(self, department_id: str):
+        # the average reads its own extract, so the filter and the average are
+        # independent branches, each run in its own worker process
+        pipeline = self.get_pipeline("SALARY", department_id)
+        pipeline.nodes.append(pipeline.nodes[0].model_copy(update={"id": "n6"}))
+        pipeline.edges[1] = Edge(id="e2", source="n6", target="n3")
+        return pipeline
+
+    def test_worker_reports_own_records(self):
+        checkpoint = PipelineCheckpoint()
+        checkpoint.merge({"n4": {"inputs": {"n2": "stale"}, "output": "old.csv"}})
+        pipeline = self.get_two_branch_pipeline("50")
+        branch = AnalyticsPipeline(
+            nodes=[node for node in pipeline.nodes if node.id in ["n6", "n3", "n5"]],
+            edges=[edge for edge in pipeline.edges if edge.target in ["n3", "n5"]],
+        )
+        result = process_sub_pipeline(
+            branch, {"checkpoint": checkpoint.detached(), "resume": True}
+        )
+        self.assertEqual(set(result["checkpoint"]), {"n6", "n3", "n5"})
+
+    def test_resume_in_processes(self):
+        checkpoint = PipelineCheckpoint(self.checkpoint_path)
+        analytics = DataAndAnalytics(pipeline=self.get_two_branch_pipeline("50"))
+        analytics.process(max_workers=2, executor="process", checkpoint=checkpoint)
+        first = PipelineCheckpoint(self.checkpoint_path).load().nodes
+        self.assertEqual(set(first), {"n1", "n2", "n3", "n4", "n5", "n6"})
+
+        # only the filter branch changes, its fresh records are kept whichever
+        # branch finishes last
+        checkpoint = PipelineCheckpoint(self.checkpoint_path).load()
+        analytics = DataAndAnalytics(pipeline=self.get_two_branch_pipeline("80"))
+        analytics.process(
+            max_workers=2, executor="process", checkpoint=checkpoint, resume=True
+        )
+        second = PipelineCheckpoint(self.checkpoint_path).load().nodes
+        self.assertNotEqual(
+            second["n4"]["inputs"]["n2"], first["n4"]["inputs"]["n2"]
+        )
+        self.assertEqual(second["n2"]["fingerprint"], second["n4"]["inputs"]["n2"])
+        self.assertEqual(second["n5"], first["n5"])
+
+    def test_resume_after_failure(self):
+        # the average of a text column fails after the filter output is written
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline("FIRST_NAME"))
+        with self.assertRaises(ValueError):
+            analytics.process(checkpoint=PipelineCheckpoint(self.checkpoint_path))
+        self.assertTrue(os.path.exists(self.filter_output))
+        self.assertFalse(os.path.exists(self.avg_output))
+
+        with open(self.checkpoint_path) as file:
+            saved = json.load(file)
+        self.assertEqual(saved["state"], "FAILED")
+        self.assertEqual(saved["nodes"]["n4"]["output"], self.filter_output)
+        self.assertEqual(list(saved["nodes"]["n4"]["inputs"]), ["n2"])
+        self.assertNotIn("n5", saved["nodes"])
+        os.remove(self.filter_output)
+
+        checkpoint = PipelineCheckpoint(self.checkpoint_path).load()
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline("SALARY"))
+        analytics.process(checkpoint=checkpoint, resume=True)
+        self.assertEqual(analytics.completed_nodes, {"n2"})
+        self.assertFalse(os.path.exists(self.filter_output))
+
+        output_resource = TableResource(path=self.avg_output)
+        output_resource.infer()
+        self.assertEqual(len(output_resource.read_rows()), 1)
+        messages = [audit["message"] for audit in analytics.audit_trail]
+        self.assertIn(
+            f"Output already written at {self.filter_output}, skipped on resume",
+            messages,
+        )
+        self.assertEqual(PipelineCheckpoint(self.checkpoint_path).load().state, "PROCESSED")
+
+    def test_fresh_run_resets_checkpoint(self):
+        checkpoint = PipelineCheckpoint(self.checkpoint_path)
+        checkpoint.merge({"n4": {"inputs": {"n2": "stale"}, "output": "old.csv"}})
+
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline("SALARY"))
+        analytics.process(checkpoint=checkpoint)
+        self.assertEqual(
+            checkpoint.nodes["n4"]["inputs"], {"n2": analytics.fingerprints["n2"]}
+        )
+        self.assertEqual(set(checkpoint.nodes), {"n1", "n2", "n3", "n4", "n5"})
+
+    def test_resume_requires_checkpoint(self):
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline("SALARY"))
+        with self.assertRaises(ValueError):
+            analytics.process(resume=True)
@@ -0,0 +1,199 @@
+import unittest
+import os
+from decimal import Decimal
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    FilterOperations,
+    Node,
+    NodeData,
+)
+from ebflow.analytics.joins import compare_values, hash_outer_join
+
+
+class TestDNACompareJoin(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNACompareJoin, self).__init__(*args, **kwargs)
+        self.input_columns = ["ID", "CATEGORY", "AMOUNT", "TOP_LIST"]
+        self.output_path = "tests/test_analytics/test_dna/data/temp/compare_join.csv"
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def get_extract_node(self, id: str, label: str, file_name: str) -> Node:
+        return Node(
+            id=id,
+            data=NodeData(
+                type="extract",
+                label=label,
+                file_name=file_name,
+                file_path=f"tests/test_analytics/test_dna/data/{file_name}",
+                ingestion="ingestion",
+                cdm_file="cdm_file",
+            ),
+        )
+
+    def get_compare_node(self, id: str, datasource) -> Node:
+        return Node(
+            id=id,
+            data=NodeData(
+                type="transform",
+                label="C",
+                operation_name="compare",
+                compare_columns=["AMOUNT"],
+                matching_columns=["ID", "CATEGORY"],
+                input_columns=self.input_columns,
+                output_columns=["matching_columns_match"],
+                datasource=datasource,
+            ),
+        )
+
+    def get_load_node(self, id: str) -> Node:
+        return Node(
+            id=id,
+            data=NodeData(
+                type="load",
+                label="L",
+                file_name=self.output_path.split("/")[-1],
+                file_path=self.output_path,
+            ),
+        )
+
+    def run_pipeline(self, nodes, edges):
+        files_before = set(os.listdir("."))
+        analytics = DataAndAnalytics(
+            pipeline=AnalyticsPipeline(nodes=nodes, edges=edges)
+        )
+        analytics.process()
+        # nothing is written next to the output any more
+        self.assertEqual(set(os.listdir(".")), files_before)
+        output_resource = TableResource(path=self.output_path)
+        output_resource.infer()
+        return output_resource.read_rows()
+
+    def test_hash_outer_join(self):
+        left = [[1, "a"], [2, "b"], [2, "c"], [4, "d"]]
+        right = [[2, "x"], [3, "y"]]
+        pairs = list(hash_outer_join(left, right, [0], [0]))
+        # the right side is smaller: left rows stream in order, then unmatched right rows
+        self.assertEqual(
+            pairs,
+            [
+                ([1, "a"], None),
+                ([2, "b"], [2, "x"]),
+                ([2, "c"], [2, "x"]),
+                ([4, "d"], None),
+                (None, [3, "y"]),
+            ],
+        )
+
+    def test_hash_outer_join_left_smaller(self):
+        left = [["k", 1]]
+        right = [[0, "k"], [1, "j"], [2, "k"]]
+        pairs = list(hash_outer_join(left, right, [0], [1]))
+        self.assertEqual(
+            pairs,
+            [
+                (["k", 1], [0, "k"]),
+                (None, [1, "j"]),
+                (["k", 1], [2, "k"]),
+            ],
+        )
+        self.assertEqual(list(hash_outer_join([], [], [0], [0])), [])
+
+    def test_compare_values(self):
+        self.assertEqual(compare_values(100, 150), "-50")
+        self.assertEqual(compare_values(100, None), "False")
+        self.assertEqual(compare_values("SKIN", "SKIN"), "True")
+        self.assertEqual(compare_values("100", "150"), "-50")
+        self.assertEqual(compare_values(-12, 10), "-22")
+        self.assertEqual(
+            compare_values(Decimal("-12.50"), Decimal("10.00")), "-22.50"
+        )
+        self.assertEqual(compare_values(Decimal("10.5"), 3), "7.5")
+        self.assertEqual(compare_values(2.5, Decimal("-1")), "3.5")
+        self.assertEqual(compare_values(True, 1), "False")
+
+    def test_compare(self):
+        nodes = [
+            self.get_extract_node("n1", "A", "compare_set_1.csv"),
+            self.get_extract_node("n2", "B", "compare_set_2.csv"),
+            self.get_compare_node("n3", ["n1", "n2"]),
+            self.get_load_node("n4"),
+        ]
+        edges = [
+            Edge(id="e1", source="n1", target="n3"),
+            Edge(id="e2", source="n2", target="n3"),
+            Edge(id="e3", source="n3", target="n4"),
+        ]
+        rows = self.run_pipeline(nodes, edges)
+
+        self.assertEqual(len(rows), 8)
+        self.assertEqual(
+            list(rows[0].keys()),
+            [
+                "A_ID",
+                "A_CATEGORY",
+                "A_AMOUNT",
+                "A_TOP_LIST",
+                "B_AMOUNT",
+                "B_TOP_LIST",
+                "matching_columns_match",
+            ],
+        )
+        self.assertEqual(
+            [row["matching_columns_match"] for row in rows],
+            [-50, -50, -50, 0, 0, 0, -50, -50],
+        )
+
+    def test_filter_compare(self):
+        filter_node = Node(
+            id="n3",
+            data=NodeData(
+                type="transform",
+                label="C",
+                operation_name="filter",
+                operation_value="HEALTH",
+                operation_formula=FilterOperations(title="Equal to", value="=="),
+                column_name="CATEGORY",
+                input_columns=self.input_columns,
+                output_columns=self.input_columns,
+            ),
+        )
+        nodes = [
+            self.get_extract_node("n1", "A", "compare_set_1.csv"),
+            self.get_extract_node("n2", "B", "compare_set_2.csv"),
+            filter_node,
+            self.get_compare_node("n4", ["n3", "n2"]),
+            self.get_load_node("n5"),
+        ]
+        edges = [
+            Edge(id="e1", source="n1", target="n3"),
+            Edge(id="e2", source="n3", target="n4"),
+            Edge(id="e3", source="n2", target="n4"),
+            Edge(id="e4", source="n4", target="n5"),
+        ]
+        rows = self.run_pipeline(nodes, edges)
+
+        # the filtered side is hashed, the other one streams past it
+        self.assertEqual(len(rows), 8)
+        matched = [row for row in rows if row["C_TOP_LIST"] is not None]
+        self.assertEqual(len(matched), 1)
+        self.assertEqual(matched[0]["C_CATEGORY"], "HEALTH")
+        self.assertEqual(matched[0]["matching_columns_match"], "-50")
+        # rows only on the right carry its keys in the key fields, the load
+        # turns their missing amounts into 0
+        self.assertEqual(
+            sorted(row["C_ID"] for row in rows if row["C_TOP_LIST"] is None),
+            [1, 2, 3, 4, 5, 6, 8],
+        )
+        self.assertTrue(
+            all(
+                row["matching_columns_match"] == "False"
+                for row in rows
+                if row["C_TOP_LIST"] is None
+            )
+        )
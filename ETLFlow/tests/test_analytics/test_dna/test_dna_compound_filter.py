@@ -0,0 +1,154 @@
+import unittest
+from frictionless import Schema
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    FilterCondition,
+    Node,
+    NodeData,
+)
+from ebflow.analytics.predicates import CompiledPredicate
+import os
+
+
+class TestDNACompoundFilter(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNACompoundFilter, self).__init__(*args, **kwargs)
+        self.output_path = "tests/test_analytics/test_dna/data/temp/compound_filter.csv"
+        self.schema = Schema.from_descriptor(
+            {
+                "fields": [
+                    {"name": "ID", "type": "integer"},
+                    {"name": "CATEGORY", "type": "string"},
+                    {"name": "AMOUNT", "type": "number"},
+                ]
+            }
+        )
+        self.condition = {
+            "operator": "or",
+            "conditions": [
+                {"operator": "!=", "column_name": "CATEGORY", "value": "SKIN"},
+                {
+                    "operator": "and",
+                    "conditions": [
+                        {"operator": "between", "column_name": "AMOUNT", "value": [10, 20]},
+                        {"operator": "in", "column_name": "ID", "value": ["1", "2"]},
+                    ],
+                },
+            ],
+        }
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def test_compiled_predicate(self):
+        predicate = CompiledPredicate(FilterCondition(**self.condition), self.schema)
+        self.assertTrue(predicate([1, "HAIR", None]))
+        self.assertTrue(predicate([2, "SKIN", 20]))
+        self.assertFalse(predicate([3, "SKIN", 15]))
+        # an empty amount is not between the bounds, it is not an error
+        self.assertFalse(predicate([1, "SKIN", None]))
+
+        negated = CompiledPredicate(
+            FilterCondition(operator="not", conditions=[self.condition]), self.schema
+        )
+        self.assertTrue(negated([3, "SKIN", 15]))
+
+    def test_selectivity_order(self):
+        condition = FilterCondition(
+            operator="and",
+            conditions=[
+                {"operator": "!=", "column_name": "CATEGORY", "value": "SKIN"},
+                {"operator": "==", "column_name": "ID", "value": 1},
+            ],
+        )
+        predicate = CompiledPredicate(condition, self.schema)
+        self.assertAlmostEqual(predicate.selectivity, 0.09)
+        # the equality drops most rows, so it is checked first and the
+        # category of a row it drops is not even read
+        row = {0: 2, 2: 0}
+        self.assertFalse(predicate(row))
+
+    def test_invalid_condition(self):
+        with self.assertRaises(ValueError):
+            FilterCondition(operator="between", column_name="AMOUNT", value=[1])
+        with self.assertRaises(ValueError):
+            FilterCondition(operator="not", conditions=[self.condition, self.condition])
+        with self.assertRaisesRegex(ValueError, "Invalid value ten for column AMOUNT"):
+            CompiledPredicate(
+                FilterCondition(operator=">", column_name="AMOUNT", value="ten"),
+                self.schema,
+            )
+        with self.assertRaisesRegex(ValueError, "Column PRICE not found"):
+            CompiledPredicate(
+                FilterCondition(operator=">", column_name="PRICE", value=1),
+                self.schema,
+            )
+
+    def test_compound_filter_pipeline(self):
+        nodes = [
+            Node(
+                id="n1",
+                data=NodeData(
+                    type="extract",
+                    file_name="dna_test_file.csv",
+                    file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                    ingestion="ingestion",
+                    cdm_file="cdm_file",
+                ),
+            ),
+            Node(
+                id="n2",
+                data=NodeData(
+                    type="transform",
+                    operation_name="compound_filter",
+                    condition={
+                        "operator": "and",
+                        "conditions": [
+                            {"operator": "in", "column_name": "DEPARTMENT_ID", "value": [50, 80]},
+                            {"operator": "between", "column_name": "SALARY", "value": [2000, 3000]},
+                        ],
+                    },
+                    input_columns=["DEPARTMENT_ID", "SALARY"],
+                    output_columns=["DEPARTMENT_ID", "SALARY"],
+                ),
+            ),
+            Node(
+                id="n3",
+                data=NodeData(
+                    type="load",
+                    file_name=self.output_path.split("/")[-1],
+                    file_path=self.output_path,
+                ),
+            ),
+        ]
+        edges = [
+            Edge(id="e1", source="n1", target="n2"),
+            Edge(id="e2", source="n2", target="n3"),
+        ]
+        outputs = []
+        for optimize in [True, False]:
+            analytics = DataAndAnalytics(
+                pipeline=AnalyticsPipeline(nodes=nodes, edges=edges)
+            )
+            analytics.process(optimize=optimize)
+            messages = [entry["message"] for entry in analytics.audit_trail]
+            self.assertIn(
+                "Transform: compound_filter where "
+                "(DEPARTMENT_ID in [50, 80] and SALARY between [2000, 3000])",
+                messages,
+            )
+            self.assertIn("Filter node B: 12 rows kept, 37 rows dropped", messages)
+
+            output_resource = TableResource(path=self.output_path)
+            output_resource.infer()
+            outputs.append([row.to_list() for row in output_resource.read_rows()])
+
+        self.assertEqual(outputs[0], outputs[1])
+        self.assertEqual(len(outputs[0]), 12)
+        for row in outputs[0]:
+            self.assertEqual(row[10], 50)
+            self.assertTrue(2000 <= row[7] <= 3000)
@@ -0,0 +1,124 @@
+import unittest
+import random
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+)
+from ebflow.analytics.duplicates import flag_duplicates_in_rows
+import os
+
+
+class TestDNADuplicates(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNADuplicates, self).__init__(*args, **kwargs)
+        self.input_columns = [
+            "EMPLOYEE_ID",
+            "FIRST_NAME",
+            "LAST_NAME",
+            "EMAIL",
+            "PHONE_NUMBER",
+            "HIRE_DATE",
+            "JOB_ID",
+            "SALARY",
+            "COMMISSION_PCT",
+            "MANAGER_ID",
+            "DEPARTMENT_ID",
+        ]
+        self.output_path = "tests/test_analytics/test_dna/data/temp/duplicate_keys.csv"
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def get_flags(self, rows, key_indexes=None, **options):
+        flagged = list(flag_duplicates_in_rows(iter(rows), key_indexes, **options))
+        self.assertEqual([row for row, _ in flagged], rows)
+        return [flag for _, flag in flagged]
+
+    def test_keep_options(self):
+        rows = [["a", 1], ["b", 2], ["a", 3], ["c", 4], ["a", 5], ["b", 6]]
+        self.assertEqual(
+            self.get_flags(rows, [0], keep="first"),
+            [False, False, True, False, True, True],
+        )
+        self.assertEqual(
+            self.get_flags(rows, [0], keep="last"),
+            [True, True, True, False, False, False],
+        )
+        self.assertEqual(
+            self.get_flags(rows, [0], keep="all"),
+            [True, True, True, False, True, True],
+        )
+        # without key columns the whole row is compared
+        self.assertEqual(self.get_flags(rows), [False] * 6)
+        with self.assertRaises(ValueError):
+            self.get_flags(rows, keep="middle")
+
+    def test_spill_to_disk(self):
+        random.seed(3)
+        rows = [[random.randint(0, 300), random.choice("xyz")] for _ in range(3000)]
+        for keep in ["first", "last", "all"]:
+            self.assertEqual(
+                self.get_flags(rows, [0, 1], keep=keep, max_keys=50),
+                self.get_flags(rows, [0, 1], keep=keep),
+            )
+
+    def test_duplicate_node_with_key_columns(self):
+        pipeline = AnalyticsPipeline(
+            nodes=[
+                Node(
+                    id="n1",
+                    data=NodeData(
+                        type="extract",
+                        file_name="dna_test_file.csv",
+                        file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                        ingestion="ingestion",
+                        cdm_file="cdm_file",
+                    ),
+                ),
+                Node(
+                    id="n2",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="duplicate",
+                        column_name=["DEPARTMENT_ID"],
+                        keep="all",
+                        input_columns=self.input_columns,
+                        output_columns=self.input_columns + ["is_duplicate"],
+                    ),
+                ),
+                Node(
+                    id="n3",
+                    data=NodeData(
+                        type="load",
+                        file_name=self.output_path.split("/")[-1],
+                        file_path=self.output_path,
+                    ),
+                ),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n2", target="n3"),
+            ],
+        )
+        DataAndAnalytics(pipeline=pipeline).process()
+
+        rows = TableResource(path=self.output_path).read_rows()
+        self.assertEqual(len(rows), 49)
+        departments = [row["DEPARTMENT_ID"] for row in rows]
+        for row in rows:
+            expected = "Y" if departments.count(row["DEPARTMENT_ID"]) > 1 else "N"
+            self.assertEqual(row["is_duplicate"], expected)
+
+    def test_invalid_keep(self):
+        with self.assertRaises(ValueError):
+            NodeData(
+                type="transform",
+                operation_name="duplicate",
+                keep="middle",
+                input_columns=self.input_columns,
+            )
@@ -0,0 +1,88 @@
+import unittest
+from decimal import Decimal
+from unittest import mock
+from frictionless import transform
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics_schema import MultipleCalculationData
+from ebflow.analytics.custom_steps import calculated_field
+from ebflow.analytics.expressions import CompiledExpression
+
+
+class TestDNAExpressions(unittest.TestCase):
+    def test_compiled_expression(self):
+        expression = CompiledExpression("A ** B + C", {"A": "amount", "B": "power", "C": "fee"})
+        row = {"amount": Decimal("-2"), "power": 2, "fee": None}
+        # the value is bound, not pasted into the text, so -2 ** 2 is not -4
+        self.assertEqual(expression(row), 4)
+        self.assertEqual(expression({"amount": Decimal("2.5"), "power": 2, "fee": 1}), 7.25)
+
+    def test_variable_inside_another_name(self):
+        expression = CompiledExpression("AB - A", {"A": "first", "AB": "second"})
+        self.assertEqual(expression({"first": 10, "second": 15}), 5)
+
+    def test_invalid_expressions(self):
+        invalid = {
+            "A +": "syntactically incorrect",
+            "A / 0": "division by zero",
+            "A + X": "extra variables",
+            "__import__('os')": "Invalid expression",
+            "A.real": "Invalid expression",
+            "pow(A, 2)": "Invalid expression",
+            "abs(A, 1)": "Invalid arguments for abs",
+            "max(A)": "Invalid arguments for max",
+            "round(A, ndigits=2)": "Invalid arguments for round",
+        }
+        for expression, message in invalid.items():
+            with self.assertRaises(ValueError) as context:
+                CompiledExpression(expression, {"A": "amount"})
+            self.assertIn(message, str(context.exception))
+
+        with self.assertRaises(ValueError):
+            MultipleCalculationData(expression="A + B", column={"A": "amount"})
+
+    def test_functions(self):
+        # the built-ins the old eval based validation accepted
+        data = MultipleCalculationData(
+            expression="round(abs(A - B) / 3, 2) + max(A, B, 1) - min(A, 0)",
+            column={"A": "a", "B": "b"},
+        )
+        expression = CompiledExpression(data.expression, data.column)
+        self.assertEqual(expression.names, ["A", "B"])
+        self.assertEqual(expression({"a": -5, "b": 5}), 3.33 + 5 + 5)
+
+        columns = {"A": [-5, 2, 7], "B": [5, 2, -1]}
+        expected = [expression({"a": a, "b": b}) for a, b in zip(*columns.values())]
+        # element-wise over arrays with NumPy, value by value without it
+        for value, expected_value in zip(expression.evaluate_batch(columns, 3), expected):
+            self.assertAlmostEqual(value, expected_value)
+        with mock.patch("ebflow.analytics.expressions.get_numpy", return_value=None):
+            self.assertEqual(expression.evaluate_batch(columns, 3), expected)
+
+    def test_vectorized(self):
+        data = MultipleCalculationData(
+            expression="(A - B) * C^2 / 4", column={"A": "a", "B": "b", "C": "c"}
+        )
+        expression = CompiledExpression(data.expression, data.column)
+        rows = [[idx, Decimal(idx) / 4, 3, idx % 7] for idx in range(25)]
+        resource = TableResource(data=[["a", "b", "c", "d"]] + rows)
+        target = transform(
+            resource,
+            steps=[calculated_field(name="maths", expression=expression, batch_rows=10)],
+        )
+        values = [row["maths"] for row in target.read_rows()]
+        self.assertEqual(len(values), 25)
+        for row, value in zip(rows, values):
+            self.assertAlmostEqual(value, expression(dict(zip("abcd", row))))
+
+        # without NumPy the batches are evaluated row by row
+        with mock.patch("ebflow.analytics.expressions.get_numpy", return_value=None):
+            target = transform(
+                resource.to_copy(),
+                steps=[calculated_field(name="maths", expression=expression)],
+            )
+            self.assertEqual([row["maths"] for row in target.read_rows()], values)
+
+    def test_vectorized_division_by_zero(self):
+        expression = CompiledExpression("A / B", {"A": "a", "B": "b"})
+        with self.assertRaises(ValueError):
+            expression.evaluate_batch({"A": [1, 2], "B": [1, 0]}, 2)
@@ -0,0 +1,160 @@
+import unittest
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+    FilterOperations,
+)
+from ebflow.analytics.fan_out import BranchReader, RowTee
+import os
+
+
+class TestDNAFanOut(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNAFanOut, self).__init__(*args, **kwargs)
+        self.input_columns = [
+            "EMPLOYEE_ID",
+            "FIRST_NAME",
+            "LAST_NAME",
+            "EMAIL",
+            "PHONE_NUMBER",
+            "HIRE_DATE",
+            "JOB_ID",
+            "SALARY",
+            "COMMISSION_PCT",
+            "MANAGER_ID",
+            "DEPARTMENT_ID",
+            "JOINED_DATE",
+        ]
+
+    def get_load_node(self, id: str, output_path: str) -> Node:
+        return Node(
+            id=id,
+            data=NodeData(
+                type="load",
+                file_name=output_path.split("/")[-1],
+                file_path=output_path,
+            ),
+        )
+
+    def test_tee_spills_slow_branch(self):
+        rows = [[idx, f"row {idx}"] for idx in range(50)]
+        tee = RowTee(iter(rows), branches=2, buffer_rows=5)
+
+        first = [tee.next_row(0) for _ in range(50)]
+        self.assertEqual(first, rows)
+        self.assertEqual(len(tee.buffers[1]), 5)
+        self.assertEqual(tee.spills[1].pending, 45)
+
+        second = [tee.next_row(1) for _ in range(50)]
+        self.assertEqual(second, rows)
+        self.assertEqual(tee.rows_read, 50)
+        tee.close()
+
+    def test_branch_reader_replays_prefix(self):
+        rows = [[idx] for idx in range(20)]
+        tee = RowTee(iter(rows), branches=1)
+        reader = BranchReader(tee, 0, ["id"], replay_rows=5)
+
+        sample = reader()
+        self.assertEqual([next(sample) for _ in range(4)], [["id"], [0], [1], [2]])
+        self.assertEqual(list(reader()), [["id"]] + rows)
+
+        with self.assertRaises(ValueError):
+            list(reader())
+
+    def test_fan_out_process(self):
+        filter_path = "tests/test_analytics/test_dna/data/temp/fan_out_filter.csv"
+        sum_path = "tests/test_analytics/test_dna/data/temp/fan_out_sum.csv"
+        count_path = "tests/test_analytics/test_dna/data/temp/fan_out_count.csv"
+
+        extract_node = Node(
+            id="n1",
+            data=NodeData(
+                type="extract",
+                file_name="dna_test_file.csv",
+                file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                ingestion="ingestion",
+                cdm_file="cdm_file",
+            ),
+        )
+        filter_node = Node(
+            id="n2",
+            data=NodeData(
+                type="transform",
+                operation_name="filter",
+                operation_value="50",
+                operation_formula=FilterOperations(title="Equal to", value="=="),
+                column_name="DEPARTMENT_ID",
+                input_columns=self.input_columns,
+                output_columns=self.input_columns,
+            ),
+        )
+        sum_node = Node(
+            id="n3",
+            data=NodeData(
+                type="transform",
+                operation_name="sum",
+                column_name="SALARY",
+                input_columns=self.input_columns,
+                output_columns=["sum_SALARY"],
+            ),
+        )
+        count_node = Node(
+            id="n4",
+            data=NodeData(
+                type="transform",
+                operation_name="count",
+                unique=False,
+                column_name="MANAGER_ID",
+                input_columns=self.input_columns,
+                output_columns=["count_MANAGER_ID"],
+            ),
+        )
+        pipeline = AnalyticsPipeline(
+            nodes=[
+                extract_node,
+                filter_node,
+                sum_node,
+                count_node,
+                self.get_load_node("n5", filter_path),
+                self.get_load_node("n6", sum_path),
+                self.get_load_node("n7", count_path),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n1", target="n3"),
+                Edge(id="e3", source="n1", target="n4"),
+                Edge(id="e4", source="n2", target="n5"),
+                Edge(id="e5", source="n3", target="n6"),
+                Edge(id="e6", source="n4", target="n7"),
+            ],
+        )
+
+        analytics = DataAndAnalytics(pipeline=pipeline)
+        analytics.fan_out_buffer_rows = 10
+        analytics.process(fan_out=True)
+
+        messages = [audit["message"] for audit in analytics.audit_trail]
+        self.assertIn("Fan-out complete, 49 rows read", messages)
+        self.assertIn("Time taken:", messages[-1])
+        self.assertTrue(all(node.processed for node in pipeline.nodes))
+
+        filter_resource = TableResource(path=filter_path)
+        filter_resource.infer()
+        self.assertEqual(len(filter_resource.read_rows()), 22)
+
+        sum_resource = TableResource(path=sum_path)
+        sum_resource.infer()
+        self.assertEqual(sum_resource.read_rows(), [{"sum_SALARY": 306616}])
+
+        count_resource = TableResource(path=count_path)
+        count_resource.infer()
+        self.assertEqual(count_resource.read_rows(), [{"count_MANAGER_ID": 49}])
+
+        os.remove(filter_path)
+        os.remove(sum_path)
+        os.remove(count_path)
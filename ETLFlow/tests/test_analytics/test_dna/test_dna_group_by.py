@@ -891,3 +891,79 @@ class TestGroupByOperation(unittest.TestCase):
         self.assertEqual(fifth_rows["min_SALARY"], 5800)
 
         os.remove(output_path)
+
+    def test_group_by_multiple_aggregations(self):
+        output_path = "tests/test_analytics/test_dna/data/temp/test_group_by_multiple_aggregations.csv"
+        output_columns = [
+            "DEPARTMENT_ID",
+            "sum_SALARY",
+            "count_SALARY",
+            "avg_SALARY",
+            "count_unique_MANAGER_ID",
+        ]
+
+        extract_node = self.get_extract_node(id="n1")
+
+        load_node = self.get_load_node(id="n3")
+        load_node.data.file_path = output_path
+        load_node.data.file_name = output_path.split("/")[-1]
+
+        transform_node_data = NodeData(
+            id="n2",
+            type="transform",
+            operation_name="group_by",
+            column_name="SALARY",
+            group_by=["DEPARTMENT_ID"],
+            aggregation_type="sum",
+            aggregations=[
+                {"column_name": "SALARY", "aggregation_type": "count"},
+                {"column_name": "SALARY", "aggregation_type": "avg"},
+                {"column_name": "MANAGER_ID", "aggregation_type": "count", "unique": True},
+            ],
+            input_columns=self.input_columns,
+            output_columns=output_columns,
+        )
+        transform_node = Node(id="n2", data=transform_node_data)
+
+        edge1 = Edge(id="e1", source="n1", target="n2")
+        edge2 = Edge(id="e2", source="n2", target="n3")
+
+        pipeline = AnalyticsPipeline(
+            nodes=[extract_node, transform_node, load_node],
+            edges=[edge1, edge2],
+        )
+
+        analytics = DataAndAnalytics(pipeline=pipeline)
+        analytics.process()
+        self.assertTrue(os.path.exists(output_path))
+
+        audit_trail = analytics.audit_trail
+        self.check_audit_trail(audit_trail)
+
+        output_resource = TableResource(path=output_path)
+        output_resource.infer()
+
+        self.assertEqual(output_resource.header, output_columns)
+        self.assertEqual(len(output_resource.read_rows()), 10)
+
+        fifth_row = output_resource.read_rows()[4].to_dict()
+        self.assertEqual(fifth_row["DEPARTMENT_ID"], 50)
+        self.assertEqual(fifth_row["sum_SALARY"], 83100)
+        self.assertEqual(fifth_row["count_SALARY"], 22)
+        self.assertEqual(float(fifth_row["avg_SALARY"]), 3777.27273)
+        self.assertEqual(fifth_row["count_unique_MANAGER_ID"], 7)
+
+        os.remove(output_path)
+
+    def test_group_by_invalid_aggregation(self):
+        with self.assertRaises(ValueError):
+            NodeData(
+                id="n2",
+                type="transform",
+                operation_name="group_by",
+                column_name="SALARY",
+                group_by=["DEPARTMENT_ID"],
+                aggregation_type="sum",
+                aggregations=[{"column_name": "SALARY", "aggregation_type": "median"}],
+                input_columns=self.input_columns,
+            )
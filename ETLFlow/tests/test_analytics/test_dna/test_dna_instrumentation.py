@@ -0,0 +1,129 @@
+import unittest
+import tempfile
+import shutil
+import json
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+    FilterOperations,
+)
+from ebflow.analytics.instrumentation import PipelineProfiler
+import os
+
+
+class TestDNAInstrumentation(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNAInstrumentation, self).__init__(*args, **kwargs)
+        self.input_columns = [
+            "EMPLOYEE_ID",
+            "FIRST_NAME",
+            "LAST_NAME",
+            "EMAIL",
+            "PHONE_NUMBER",
+            "HIRE_DATE",
+            "JOB_ID",
+            "SALARY",
+            "COMMISSION_PCT",
+            "MANAGER_ID",
+            "DEPARTMENT_ID",
+            "JOINED_DATE",
+        ]
+        self.output_path = "tests/test_analytics/test_dna/data/temp/profiled_sum.csv"
+
+    def setUp(self):
+        self.spans_directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.spans_directory, ignore_errors=True)
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def get_pipeline(self):
+        return AnalyticsPipeline(
+            nodes=[
+                Node(
+                    id="n1",
+                    data=NodeData(
+                        type="extract",
+                        file_name="dna_test_file.csv",
+                        file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                        ingestion="ingestion",
+                        cdm_file="cdm_file",
+                    ),
+                ),
+                Node(
+                    id="n2",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="filter",
+                        operation_value="50",
+                        operation_formula=FilterOperations(title="Equal to", value="=="),
+                        column_name="DEPARTMENT_ID",
+                        input_columns=self.input_columns,
+                        output_columns=self.input_columns,
+                    ),
+                ),
+                Node(
+                    id="n3",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="sum",
+                        column_name="SALARY",
+                        input_columns=self.input_columns,
+                        output_columns=["sum_SALARY"],
+                    ),
+                ),
+                Node(
+                    id="n4",
+                    data=NodeData(
+                        type="load",
+                        file_name=self.output_path.split("/")[-1],
+                        file_path=self.output_path,
+                    ),
+                ),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n2", target="n3"),
+                Edge(id="e3", source="n3", target="n4"),
+            ],
+        )
+
+    def test_spans(self):
+        profiler = PipelineProfiler()
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline())
+        # without step fusion, so that every generated step keeps its own span
+        analytics.process(profiler=profiler, optimize=False)
+
+        node_spans = {span.node_id: span for span in profiler.spans if span.kind == "node"}
+        self.assertEqual(set(node_spans), {"n1", "n2", "n3", "n4"})
+        self.assertEqual((node_spans["n2"].rows_in, node_spans["n2"].rows_out), (49, 22))
+        self.assertEqual((node_spans["n3"].rows_in, node_spans["n3"].rows_out), (22, 1))
+        self.assertEqual((node_spans["n4"].rows_in, node_spans["n4"].rows_out), (49, 1))
+        self.assertIsNotNone(node_spans["n4"].peak_memory)
+        self.assertGreater(node_spans["n4"].wall_time, 0)
+
+        step_spans = profiler.get_step_spans("n3")
+        self.assertEqual([span.step for span in step_spans], ["global_aggregate"])
+        for span in step_spans:
+            self.assertGreaterEqual(span.wall_time, span.self_wall_time)
+
+        messages = [audit["message"] for audit in analytics.audit_trail]
+        self.assertIn("  -> eb-filter", "\n".join(messages))
+
+    def test_export(self):
+        profiler = PipelineProfiler(trace_memory=False)
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline())
+        analytics.process(profiler=profiler)
+
+        spans_path = os.path.join(self.spans_directory, "spans.jsonl")
+        profiler.export(spans_path)
+        with open(spans_path) as file:
+            spans = [json.loads(line) for line in file]
+        self.assertEqual(len(spans), len(profiler.spans))
+        self.assertEqual(spans[0]["kind"], "node")
+        self.assertIsNone(spans[0]["peak_memory"])
+        self.assertTrue(all("self_cpu_time" in span for span in spans))
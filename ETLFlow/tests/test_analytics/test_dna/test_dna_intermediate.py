@@ -0,0 +1,70 @@
+import unittest
+from unittest import mock
+from datetime import date, datetime
+from decimal import Decimal
+from frictionless import Schema
+from frictionless.resources import TableResource
+from ebflow.analytics.intermediate import (
+    PICKLE_FORMAT,
+    get_pyarrow,
+    materialize,
+    read_intermediate,
+    write_intermediate,
+)
+from ebflow.analytics.workspace import RunWorkspace
+
+
+class TestDNAIntermediate(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNAIntermediate, self).__init__(*args, **kwargs)
+        self.schema = Schema.from_descriptor(
+            {
+                "fields": [
+                    {"name": "ID", "type": "integer"},
+                    {"name": "AMOUNT", "type": "number"},
+                    {"name": "POSTED", "type": "date"},
+                    {"name": "CREATED", "type": "datetime"},
+                ]
+            }
+        )
+        self.rows = [
+            [1, Decimal("100.10"), date(2024, 1, 31), datetime(2024, 1, 31, 10, 5)],
+            [2, None, None, None],
+            [3, Decimal("0.0001"), date(2024, 2, 29), datetime(2024, 2, 29, 23, 59)],
+        ]
+
+    def check_round_trip(self, expected_format):
+        with RunWorkspace() as workspace:
+            path = workspace.new_path("typed", ".intermediate")
+            file_format = write_intermediate(iter(self.rows), self.schema, path, batch_rows=2)
+            self.assertEqual(file_format, expected_format)
+
+            resource = read_intermediate(path, file_format, self.schema)
+            self.assertEqual(resource.schema.field_names, ["ID", "AMOUNT", "POSTED", "CREATED"])
+            rows = [row.to_list() for row in resource.read_rows()]
+            self.assertEqual(rows, self.rows)
+            # Decimals keep their scale
+            self.assertEqual(str(rows[0][1]), "100.10")
+            # read again, from the start
+            self.assertEqual(len(resource.to_copy().read_rows()), 3)
+
+    def test_typed_round_trip(self):
+        with mock.patch("ebflow.analytics.intermediate.get_pyarrow", return_value=None):
+            self.check_round_trip(PICKLE_FORMAT)
+
+    @unittest.skipUnless(get_pyarrow(), "pyarrow is not installed")
+    def test_arrow_round_trip(self):
+        self.check_round_trip("arrow")
+
+    def test_materialize_keeps_types(self):
+        source = TableResource(path="tests/test_analytics/test_dna/data/dna_test_file.csv")
+        source.infer()
+        with RunWorkspace() as workspace:
+            resource = materialize(source, workspace.new_path())
+            self.assertEqual(
+                [field.type for field in resource.schema.fields],
+                [field.type for field in source.schema.fields],
+            )
+            rows = resource.read_rows()
+            self.assertEqual(len(rows), 49)
+            self.assertEqual(rows[0].to_list(), source.read_rows()[0].to_list())
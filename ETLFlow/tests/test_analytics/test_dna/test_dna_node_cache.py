@@ -0,0 +1,151 @@
+import unittest
+import tempfile
+import shutil
+import time
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+    FilterOperations,
+)
+from ebflow.analytics.node_cache import NodeOutputCache
+import os
+
+
+class TestDNANodeCache(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNANodeCache, self).__init__(*args, **kwargs)
+        self.input_columns = [
+            "EMPLOYEE_ID",
+            "FIRST_NAME",
+            "LAST_NAME",
+            "EMAIL",
+            "PHONE_NUMBER",
+            "HIRE_DATE",
+            "JOB_ID",
+            "SALARY",
+            "COMMISSION_PCT",
+            "MANAGER_ID",
+            "DEPARTMENT_ID",
+            "JOINED_DATE",
+        ]
+
+    def setUp(self):
+        self.cache_directory = tempfile.mkdtemp()
+
+    def tearDown(self):
+        shutil.rmtree(self.cache_directory, ignore_errors=True)
+
+    def get_pipeline(self, output_path: str, department: str = "50"):
+        return AnalyticsPipeline(
+            nodes=[
+                Node(
+                    id="n1",
+                    data=NodeData(
+                        type="extract",
+                        file_name="dna_test_file.csv",
+                        file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                        ingestion="ingestion",
+                        cdm_file="cdm_file",
+                    ),
+                ),
+                Node(
+                    id="n2",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="filter",
+                        operation_value=department,
+                        operation_formula=FilterOperations(title="Equal to", value="=="),
+                        column_name="DEPARTMENT_ID",
+                        input_columns=self.input_columns,
+                        output_columns=self.input_columns,
+                    ),
+                ),
+                Node(
+                    id="n3",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="sum",
+                        column_name="SALARY",
+                        input_columns=self.input_columns,
+                        output_columns=["sum_SALARY"],
+                    ),
+                ),
+                Node(
+                    id="n4",
+                    data=NodeData(
+                        type="load",
+                        file_name=output_path.split("/")[-1],
+                        file_path=output_path,
+                    ),
+                ),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n2", target="n3"),
+                Edge(id="e3", source="n3", target="n4"),
+            ],
+        )
+
+    def read_output(self, output_path: str):
+        output_resource = TableResource(path=output_path)
+        output_resource.infer()
+        return output_resource.read_rows()
+
+    def test_rerun_served_from_cache(self):
+        output_path = "tests/test_analytics/test_dna/data/temp/cached_sum.csv"
+        cache = NodeOutputCache(self.cache_directory)
+
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline(output_path))
+        analytics.process(cache=cache)
+        self.assertEqual(self.read_output(output_path), [{"sum_SALARY": 83100}])
+        self.assertEqual(analytics.cached_nodes, set())
+        os.remove(output_path)
+
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline(output_path))
+        analytics.process(cache=cache)
+        self.assertEqual(analytics.cached_nodes, {"n1", "n2", "n3"})
+        self.assertIsNone(analytics.pipeline.nodes[0].resource)
+        self.assertEqual(self.read_output(output_path), [{"sum_SALARY": 83100}])
+        messages = [audit["message"] for audit in analytics.audit_trail]
+        self.assertIn("Output unchanged, served from cache", messages)
+        self.assertTrue(all(node.processed for node in analytics.pipeline.nodes))
+
+        os.remove(output_path)
+
+    def test_changed_node_recomputed(self):
+        output_path = "tests/test_analytics/test_dna/data/temp/cached_changed.csv"
+        cache = NodeOutputCache(self.cache_directory)
+
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline(output_path))
+        analytics.process(cache=cache)
+        first = analytics.fingerprints
+
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline(output_path, "60"))
+        analytics.process(cache=cache)
+        self.assertEqual(analytics.fingerprints["n1"], first["n1"])
+        self.assertNotEqual(analytics.fingerprints["n2"], first["n2"])
+        self.assertNotEqual(analytics.fingerprints["n3"], first["n3"])
+        self.assertEqual(analytics.cached_nodes, set())
+        self.assertEqual(self.read_output(output_path), [{"sum_SALARY": 28800}])
+
+        os.remove(output_path)
+
+    def test_lru_eviction(self):
+        cache = NodeOutputCache(self.cache_directory, max_bytes=10)
+        for fingerprint in ["a", "b", "c"]:
+            temp_path = cache.reserve("csv")
+            with open(temp_path, "w") as file:
+                file.write("x" * 4)
+            cache.commit(temp_path, fingerprint, "csv")
+            if fingerprint == "b":
+                # touch "a" so that "b" becomes the least recently used entry
+                time.sleep(0.01)
+                self.assertIsNotNone(cache.get("a", "csv"))
+
+        self.assertIsNotNone(cache.get("a", "csv"))
+        self.assertIsNone(cache.get("b", "csv"))
+        self.assertIsNotNone(cache.get("c", "csv"))
@@ -0,0 +1,133 @@
+import unittest
+import os
+from decimal import Decimal
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+)
+from ebflow.analytics.duplicates import get_key_digest
+from ebflow.analytics.joins import BloomFilter, flag_overlaps
+
+
+class TestDNAOverlapFlags(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNAOverlapFlags, self).__init__(*args, **kwargs)
+        self.output_path = "tests/test_analytics/test_dna/data/temp/overlap_flags.csv"
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def get_flags(self, left, right, *key_indexes, **options):
+        return [
+            (found, matches)
+            for _, found, matches in flag_overlaps(
+                iter(left), lambda: iter(right), *key_indexes, **options
+            )
+        ]
+
+    def test_whole_rows(self):
+        left = [["ABC", 123], ["DEF", 456]]
+        right = [["ABC", 123], ["DEF", 999]]
+        self.assertEqual(
+            self.get_flags(left, right), [(True, None), (False, None)]
+        )
+
+    def test_key_columns_and_counts(self):
+        left = [["ABC", 1], ["DEF", 2], ["GHI", 3]]
+        right = [[10, "ABC"], [11, "ABC"], [12, "DEF"]]
+        self.assertEqual(
+            self.get_flags(left, right, [0], [1], count_matches=True),
+            [(True, 2), (True, 1), (False, 0)],
+        )
+
+    def test_mixed_numeric_representations(self):
+        # keys match as with ==, whatever the type of the numbers
+        left = [[1], [Decimal("1.00")], ["1"], [Decimal("-12.50")], [0.1], [None]]
+        right = [[Decimal("1.0")], [-12.5], [Decimal("0.1")], [None]]
+        self.assertEqual(
+            [found for found, _ in self.get_flags(left, right)],
+            [True, True, False, True, False, True],
+        )
+        self.assertEqual(
+            [found for found, _ in self.get_flags(left, right, max_keys=0)][:4],
+            [True, True, False, True],
+        )
+
+    def test_bloom_filter_beyond_max_keys(self):
+        right = [[idx] for idx in range(1000)]
+        left = [[idx] for idx in range(0, 2000, 2)]
+        flags = self.get_flags(left, right, max_keys=10)
+        # no false negatives, few false positives
+        self.assertTrue(all(found for found, _ in flags[:500]))
+        self.assertLess(sum(found for found, _ in flags[500:]), 10)
+
+        bloom = BloomFilter(100)
+        bloom.add(get_key_digest(["ABC"]))
+        self.assertIn(get_key_digest(["ABC"]), bloom)
+        self.assertNotIn(get_key_digest(["DEF"]), bloom)
+
+    def test_overlap_on_matching_columns(self):
+        nodes = [
+            Node(
+                id=f"n{idx}",
+                data=NodeData(
+                    type="extract",
+                    label=label,
+                    file_name=file_name,
+                    file_path=f"tests/test_analytics/test_dna/data/{file_name}",
+                    ingestion="ingestion",
+                    cdm_file="cdm_file",
+                ),
+            )
+            for idx, label, file_name in [
+                (1, "A", "overlap_first.csv"),
+                (2, "B", "overlap_second.csv"),
+            ]
+        ]
+        nodes.append(
+            Node(
+                id="n3",
+                data=NodeData(
+                    type="transform",
+                    label="C",
+                    operation_name="overlap",
+                    matching_columns=["ACCOUNT_NAME"],
+                    match_count=True,
+                    input_columns=["ACCOUNT_NAME", "ACCOUNT_NO", "BALANCE"],
+                    datasource=["n1", "n2"],
+                ),
+            )
+        )
+        nodes.append(
+            Node(
+                id="n4",
+                data=NodeData(
+                    type="load",
+                    label="D",
+                    file_name=self.output_path.split("/")[-1],
+                    file_path=self.output_path,
+                ),
+            )
+        )
+        edges = [
+            Edge(id="e1", source="n1", target="n3"),
+            Edge(id="e2", source="n2", target="n3"),
+            Edge(id="e3", source="n3", target="n4"),
+        ]
+        analytics = DataAndAnalytics(
+            pipeline=AnalyticsPipeline(nodes=nodes, edges=edges)
+        )
+        analytics.process()
+
+        output_resource = TableResource(path=self.output_path)
+        output_resource.infer()
+        rows = output_resource.read_rows()
+        self.assertEqual(
+            [(row["A_ACCOUNT_NAME"], row["overlap"], row["overlap_count"]) for row in rows],
+            [("ABC", "Y", 1), ("DEF", "N", 0), ("GHI", "N", 0), ("AAA", "N", 0)],
+        )
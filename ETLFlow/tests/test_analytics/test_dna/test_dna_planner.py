@@ -0,0 +1,160 @@
+import unittest
+from ebflow.analytics.analytics import DataAndAnalytics, PipelineState
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+)
+from ebflow.analytics.aggregates import DEFAULT_MAX_GROUPS
+from ebflow.analytics.planner import estimate_rows, get_operation_passes
+import os
+
+
+class TestDNAPlanner(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNAPlanner, self).__init__(*args, **kwargs)
+        self.input_columns = [
+            "EMPLOYEE_ID",
+            "FIRST_NAME",
+            "LAST_NAME",
+            "EMAIL",
+            "PHONE_NUMBER",
+            "HIRE_DATE",
+            "JOB_ID",
+            "SALARY",
+            "COMMISSION_PCT",
+            "MANAGER_ID",
+            "DEPARTMENT_ID",
+            "JOINED_DATE",
+        ]
+        self.sum_output = "tests/test_analytics/test_dna/data/temp/planner_sum.csv"
+        self.overlap_output = "tests/test_analytics/test_dna/data/temp/planner_overlap.csv"
+
+    def get_pipeline(self):
+        return AnalyticsPipeline(
+            nodes=[
+                Node(
+                    id="n1",
+                    data=NodeData(
+                        type="extract",
+                        file_name="dna_test_file.csv",
+                        file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                        ingestion="ingestion",
+                        cdm_file="cdm_file",
+                    ),
+                ),
+                Node(
+                    id="n2",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="sum",
+                        column_name="SALARY",
+                        input_columns=self.input_columns,
+                        output_columns=["sum_SALARY"],
+                    ),
+                ),
+                Node(
+                    id="n3",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="overlap",
+                        datasource=[
+                            "n1",
+                            "tests/test_analytics/test_dna/data/dna_test_file.csv",
+                        ],
+                        input_columns=self.input_columns,
+                    ),
+                ),
+                Node(
+                    id="n4",
+                    data=NodeData(
+                        type="load",
+                        file_name=self.sum_output.split("/")[-1],
+                        file_path=self.sum_output,
+                    ),
+                ),
+                Node(
+                    id="n5",
+                    data=NodeData(
+                        type="load",
+                        file_name=self.overlap_output.split("/")[-1],
+                        file_path=self.overlap_output,
+                    ),
+                ),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n1", target="n3"),
+                Edge(id="e3", source="n2", target="n4"),
+                Edge(id="e4", source="n3", target="n5"),
+            ],
+        )
+
+    def test_explain(self):
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline())
+        plan = analytics.explain()
+
+        extract = plan.get_node("n1")
+        self.assertEqual(extract.estimated_output_rows, 49)
+        self.assertEqual(
+            extract.source_bytes,
+            os.path.getsize("tests/test_analytics/test_dna/data/dna_test_file.csv"),
+        )
+
+        aggregate = plan.get_node("n2")
+        self.assertEqual(aggregate.estimated_input_rows, 49)
+        self.assertEqual(aggregate.estimated_output_rows, 1)
+        self.assertEqual(aggregate.passes, 1)
+        self.assertEqual(aggregate.materializes, [])
+
+        overlap = plan.get_node("n3")
+        self.assertEqual(overlap.estimated_input_rows, 98)
+        # the second table is hashed once instead of scanned for every row
+        self.assertEqual(overlap.passes, 6)
+        self.assertEqual(overlap.estimated_cost, 98 * 6)
+        self.assertEqual(
+            overlap.materializes,
+            ["hash set of the keys of the second table (custom_row_compare)"],
+        )
+
+        self.assertEqual([root.id for root in plan.roots], ["n4", "n5"])
+        # one preprocessing pass in front of the load
+        self.assertEqual(plan.get_node("n4").passes, 2)
+        self.assertIs(plan.get_node("n4").inputs[0], aggregate)
+        self.assertTrue(plan.render().startswith("D load (rows=1 passes=2"))
+
+        # planning does not run anything
+        self.assertFalse(any(node.processed for node in analytics.pipeline.nodes))
+        self.assertFalse(os.path.exists(self.sum_output))
+
+    def test_operation_passes(self):
+        total = NodeData.model_construct(type="transform", operation_name="sum")
+        self.assertEqual(get_operation_passes(total, 49), 1)
+        # the flagged rows are replayed from disk
+        duplicate = NodeData.model_construct(
+            type="transform", operation_name="duplicate", keep="all"
+        )
+        self.assertEqual(get_operation_passes(duplicate, 49), 2)
+        # more rows than groups held in memory, the new groups may spill
+        group_by = NodeData.model_construct(type="transform", operation_name="group_by")
+        self.assertEqual(get_operation_passes(group_by, DEFAULT_MAX_GROUPS), 1)
+        self.assertEqual(get_operation_passes(group_by, DEFAULT_MAX_GROUPS + 1), 2)
+        self.assertEqual(get_operation_passes(group_by, None), 1)
+
+    def test_reject_oversized(self):
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline())
+        with self.assertRaises(ValueError):
+            analytics.process(max_materialized_rows=60)
+        self.assertEqual(analytics.state, PipelineState.failed)
+        self.assertFalse(any(node.processed for node in analytics.pipeline.nodes))
+        messages = [audit["message"] for audit in analytics.audit_trail]
+        self.assertTrue(
+            any(message.startswith("Error: node C would hold") for message in messages)
+        )
+
+    def test_estimate_rows(self):
+        sample = b"a,b\n1,2\n3,4\n5,"
+        self.assertEqual(estimate_rows(len(sample), sample), 3)
+        self.assertEqual(estimate_rows(4 + 4 * 100, sample), 100)
+        self.assertIsNone(estimate_rows(None, None))
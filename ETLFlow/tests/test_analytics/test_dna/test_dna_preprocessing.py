@@ -0,0 +1,50 @@
+import unittest
+from frictionless import Schema, steps, transform
+from frictionless.resources import TableResource
+from ebflow.analytics.custom_steps import (
+    convert_numeric_none_to_zero,
+    normalize_and_zero_fill,
+)
+from ebflow.analytics.dna_step_generation import DNATransformStep
+
+
+class TestDNAPreprocessing(unittest.TestCase):
+    def get_resource(self) -> TableResource:
+        return TableResource(
+            data=[
+                ["ID", "NAME", "AMOUNT", "RATE"],
+                ["1", "a", "10.5", ""],
+                ["", "", "", "0.25"],
+                ["3", "c", None, None],
+            ],
+            schema=Schema.from_descriptor(
+                {
+                    "fields": [
+                        {"name": "ID", "type": "integer"},
+                        {"name": "NAME", "type": "string"},
+                        {"name": "AMOUNT", "type": "number"},
+                        {"name": "RATE", "type": "number"},
+                    ]
+                }
+            ),
+        )
+
+    def test_single_preprocessing_step(self):
+        preprocessing_steps = DNATransformStep.generate_preprocessing_steps()
+        self.assertEqual(
+            [step.type for step in preprocessing_steps], ["normalize-and-zero-fill"]
+        )
+
+    def test_same_rows_as_separate_steps(self):
+        fused = transform(self.get_resource(), steps=[normalize_and_zero_fill()])
+        separate = transform(
+            self.get_resource(),
+            steps=[steps.table_normalize(), convert_numeric_none_to_zero()],
+        )
+        rows = [row.to_list() for row in fused.read_rows()]
+        self.assertEqual(rows, [row.to_list() for row in separate.read_rows()])
+        self.assertEqual(fused.schema.field_names, ["ID", "NAME", "AMOUNT", "RATE"])
+        # numeric empty cells are 0, other empty cells stay empty
+        self.assertEqual(rows[1][0], 0)
+        self.assertIsNone(rows[1][1])
+        self.assertEqual(rows[2][2:], [0, 0])
@@ -0,0 +1,271 @@
+import unittest
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+    FilterOperations,
+)
+from ebflow.analytics.pipeline_graph import PipelineGraph
+import os
+
+
+class TestDNAScheduler(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNAScheduler, self).__init__(*args, **kwargs)
+        self.input_columns = [
+            "EMPLOYEE_ID",
+            "FIRST_NAME",
+            "LAST_NAME",
+            "EMAIL",
+            "PHONE_NUMBER",
+            "HIRE_DATE",
+            "JOB_ID",
+            "SALARY",
+            "COMMISSION_PCT",
+            "MANAGER_ID",
+            "DEPARTMENT_ID",
+            "JOINED_DATE",
+        ]
+
+    def get_extract_node(self, id: str) -> Node:
+        return Node(
+            id=id,
+            data=NodeData(
+                type="extract",
+                file_name="dna_test_file.csv",
+                file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                ingestion="ingestion",
+                cdm_file="cdm_file",
+            ),
+        )
+
+    def get_load_node(self, id: str, output_path: str) -> Node:
+        return Node(
+            id=id,
+            data=NodeData(
+                type="load",
+                file_name=output_path.split("/")[-1],
+                file_path=output_path,
+            ),
+        )
+
+    def get_filter_node(self, id: str) -> Node:
+        return Node(
+            id=id,
+            data=NodeData(
+                type="transform",
+                operation_name="filter",
+                operation_value="50",
+                operation_formula=FilterOperations(title="Equal to", value="=="),
+                column_name="DEPARTMENT_ID",
+                input_columns=self.input_columns,
+                output_columns=self.input_columns,
+            ),
+        )
+
+    def get_sum_node(self, id: str) -> Node:
+        return Node(
+            id=id,
+            data=NodeData(
+                type="transform",
+                operation_name="sum",
+                column_name="SALARY",
+                input_columns=self.input_columns,
+                output_columns=["sum_SALARY"],
+            ),
+        )
+
+    def test_topological_order_ignores_edge_order(self):
+        pipeline = AnalyticsPipeline(
+            nodes=[
+                self.get_load_node("n4", "path/to/output.csv"),
+                self.get_sum_node("n3"),
+                self.get_filter_node("n2"),
+                self.get_extract_node("n1"),
+            ],
+            edges=[
+                Edge(id="e3", source="n3", target="n4"),
+                Edge(id="e2", source="n2", target="n3"),
+                Edge(id="e1", source="n1", target="n2"),
+            ],
+        )
+        graph = PipelineGraph(pipeline)
+
+        order = [node.id for node in graph.topological_order()]
+        self.assertEqual(order, ["n1", "n2", "n3", "n4"])
+        self.assertEqual([node.id for node in graph.get_inputs("n3")], ["n2"])
+        self.assertEqual([node.id for node in graph.get_outputs("n1")], ["n2"])
+
+    def test_topological_order_cycle(self):
+        pipeline = AnalyticsPipeline(
+            nodes=[self.get_filter_node("n1"), self.get_sum_node("n2")],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n2", target="n1"),
+            ],
+        )
+        with self.assertRaises(ValueError):
+            PipelineGraph(pipeline).topological_order()
+
+    def test_chain_with_reversed_edges(self):
+        output_path = "tests/test_analytics/test_dna/data/temp/scheduler_chain.csv"
+        pipeline = AnalyticsPipeline(
+            nodes=[
+                self.get_extract_node("n1"),
+                self.get_filter_node("n2"),
+                self.get_sum_node("n3"),
+                self.get_load_node("n4", output_path),
+            ],
+            edges=[
+                Edge(id="e3", source="n3", target="n4"),
+                Edge(id="e2", source="n2", target="n3"),
+                Edge(id="e1", source="n1", target="n2"),
+            ],
+        )
+
+        analytics = DataAndAnalytics(pipeline=pipeline)
+        analytics.process()
+        self.assertTrue(os.path.exists(output_path))
+
+        output_resource = TableResource(path=output_path)
+        output_resource.infer()
+        self.assertEqual(output_resource.read_rows(), [{"sum_SALARY": 83100}])
+        self.assertTrue(all(node.processed for node in pipeline.nodes))
+
+        os.remove(output_path)
+
+    def test_extract_feeding_two_branches(self):
+        filter_path = "tests/test_analytics/test_dna/data/temp/scheduler_filter.csv"
+        sum_path = "tests/test_analytics/test_dna/data/temp/scheduler_sum.csv"
+        pipeline = AnalyticsPipeline(
+            nodes=[
+                self.get_extract_node("n1"),
+                self.get_filter_node("n2"),
+                self.get_sum_node("n3"),
+                self.get_load_node("n4", filter_path),
+                self.get_load_node("n5", sum_path),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n2", target="n4"),
+                Edge(id="e3", source="n1", target="n3"),
+                Edge(id="e4", source="n3", target="n5"),
+            ],
+        )
+
+        analytics = DataAndAnalytics(pipeline=pipeline)
+        analytics.process()
+
+        filter_resource = TableResource(path=filter_path)
+        filter_resource.infer()
+        self.assertEqual(len(filter_resource.read_rows()), 22)
+
+        sum_resource = TableResource(path=sum_path)
+        sum_resource.infer()
+        self.assertEqual(sum_resource.read_rows(), [{"sum_SALARY": 306616}])
+
+        os.remove(filter_path)
+        os.remove(sum_path)
+
+    def test_transform_with_two_inputs(self):
+        pipeline = AnalyticsPipeline(
+            nodes=[
+                self.get_extract_node("n1"),
+                self.get_extract_node("n2"),
+                self.get_sum_node("n3"),
+                self.get_load_node("n4", "path/to/output.csv"),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n3"),
+                Edge(id="e2", source="n2", target="n3"),
+                Edge(id="e3", source="n3", target="n4"),
+            ],
+        )
+
+        analytics = DataAndAnalytics(pipeline=pipeline)
+        with self.assertRaises(ValueError):
+            analytics.process()
+        self.assertFalse(any(node.processed for node in pipeline.nodes))
+
+    def get_two_branch_pipeline(self, filter_path: str, sum_path: str):
+        return AnalyticsPipeline(
+            nodes=[
+                self.get_extract_node("n1"),
+                self.get_filter_node("n2"),
+                self.get_load_node("n3", filter_path),
+                self.get_extract_node("n4"),
+                self.get_sum_node("n5"),
+                self.get_load_node("n6", sum_path),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n2", target="n3"),
+                Edge(id="e3", source="n4", target="n5"),
+                Edge(id="e4", source="n5", target="n6"),
+            ],
+        )
+
+    def check_two_branch_outputs(self, filter_path: str, sum_path: str):
+        filter_resource = TableResource(path=filter_path)
+        filter_resource.infer()
+        self.assertEqual(len(filter_resource.read_rows()), 22)
+
+        sum_resource = TableResource(path=sum_path)
+        sum_resource.infer()
+        self.assertEqual(sum_resource.read_rows(), [{"sum_SALARY": 306616}])
+
+        os.remove(filter_path)
+        os.remove(sum_path)
+
+    def test_components(self):
+        pipeline = self.get_two_branch_pipeline("path/to/a.csv", "path/to/b.csv")
+        graph = PipelineGraph(pipeline)
+
+        self.assertEqual(graph.components(), [["n1", "n2", "n3"], ["n4", "n5", "n6"]])
+        sub_pipeline = graph.subpipeline(["n4", "n5", "n6"])
+        self.assertEqual([edge.id for edge in sub_pipeline.edges], ["e3", "e4"])
+
+    def test_parallel_threads(self):
+        filter_path = "tests/test_analytics/test_dna/data/temp/parallel_filter.csv"
+        sum_path = "tests/test_analytics/test_dna/data/temp/parallel_sum.csv"
+        pipeline = self.get_two_branch_pipeline(filter_path, sum_path)
+
+        analytics = DataAndAnalytics(pipeline=pipeline)
+        analytics.process(max_workers=4, concurrency_limits={"load": 1})
+
+        self.assertTrue(all(node.processed for node in pipeline.nodes))
+        self.assertIn("Time taken:", analytics.audit_trail[-1]["message"])
+        self.check_two_branch_outputs(filter_path, sum_path)
+
+    def test_parallel_processes(self):
+        filter_path = "tests/test_analytics/test_dna/data/temp/process_filter.csv"
+        sum_path = "tests/test_analytics/test_dna/data/temp/process_sum.csv"
+        pipeline = self.get_two_branch_pipeline(filter_path, sum_path)
+
+        analytics = DataAndAnalytics(pipeline=pipeline)
+        analytics.process(max_workers=2, executor="process")
+
+        self.assertTrue(all(node.processed for node in pipeline.nodes))
+        self.check_two_branch_outputs(filter_path, sum_path)
+
+    def test_parallel_branch_failure(self):
+        filter_path = "tests/test_analytics/test_dna/data/temp/failed_filter.csv"
+        sum_path = "tests/test_analytics/test_dna/data/temp/failed_sum.csv"
+        pipeline = self.get_two_branch_pipeline(filter_path, sum_path)
+        pipeline.nodes[4].data.column_name.value = "FIRST_NAME"
+
+        for executor in ["thread", "process"]:
+            analytics = DataAndAnalytics(pipeline=pipeline.model_copy(deep=True))
+            with self.assertRaises(ValueError):
+                analytics.process(max_workers=2, executor=executor)
+            self.assertFalse(os.path.exists(sum_path))
+            self.assertEqual(
+                "EBFlow Analytics | Data & Analytics pipeline process Failed",
+                analytics.audit_trail[-1]["message"],
+            )
+
+        if os.path.exists(filter_path):
+            os.remove(filter_path)
@@ -0,0 +1,163 @@
+import unittest
+import os
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics, PipelineState
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    FilterOperations,
+    Node,
+    NodeData,
+)
+
+
+class TestDNASchemaPropagation(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNASchemaPropagation, self).__init__(*args, **kwargs)
+        self.output_path = "tests/test_analytics/test_dna/data/temp/schema_propagation.csv"
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def get_extract_node(self, id: str, file_name: str = "dna_test_file.csv") -> Node:
+        return Node(
+            id=id,
+            data=NodeData(
+                type="extract",
+                file_name=file_name,
+                file_path=f"tests/test_analytics/test_dna/data/{file_name}",
+                ingestion="ingestion",
+                cdm_file="cdm_file",
+            ),
+        )
+
+    def get_load_node(self, id: str) -> Node:
+        return Node(
+            id=id,
+            data=NodeData(
+                type="load",
+                file_name=self.output_path.split("/")[-1],
+                file_path=self.output_path,
+            ),
+        )
+
+    def get_chain(self, *transforms: NodeData) -> AnalyticsPipeline:
+        nodes = [self.get_extract_node("n1")]
+        nodes += [
+            Node(id=f"n{idx + 2}", data=data) for idx, data in enumerate(transforms)
+        ]
+        nodes.append(self.get_load_node(f"n{len(nodes) + 1}"))
+        edges = [
+            Edge(id=f"e{idx}", source=source.id, target=target.id)
+            for idx, (source, target) in enumerate(zip(nodes, nodes[1:]))
+        ]
+        return AnalyticsPipeline(nodes=nodes, edges=edges)
+
+    def test_derived_schemas_match_output(self):
+        pipeline = self.get_chain(
+            NodeData(
+                type="transform",
+                operation_name="nwd",
+                column_name="JOINED_DATE",
+                weekdays=[5, 6],
+                input_columns=["JOINED_DATE"],
+                output_columns=["nwd_JOINED_DATE"],
+            ),
+            NodeData(
+                type="transform",
+                operation_name="group_by",
+                group_by=["DEPARTMENT_ID"],
+                aggregation_type="sum",
+                column_name="SALARY",
+                input_columns=["DEPARTMENT_ID", "SALARY"],
+                output_columns=["DEPARTMENT_ID", "sum_SALARY"],
+            ),
+        )
+        analytics = DataAndAnalytics(pipeline=pipeline)
+        plan = analytics.explain()
+        fields = {node.label: node.fields for node in plan.nodes}
+        self.assertIn("nwd_JOINED_DATE", fields["B"])
+        self.assertEqual(fields["C"], ["DEPARTMENT_ID", "sum_SALARY"])
+
+        analytics = DataAndAnalytics(pipeline=pipeline)
+        analytics.process()
+        output_resource = TableResource(path=self.output_path)
+        output_resource.infer()
+        self.assertEqual(
+            output_resource.schema.field_names,
+            analytics.schemas[pipeline.nodes[2].id].field_names,
+        )
+        # the extract reads its source with the schema inferred up front
+        extract_node = pipeline.nodes[0]
+        self.assertEqual(
+            extract_node.resource.schema.field_names,
+            analytics.schemas[extract_node.id].field_names,
+        )
+
+    def test_missing_column_fails_before_reading(self):
+        pipeline = self.get_chain(
+            NodeData(
+                type="transform",
+                operation_name="sum",
+                column_name="SALARY",
+                input_columns=["SALARY"],
+                output_columns=["sum_SALARY"],
+            ),
+            NodeData(
+                type="transform",
+                operation_name="filter",
+                column_name="BONUS",
+                operation_formula=FilterOperations(title="Equal to", value="=="),
+                operation_value="10",
+                input_columns=["BONUS"],
+                output_columns=["BONUS"],
+            ),
+        )
+        analytics = DataAndAnalytics(pipeline=pipeline)
+        with self.assertRaises(ValueError) as context:
+            analytics.process()
+        self.assertEqual(str(context.exception), "Invalid pipeline, schema mismatch")
+        self.assertEqual(analytics.state, PipelineState.failed)
+        self.assertFalse(os.path.exists(self.output_path))
+        messages = [entry["message"] for entry in analytics.audit_trail]
+        self.assertIn("Error: Column BONUS not found in the input of node C", messages)
+        # no node was processed
+        self.assertFalse(any(node.processed for node in pipeline.nodes))
+
+    def test_compare_schema(self):
+        nodes = [
+            self.get_extract_node("n1", "compare_set_1.csv"),
+            self.get_extract_node("n2", "compare_set_2.csv"),
+            Node(
+                id="n3",
+                data=NodeData(
+                    type="transform",
+                    operation_name="overlap",
+                    matching_columns=["ID", "CATEGORY"],
+                    match_count=True,
+                    input_columns=["ID", "CATEGORY"],
+                    output_columns=["overlap"],
+                    datasource=["n1", "n2"],
+                ),
+            ),
+            self.get_load_node("n4"),
+        ]
+        edges = [
+            Edge(id="e1", source="n1", target="n3"),
+            Edge(id="e2", source="n2", target="n3"),
+            Edge(id="e3", source="n3", target="n4"),
+        ]
+        plan = DataAndAnalytics(
+            pipeline=AnalyticsPipeline(nodes=nodes, edges=edges)
+        ).explain()
+        self.assertEqual(
+            plan.nodes[2].fields,
+            ["A_ID", "A_CATEGORY", "A_AMOUNT", "A_TOP_LIST", "overlap", "overlap_count"],
+        )
+
+        nodes[2].data.matching_columns = ["ID", "REGION"]
+        with self.assertRaisesRegex(ValueError, "Column A_REGION not found"):
+            DataAndAnalytics(
+                pipeline=AnalyticsPipeline(nodes=nodes, edges=edges)
+            ).explain()
@@ -0,0 +1,153 @@
+import unittest
+from frictionless import steps
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+    FilterOperations,
+    MultipleCalculationData,
+)
+from ebflow.analytics.custom_steps import eb_filter, fused_row_steps, identify_duplicate
+from ebflow.analytics.instrumentation import PipelineProfiler
+from ebflow.analytics.step_optimizer import fuse_row_steps, push_down_filters
+import os
+
+
+class TestDNAStepOptimizer(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNAStepOptimizer, self).__init__(*args, **kwargs)
+        self.input_columns = [
+            "EMPLOYEE_ID",
+            "FIRST_NAME",
+            "LAST_NAME",
+            "EMAIL",
+            "PHONE_NUMBER",
+            "HIRE_DATE",
+            "JOB_ID",
+            "SALARY",
+            "COMMISSION_PCT",
+            "MANAGER_ID",
+            "DEPARTMENT_ID",
+            "JOINED_DATE",
+        ]
+        self.output_path = "tests/test_analytics/test_dna/data/temp/optimized_filter.csv"
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def get_pipeline(self):
+        calculated_columns = self.input_columns + ["maths_SALARY"]
+        return AnalyticsPipeline(
+            nodes=[
+                Node(
+                    id="n1",
+                    data=NodeData(
+                        type="extract",
+                        file_name="dna_test_file.csv",
+                        file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                        ingestion="ingestion",
+                        cdm_file="cdm_file",
+                    ),
+                ),
+                Node(
+                    id="n2",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="multiple_calculation",
+                        unique=True,
+                        data=MultipleCalculationData(
+                            expression="A*2", column={"A": "SALARY"}
+                        ),
+                        input_columns=self.input_columns,
+                        output_columns=calculated_columns,
+                    ),
+                ),
+                Node(
+                    id="n3",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="filter",
+                        operation_value="50",
+                        operation_formula=FilterOperations(title="Equal to", value="=="),
+                        column_name="DEPARTMENT_ID",
+                        input_columns=calculated_columns,
+                        output_columns=calculated_columns,
+                    ),
+                ),
+                Node(
+                    id="n4",
+                    data=NodeData(
+                        type="load",
+                        file_name=self.output_path.split("/")[-1],
+                        file_path=self.output_path,
+                    ),
+                ),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n2", target="n3"),
+                Edge(id="e3", source="n3", target="n4"),
+            ],
+        )
+
+    def read_output(self):
+        with TableResource(path=self.output_path) as resource:
+            return resource.read_rows()
+
+    def test_output_unchanged(self):
+        DataAndAnalytics(pipeline=self.get_pipeline()).process(optimize=False)
+        expected = self.read_output()
+        DataAndAnalytics(pipeline=self.get_pipeline()).process()
+        rows = self.read_output()
+
+        self.assertEqual(len(rows), 22)
+        self.assertEqual([row.to_dict() for row in rows], [row.to_dict() for row in expected])
+        self.assertEqual(rows[0]["maths_SALARY"], rows[0]["SALARY"] * 2)
+
+    def test_push_down_filters(self):
+        salary = steps.field_add(name="double_SALARY", formula="SALARY * 2")
+        department = eb_filter(column_name="DEPARTMENT_ID", operation="==", value=50)
+        self.assertEqual(
+            push_down_filters([salary, department]), [department, salary]
+        )
+
+        # a filter on the computed column stays after it
+        on_salary = eb_filter(column_name="double_SALARY", operation=">", value=100)
+        self.assertEqual(push_down_filters([salary, on_salary]), [salary, on_salary])
+
+        # duplicates are identified over all rows, so filters do not pass them
+        duplicate = steps.field_add(name="duplicate", function=identify_duplicate())
+        self.assertEqual(
+            push_down_filters([duplicate, department]), [duplicate, department]
+        )
+
+    def test_fuse_row_steps(self):
+        row_steps = [
+            steps.field_add(name="double_SALARY", formula="SALARY * 2"),
+            eb_filter(column_name="DEPARTMENT_ID", operation="==", value=50),
+            steps.field_remove(names=["EMAIL"]),
+        ]
+        aggregate = steps.table_aggregate(
+            group_name="DEPARTMENT_ID", aggregation={"count": ("EMAIL", len)}
+        )
+        fused = fuse_row_steps(row_steps + [aggregate])
+        self.assertEqual(len(fused), 2)
+        self.assertIsInstance(fused[0], fused_row_steps)
+        self.assertEqual(fused[0].steps, row_steps)
+        self.assertIs(fused[1], aggregate)
+
+        # a single row-wise step is left as it is
+        self.assertEqual(fuse_row_steps(row_steps[:1]), row_steps[:1])
+
+    def test_fused_span(self):
+        profiler = PipelineProfiler(trace_memory=False)
+        DataAndAnalytics(pipeline=self.get_pipeline()).process(profiler=profiler)
+
+        step_names = [span.step for span in profiler.spans if span.kind == "step"]
+        self.assertTrue(any(name.startswith("fused(") for name in step_names))
+        self.assertNotIn("eb-filter", step_names)
+        self.assertEqual(len(self.read_output()), 22)
@@ -0,0 +1,247 @@
+import unittest
+from unittest import mock
+from datetime import date, datetime, time, timedelta, timezone
+from frictionless import Schema, transform
+from frictionless.resources import TableResource
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+)
+from ebflow.analytics.custom_steps import (
+    backdating,
+    non_working_days,
+    outside_working_hours,
+    temporal_flags,
+)
+from ebflow.analytics.expressions import get_numpy
+from ebflow.analytics.step_optimizer import merge_temporal_flags, optimize_steps
+from ebflow.analytics.temporal import DateBatch, DateParser
+import os
+
+
+class TestDNATemporalFlags(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNATemporalFlags, self).__init__(*args, **kwargs)
+        self.output_path = "tests/test_analytics/test_dna/data/temp/temporal_flags.csv"
+
+    def tearDown(self):
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def get_flags(self):
+        return {
+            "nwd_entered": non_working_days(
+                custom_dates=["2024-01-01"], weekdays=[5, 6], date_column="entered"
+            ),
+            "owh_entered": outside_working_hours(
+                start_time="09:00", end_time="17:00", date_column="entered"
+            ),
+            "bkd_entered": backdating(
+                date_column="entered", bkd_column="effective", is_bkd_custom=False
+            ),
+        }
+
+    def test_single_pass_with_shared_parser(self):
+        resource = TableResource(
+            data=[
+                ["entered", "effective"],
+                ["2024-01-01T10:00:00", "2023-12-30"],
+                ["2024-01-06T18:30:00", "2024-01-06"],
+                ["2024-01-01T10:00:00", "2023-12-30"],
+                ["2024-01-10T08:00:00", None],
+            ],
+            schema=Schema.from_descriptor(
+                {
+                    "fields": [
+                        {"name": "entered", "type": "string"},
+                        {"name": "effective", "type": "string"},
+                    ]
+                }
+            ),
+        )
+        step = temporal_flags(flags=self.get_flags())
+        target = transform(resource, steps=[step])
+        self.assertEqual(
+            target.schema.field_names,
+            ["entered", "effective", "nwd_entered", "owh_entered", "bkd_entered"],
+        )
+        rows = [row.to_list()[2:] for row in target.read_rows()]
+        self.assertEqual(
+            rows,
+            [["Y", "N", -2], ["Y", "Y", 0], ["Y", "N", -2], ["N", "Y", 0]],
+        )
+        # three flags read every date, each distinct string is parsed once
+        parser = step.flags["nwd_entered"].parse
+        self.assertIs(parser, step.flags["bkd_entered"].parse)
+        self.assertEqual(parser.parse_string.cache_info().misses, 5)
+
+    def test_parser(self):
+        parser = DateParser(max_size=2)
+        self.assertEqual(parser("2024-01-06"), datetime(2024, 1, 6))
+        self.assertEqual(parser(date(2024, 1, 6)), date(2024, 1, 6))
+        self.assertIsNone(parser(" "))
+        self.assertEqual(parser.parse_string.cache_info().currsize, 2)
+        with self.assertRaises(ValueError):
+            outside_working_hours(start_time="9am", end_time="17:00", date_column="x")
+
+    def test_merge(self):
+        flags = self.get_flags()
+        steps = [temporal_flags(flags={name: flag}) for name, flag in flags.items()]
+        merged = merge_temporal_flags(steps)
+        self.assertEqual(len(merged), 1)
+        self.assertEqual(list(merged[0].flags), list(flags))
+
+        # a flag reading a flag added before it is computed after it
+        steps.append(
+            temporal_flags(
+                flags={
+                    "nwd_bkd": non_working_days(
+                        custom_dates=[], weekdays=[6], date_column="bkd_entered"
+                    )
+                }
+            )
+        )
+        self.assertEqual(len(merge_temporal_flags(steps)), 2)
+        # computed on arrays with NumPy, so not fused into a row by row pass
+        if get_numpy() is not None:
+            self.assertEqual(
+                [step.type for step in optimize_steps(steps)],
+                ["temporal-flags", "temporal-flags"],
+            )
+        with mock.patch("ebflow.analytics.custom_steps.get_numpy", return_value=None):
+            self.assertEqual(optimize_steps(steps)[0].type, "fused_row_steps")
+
+    @unittest.skipIf(get_numpy() is None, "NumPy is not installed")
+    def test_vectorized_matches_rows(self):
+        india = timezone(timedelta(hours=5, minutes=30))
+        entered = [
+            datetime(2024, 1, 6, 8, 59, 59),
+            datetime(2024, 1, 10, 23, 0, tzinfo=india),
+            date(2024, 1, 1),
+            time(18, 30),
+            "2024-01-08T12:00:00",
+            "2024-01-08T12:00:00",
+            None,
+            datetime(1969, 12, 28, 10, 0),
+        ]
+        effective = [
+            "2023-12-30",
+            None,
+            date(2024, 1, 3),
+            None,
+            "2024-01-01",
+            "",
+            None,
+            date(1970, 1, 1),
+        ]
+        columns = {"entered": entered, "effective": effective}
+        flags = self.get_flags()
+        flags["bkd_custom"] = backdating(
+            date_column="entered", bkd_column="2024-01-01", is_bkd_custom=True
+        )
+        batch = DateBatch(get_numpy(), columns, DateParser())
+        for name, flag in flags.items():
+            expected = [
+                flag(dict(entered=value, effective=other))
+                for value, other in zip(entered, effective)
+            ]
+            self.assertEqual(flag.evaluate_batch(batch), expected, name)
+
+        resource = TableResource(
+            data=[["entered", "effective"]] + [list(row) for row in zip(entered, effective)],
+            schema=Schema.from_descriptor(
+                {
+                    "fields": [
+                        {"name": "entered", "type": "any"},
+                        {"name": "effective", "type": "any"},
+                    ]
+                }
+            ),
+        )
+        step = temporal_flags(flags=self.get_flags(), batch_rows=3)
+        target = transform(resource.to_copy(), steps=[step])
+        vectorized = [row.to_list()[2:] for row in target.read_rows()]
+        with mock.patch("ebflow.analytics.custom_steps.get_numpy", return_value=None):
+            step = temporal_flags(flags=self.get_flags(), batch_rows=3)
+            target = transform(resource.to_copy(), steps=[step])
+            self.assertEqual([row.to_list()[2:] for row in target.read_rows()], vectorized)
+
+    def test_journal_pipeline(self):
+        nodes = [
+            Node(
+                id="n1",
+                data=NodeData(
+                    type="extract",
+                    file_name="outside_working_hours.csv",
+                    file_path="tests/test_analytics/test_dna/data/outside_working_hours.csv",
+                    ingestion="ingestion",
+                    cdm_file="cdm_file",
+                ),
+            ),
+            Node(
+                id="n2",
+                data=NodeData(
+                    type="transform",
+                    operation_name="nwd",
+                    column_name="transaction_date",
+                    custom_dates=["2024-01-10"],
+                    input_columns=["transaction_date"],
+                    output_columns=["nwd_transaction_date"],
+                ),
+            ),
+            Node(
+                id="n3",
+                data=NodeData(
+                    type="transform",
+                    operation_name="owh",
+                    column_name="transaction_date",
+                    start_time="09:00",
+                    end_time="17:00",
+                    input_columns=["transaction_date"],
+                    output_columns=["owh_transaction_date"],
+                ),
+            ),
+            Node(
+                id="n4",
+                data=NodeData(
+                    type="transform",
+                    operation_name="bkd",
+                    column_name="transaction_date",
+                    bkd_column="2024-01-01",
+                    is_bkd_custom=True,
+                    input_columns=["transaction_date"],
+                    output_columns=["bkd_transaction_date"],
+                ),
+            ),
+            Node(
+                id="n5",
+                data=NodeData(
+                    type="load",
+                    file_name=self.output_path.split("/")[-1],
+                    file_path=self.output_path,
+                ),
+            ),
+        ]
+        edges = [
+            Edge(id=f"e{idx}", source=f"n{idx}", target=f"n{idx + 1}")
+            for idx in range(1, 5)
+        ]
+        outputs = []
+        for optimize in [True, False]:
+            analytics = DataAndAnalytics(
+                pipeline=AnalyticsPipeline(nodes=nodes, edges=edges)
+            )
+            analytics.process(optimize=optimize)
+            output_resource = TableResource(path=self.output_path)
+            output_resource.infer()
+            outputs.append([row.to_list() for row in output_resource.read_rows()])
+            os.remove(self.output_path)
+
+        self.assertEqual(outputs[0], outputs[1])
+        # a holiday, given as a date, matches the datetime column
+        self.assertEqual([row[2] for row in outputs[0]], ["Y"] * 6)
+        self.assertEqual([row[3] for row in outputs[0]], ["Y", "Y", "Y", "N", "N", "Y"])
+        self.assertEqual([row[4] for row in outputs[0]], [-9] * 6)
@@ -0,0 +1,133 @@
+import unittest
+import os
+import shutil
+from ebflow.analytics.analytics import DataAndAnalytics
+from ebflow.analytics.analytics_schema import (
+    AnalyticsPipeline,
+    Edge,
+    Node,
+    NodeData,
+)
+from ebflow.analytics.fan_out import SpillBuffer
+from ebflow.analytics.node_cache import NodeOutputCache
+from ebflow.analytics.workspace import RunWorkspace
+
+
+class TestDNAWorkspace(unittest.TestCase):
+    def __init__(self, *args, **kwargs):
+        super(TestDNAWorkspace, self).__init__(*args, **kwargs)
+        self.root = "tests/test_analytics/test_dna/data/temp/workspace"
+        self.cache_directory = "tests/test_analytics/test_dna/data/temp/workspace_cache"
+        self.output_path = "tests/test_analytics/test_dna/data/temp/workspace_group_by.csv"
+
+    def tearDown(self):
+        for directory in [self.root, self.cache_directory]:
+            shutil.rmtree(directory, ignore_errors=True)
+        if os.path.exists(self.output_path):
+            os.remove(self.output_path)
+
+    def get_pipeline(self) -> AnalyticsPipeline:
+        return AnalyticsPipeline(
+            nodes=[
+                Node(
+                    id="n1",
+                    data=NodeData(
+                        type="extract",
+                        file_name="dna_test_file.csv",
+                        file_path="tests/test_analytics/test_dna/data/dna_test_file.csv",
+                        ingestion="ingestion",
+                        cdm_file="cdm_file",
+                    ),
+                ),
+                Node(
+                    id="n2",
+                    data=NodeData(
+                        type="transform",
+                        operation_name="group_by",
+                        group_by=["DEPARTMENT_ID"],
+                        aggregation_type="sum",
+                        column_name="SALARY",
+                        input_columns=["DEPARTMENT_ID", "SALARY"],
+                        output_columns=["DEPARTMENT_ID", "sum_SALARY"],
+                    ),
+                ),
+                Node(
+                    id="n3",
+                    data=NodeData(
+                        type="load",
+                        file_name=self.output_path.split("/")[-1],
+                        file_path=self.output_path,
+                    ),
+                ),
+            ],
+            edges=[
+                Edge(id="e1", source="n1", target="n2"),
+                Edge(id="e2", source="n2", target="n3"),
+            ],
+        )
+
+    def test_unique_directories_and_cleanup(self):
+        first = RunWorkspace(root=self.root)
+        second = RunWorkspace(root=self.root)
+        with first, second:
+            self.assertNotEqual(first.directory, second.directory)
+            self.assertTrue(os.path.isdir(first.spill_directory))
+            path = first.new_path("node", ".csv")
+            self.assertNotEqual(path, first.new_path("node", ".csv"))
+            with open(path, "w") as file:
+                file.write("a,b\n")
+            first.track(path)
+            self.assertEqual(first.used_bytes, 4)
+            directory = first.directory
+        self.assertFalse(os.path.exists(directory))
+        self.assertEqual(os.listdir(self.root), [])
+
+    def test_quota(self):
+        with RunWorkspace(root=self.root, quota_bytes=100) as workspace:
+            path = workspace.new_path()
+            with open(path, "w") as file:
+                file.write("x" * 200)
+            with self.assertRaises(ValueError):
+                workspace.track(path)
+            self.assertFalse(os.path.exists(path))
+            self.assertEqual(workspace.used_bytes, 0)
+
+            # process workers share the quota of the run
+            self.assertEqual(workspace.detached(4).quota_bytes, 25)
+            self.assertEqual(workspace.detached().quota_bytes, 100)
+        self.assertIsNone(RunWorkspace().detached(4).quota_bytes)
+
+    def test_spill_files_are_charged(self):
+        with RunWorkspace(root=self.root, quota_bytes=10000) as workspace:
+            spill = SpillBuffer(workspace.spill_directory)
+            for idx in range(10):
+                spill.append([idx, "row"])
+            self.assertGreater(workspace.used_bytes, 0)
+            spill.close()
+            self.assertEqual(workspace.used_bytes, 0)
+            self.assertGreater(workspace.peak_bytes, 0)
+
+            spill = SpillBuffer(workspace.spill_directory)
+            with self.assertRaises(ValueError):
+                for idx in range(10000):
+                    spill.append([idx, "row"])
+            spill.close()
+
+    def test_run_removes_workspace(self):
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline())
+        analytics.process(
+            workspace=RunWorkspace(root=self.root),
+            cache=NodeOutputCache(self.cache_directory),
+        )
+        self.assertTrue(os.path.exists(self.output_path))
+        self.assertEqual(os.listdir(self.root), [])
+
+        # served from the cache, through a copy in the workspace
+        os.remove(self.output_path)
+        analytics = DataAndAnalytics(pipeline=self.get_pipeline())
+        analytics.process(
+            workspace=RunWorkspace(root=self.root),
+            cache=NodeOutputCache(self.cache_directory),
+        )
+        self.assertTrue(os.path.exists(self.output_path))
+        self.assertEqual(os.listdir(self.root), [])
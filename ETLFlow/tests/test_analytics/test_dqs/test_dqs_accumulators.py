@@ -0,0 +1,77 @@
+import unittest
+from unittest import mock
+
+from frictionless import Pipeline, steps
+from frictionless.resources import TableResource
+
+from ebflow.analytics.dqs import dqs
+from ebflow.analytics.dqs.accumulators import (
+    DistinctCount,
+    FieldAny,
+    FieldSum,
+    JournalSequence,
+    RowCount,
+    scan_metrics,
+)
+from ebflow.analytics.dqs.gl_dqs import GLDQS
+
+
+class TestDQSAccumulators(unittest.TestCase):
+    def get_resource(self):
+        resource = TableResource(
+            path="tests/test_analytics/test_dqs/data/dqs_test_data.csv"
+        )
+        resource.infer()
+        resource.schema.set_field_type("amount", "number")
+        resource.schema.set_field_type("localAmount", "number")
+        resource.transform(Pipeline(steps=[steps.table_normalize()]))
+        return resource
+
+    def test_one_scan_for_all_scores(self):
+        gl_dqs = GLDQS(resource=self.get_resource(), entity_type=None, cdm_fields=[])
+        with mock.patch.object(dqs, "scan_metrics", wraps=scan_metrics) as scan:
+            gl_dqs.profile()
+            statistical = gl_dqs.statistical()
+            gl_dqs.business_rule()
+            self.assertEqual(scan.call_count, 1)
+
+            # a metric no score registered is computed in another scan
+            self.assertEqual(
+                gl_dqs.get_unique_value_count(["glAccountNumber", "businessUnitCode"]),
+                6,
+            )
+            self.assertEqual(scan.call_count, 2)
+        self.assertEqual(statistical[0], {"recordCount": 6})
+
+    def test_accumulators(self):
+        resource = TableResource(
+            data=[
+                ["journalId", "account", "amount"],
+                ["1", "A", 10],
+                ["2", None, None],
+                ["", "A", 5],
+                ["5", "B", 0],
+                ["6", "", 1],
+            ]
+        )
+        metrics = scan_metrics(
+            resource,
+            [
+                RowCount(),
+                FieldSum("amount"),
+                FieldSum("amount"),
+                DistinctCount(["account"]),
+                FieldAny("account"),
+                JournalSequence(),
+            ],
+        )
+        self.assertEqual(len(metrics), 5)
+        self.assertEqual(metrics[("count",)], 5)
+        self.assertEqual(metrics[("sum", "amount")], 16)
+        self.assertEqual(metrics[("distinct", ("account",))], 2)
+        self.assertTrue(metrics[("any", "account")])
+        # 5 does not follow 2, the empty id is a null sequence
+        self.assertEqual(metrics[("jid", "journalId")], (False, 1, 1))
+
+        metrics = scan_metrics(resource, [JournalSequence("account")])
+        self.assertEqual(metrics[("jid", "account")], (True, 0, 0))
@@ -0,0 +1,47 @@
+import unittest
+import json
+import os
+import subprocess
+import sys
+
+# seconds allowed for a cold import of the pipeline execution path
+IMPORT_TIME_BUDGET = float(os.environ.get("EBFLOW_IMPORT_TIME_BUDGET", "1.0"))
+
+# only needed for plotting or once a blob is actually read or written
+LAZY_MODULES = ["networkx", "matplotlib", "azure.identity", "azure.storage.blob"]
+
+IMPORT_SCRIPT = """
+import json
+import sys
+import time
+
+start = time.perf_counter()
+import ebflow.analytics.analytics
+elapsed = time.perf_counter() - start
+print(json.dumps({"elapsed": elapsed, "modules": sorted(sys.modules)}))
+"""
+
+
+class TestImportTime(unittest.TestCase):
+    def cold_import(self):
+        output = subprocess.run(
+            [sys.executable, "-c", IMPORT_SCRIPT],
+            capture_output=True,
+            check=True,
+            text=True,
+        ).stdout
+        return json.loads(output.strip().splitlines()[-1])
+
+    def test_heavy_modules_not_imported(self):
+        modules = self.cold_import()["modules"]
+        for module in LAZY_MODULES:
+            self.assertNotIn(module, modules)
+
+    def test_import_time_budget(self):
+        # best of three, so a busy machine does not fail the benchmark
+        elapsed = min(self.cold_import()["elapsed"] for _ in range(3))
+        self.assertLess(
+            elapsed,
+            IMPORT_TIME_BUDGET,
+            f"Cold import took {elapsed:.3f}s, budget is {IMPORT_TIME_BUDGET}s",
+        )
@@ -1,9 +1,11 @@
 from .control import AzureBlobControl
-from .loaders import AzureBlobLoader
+from .loaders import AzureBlobLoader, create_blob_client, get_transferred_bytes
 from .plugin import AzureblobPlugin
 
 __all__ = [
     "AzureBlobControl",
     "AzureblobPlugin",
     "AzureBlobLoader",
+    "create_blob_client",
+    "get_transferred_bytes",
 ]
@@ -1 +1 @@
-from .azure_blob import AzureBlobLoader
+from .azure_blob import AzureBlobLoader, create_blob_client, get_transferred_bytes
@@ -2,17 +2,58 @@ from __future__ import annotations
 
 import io
 import logging
-from typing import Any
+import threading
+from typing import TYPE_CHECKING, Any, Tuple
 from urllib.parse import urlparse
 
-from azure.identity import ClientSecretCredential,DefaultAzureCredential
-from azure.storage.blob import BlobClient
 from frictionless import types, platform, Loader
 from ..control import AzureBlobControl
 
+if TYPE_CHECKING:
+    from azure.storage.blob import BlobClient
+
 # Create a logger for this file
 logger = logging.getLogger("engineb.azure_blob_loader")
 
+# Bytes moved by the loader, per thread so callers can attribute them to their own work
+transferred_bytes = threading.local()
+
+
+def get_transferred_bytes() -> Tuple[int, int]:
+    """
+    Bytes read from and written to Azure blobs by the current thread so far.
+
+    Take the difference of two calls to measure a piece of work.
+    """
+    return (
+        getattr(transferred_bytes, "read", 0),
+        getattr(transferred_bytes, "written", 0),
+    )
+
+
+def count_transferred_bytes(read: int = 0, written: int = 0):
+    transferred_bytes.read = getattr(transferred_bytes, "read", 0) + read
+    transferred_bytes.written = getattr(transferred_bytes, "written", 0) + written
+
+
+def create_blob_client(url: str) -> BlobClient:
+    """
+    Create a blob client for an Azure blob URL.
+
+    Credentials are picked up by DefaultAzureCredential (managed identity,
+    environment variables etc.), exactly as the loader does.
+
+    The Azure SDK is imported here rather than at module level, it is slow to
+    import and only needed once a blob is actually read or written.
+    """
+    from azure.identity import DefaultAzureCredential
+    from azure.storage.blob import BlobClient
+
+    # Will pick up managed identity, environment variables etc.
+    credential = DefaultAzureCredential()
+    return BlobClient.from_blob_url(url, credential=credential)
+
+
 class AzureBlobLoader(Loader):
     """
     Azure Storage Blob loader implementation.
@@ -30,12 +71,7 @@ class AzureBlobLoader(Loader):
     def read_byte_stream_create(self):  # type: ignore
         logger.info(f"Reading from Azure Blob: {self.resource.path}")
 
-        # Will pick up managed identity, environment variables etc.
-        credential = DefaultAzureCredential()
-
-        # Add credentials
-        blob_client = BlobClient.from_blob_url(
-            self.resource.path, credential=credential)
+        blob_client = create_blob_client(self.resource.path)
         byte_stream = AzureBlobByteStream(blob_client)
         return byte_stream
 
@@ -44,15 +80,17 @@ class AzureBlobLoader(Loader):
     def write_byte_stream_save(self, byte_stream: types.IByteStream):
         logger.debug(f"Writing to Azure Blob: {self.resource.path}")
 
-        # Will pick up managed identity, environment variables etc.
-        credential = DefaultAzureCredential()
+        blob_client = create_blob_client(self.resource.path)
 
-        blob_client = BlobClient.from_blob_url(
-            self.resource.path, credential=credential)
-        
         control = AzureBlobControl.from_dialect(self.resource.dialect)
         logger.debug(f"Overwrite: {control.overwrite}")
+        size = 0
+        if byte_stream.seekable():
+            position = byte_stream.tell()
+            size = byte_stream.seek(0, io.SEEK_END) - position
+            byte_stream.seek(position)
         blob_client.upload_blob(byte_stream, overwrite=control.overwrite)
+        count_transferred_bytes(written=size)
 
     def read_text_stream(self):
         """Read text stream
@@ -138,7 +176,9 @@ class AzureBlobByteStream(io.RawIOBase):
             if new_position >= self.size:
                 return self.read()  # type: ignore
             self.seek(offset=size, whence=io.SEEK_CUR)
-        return self.blob_client.download_blob(offset=offset, length=length).readall()
+        content = self.blob_client.download_blob(offset=offset, length=length).readall()
+        count_transferred_bytes(read=len(content))
+        return content
 
     def read1(self, size: int = -1):  # type: ignore
         return self.read(size)  # type: ignore
@@ -183,6 +223,7 @@ class AzureBlobByteStream(io.RawIOBase):
 
         # Update our own position
         self.seek(num_bytes_stream, io.SEEK_CUR)
+        count_transferred_bytes(read=num_bytes_stream)
 
         # Return the number of bytes read into the buffer
         logger.debug(f"readinto() read {num_bytes_stream=} bytes")